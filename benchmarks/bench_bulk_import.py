@@ -0,0 +1,78 @@
+""" Импорт каталога выписок CSV: разбор в текущем процессе против пула процессов
+
+Запуск: python benchmarks/bench_bulk_import.py [файлов] [записей в файле]
+Соседние выписки пересекаются на 5% строк, повторы отбрасываются при слиянии.
+"""
+import os, sys, csv, time, random, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import FinanceEntry, MainManager
+
+CATEGORIES = ['Еда', 'Такси', 'Зарплата', 'Аренда', 'Кафе', 'Связь', 'Подарки', 'Здоровье']
+
+
+def write_statements(directory, files, rows):
+    """ Выписки по месяцам: конец каждой повторяется в начале следующей """
+    random.seed(1)
+    previous = []
+    for number in range(files):
+        year, month = 2000 + number // 12, number % 12 + 1
+        body = [[i + 1, round(random.uniform(-5000, 5000), 2), random.choice(CATEGORIES),
+                 f'{random.randint(1, 28):02d}-{month:02d}-{year}', f'операция {random.randint(1, 10 ** 6)}']
+                for i in range(rows)]
+        with open(os.path.join(directory, f'{year}-{month:02d}.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(FinanceEntry.FIELDS)
+            writer.writerows(previous + body)
+        previous = body[-rows // 20:]
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    cores = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'statements')
+        os.mkdir(directory)
+        write_statements(directory, files, rows)
+        paths = MainManager.import_paths('csv', directory)
+        size = sum(os.path.getsize(i) for i in paths) / 2 ** 20
+        print(f'Файлов: {files}, строк: {files * rows} без повторов, {size:.1f} МБ, ядер: {cores}')
+
+        started = time.perf_counter()
+        for path in paths:
+            MainManager._read_import('csv', path, FinanceEntry, MainManager.IMPORT_CHUNKSIZE)
+        parse = time.perf_counter() - started
+        print(f'Только разбор и проверка всех файлов в одном процессе: {parse:.2f} с')
+
+        # Для сравнения: те же строки одним файлом через load_file, без удаления повторов
+        combined = os.path.join(tmp, 'combined.csv')
+        with open(combined, 'w', encoding='utf-8') as out:
+            for number, path in enumerate(paths):
+                with open(path, encoding='utf-8') as f:
+                    if number:
+                        next(f)
+                    out.writelines(f)
+        path = os.path.join(tmp, 'finance_single.json')
+        manager = MainManager(path, FinanceEntry)
+        started = time.perf_counter()
+        count, rejected = manager.load_file('csv', combined, path)
+        personal_assistant.WRITER.drain()
+        print(f'Один общий файл через load_file: {time.perf_counter() - started:.2f} с, записей {count}')
+
+        for workers in sorted({1, 2, 4, cores}):
+            path = os.path.join(tmp, f'finance_{workers}.json')
+            manager = MainManager(path, FinanceEntry)
+            started = time.perf_counter()
+            count, rejected, duplicates = manager.load_files('csv', paths, path, workers=workers)
+            personal_assistant.WRITER.drain()
+            elapsed = time.perf_counter() - started
+            print(f'Процессов {workers}: {elapsed:.2f} с, записей {count}, повторов {duplicates}, '
+                  f'некорректных {rejected}')
+
+
+if __name__ == '__main__':
+    main()
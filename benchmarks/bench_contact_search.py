@@ -0,0 +1,83 @@
+""" Поиск контактов по индексу ContactIndex против перебора записей
+
+Запуск: python benchmarks/bench_contact_search.py [количество контактов]
+"""
+import os, sys, random, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from personal_assistant import ContactIndex, ContactRecord, MainManager, normalize_phone
+
+FIRST = ('Иван Пётр Анна Мария Сергей Ольга Дмитрий Елена Алексей Наталья Андрей Татьяна '
+         'Михаил Ирина Николай Светлана Павел Юлия Артём Ксения').split()
+# Фамилии из слогов: около 100 тысяч вариантов, как в большой адресной книге
+SYLLABLES = 'ба ва го да ел жу за ки ла ми но пе ро са ти ус фе хо цы че ша щу эр юн як бор вин гас дул кор'.split()
+ENDINGS = ('ов', 'ин', 'ский', 'енко', 'ук')
+
+
+def make_name():
+    last = ''.join(random.choices(SYLLABLES, k=3)) + random.choice(ENDINGS)
+    return f'{random.choice(FIRST)} {last.capitalize()}'
+
+
+def timeit(func, repeat=20):
+    """ Среднее время вызова """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MainManager(os.path.join(tmp, 'contacts.json'), ContactRecord)
+        # Записи добавляются напрямую: журнал на диске для замера поиска не нужен
+        for i in range(count):
+            manager.data.append(ContactRecord(
+                id=i + 1,
+                name=make_name(),
+                phone=f'+7 9{random.randrange(10**9):09d}',
+                email='None'))
+        target = manager.data[count // 2]
+        phone = '8' + normalize_phone(target.phone)[1:]
+
+        index = ContactIndex(manager)
+        started = time.perf_counter()
+        index.ensure()
+        build = time.perf_counter() - started
+
+        results = {
+            'Телефон в другой записи': timeit(lambda: index.by_phone(phone)),
+            'Имя целиком': timeit(lambda: index.by_name(target.name.upper())),
+            'Начало фамилии': timeit(lambda: index.prefix(target.name.split()[1][:5])),
+        }
+
+        # Опечатки: перестановка, пропуск или лишняя буква в случайном месте фамилии
+        fuzzy, found = [], 0
+        for record in random.sample(manager.data, 100):
+            first, last = record.name.split()
+            position = random.randrange(len(last) - 1)
+            typo = random.choice((last[:position] + last[position + 1] + last[position] + last[position + 2:],
+                                  last[:position] + last[position + 1:],
+                                  last[:position] + 'а' + last[position:]))
+            started = time.perf_counter()
+            found += record in index.fuzzy(f'{first} {typo}', 50)
+            fuzzy.append(time.perf_counter() - started)
+        fuzzy.sort()
+        scan = timeit(lambda: [i for i in manager.data if normalize_phone(i.phone) == normalize_phone(phone)],
+                      repeat=1)
+
+        print(f'Контактов: {count}')
+        print(f'Построение индекса: {build:.1f} с')
+        for name, elapsed in results.items():
+            print(f'{name}: {elapsed * 1000:.3f} мс')
+        print(f'Имя с опечаткой: p50 {fuzzy[50] * 1000:.1f} мс, p90 {fuzzy[90] * 1000:.1f} мс, '
+              f'найдено {found} из 100')
+        print(f'Перебор по телефону: {scan * 1000:.0f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+""" Задержка create_record для каждого уровня надёжности записи
+
+Запуск: python benchmarks/bench_durability.py [количество записей] [размер хранилища]
+"""
+import os, sys, io, time, tempfile, contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant as pa
+
+
+def percentile(values, q):
+    """ Перцентиль по отсортированному списку """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def measure(level, count, size):
+    """ Задержки вставки в хранилище из size записей """
+    pa.MainManager.DURABILITY = level
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        os.mkdir('data')
+        finance = pa.FinanceRecord()
+        with finance.manager.transaction():
+            for i in range(size):
+                finance.manager.insert_data(pa.FinanceEntry(id=i + 1, amount=1.0, category='Еда',
+                                                            date='01-01-2026', description=None))
+
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(count):
+                started = time.perf_counter()
+                finance.create_record(-100.0, 'Такси', '18-10-2026')
+                latencies.append(time.perf_counter() - started)
+
+        # Дозапись очереди, включая необязательные задания уровня none
+        started = time.perf_counter()
+        pa.WRITER.wait(pa.WRITER.submit(lambda: None, wait=True))
+        drain = time.perf_counter() - started
+        os.chdir('/')
+    return latencies, drain
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    print(f'Вставок: {count}, записей в хранилище: {size}')
+    print(f'{"уровень":<8} {"p50, мкс":>10} {"p99, мкс":>10} {"среднее, мкс":>14} {"дозапись очереди, мс":>22}')
+    for level in pa.MainManager.DURABILITY_LEVELS:
+        latencies, drain = measure(level, count, size)
+        print(f'{level:<8} {percentile(latencies, 0.5) * 1e6:>10.0f} {percentile(latencies, 0.99) * 1e6:>10.0f} '
+              f'{sum(latencies) / len(latencies) * 1e6:>14.0f} {drain * 1000:>22.1f}')
+
+
+if __name__ == '__main__':
+    main()
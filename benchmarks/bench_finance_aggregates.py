@@ -0,0 +1,77 @@
+""" Материализованные итоги финансов против колоночного FinanceEngine
+
+Запуск: python benchmarks/bench_finance_aggregates.py [количество записей]
+Сравниваются отчёт за период, группировка по неделям и месяцам, цена изменения записи и сверка итогов с записями.
+"""
+import os, sys, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from datetime import date
+import personal_assistant
+from personal_assistant import FinanceAggregates, FinanceEngine, FinanceEntry, FinanceLedger, MainManager
+from bench_finance_engine import make_records, timeit
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    records = make_records(count)
+    periods = [(date(2016, 1, 1), date(2025, 12, 31)), (date(2020, 3, 15), date(2021, 8, 10)),
+               (date(2024, 6, 1), date(2024, 6, 30))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MainManager(os.path.join(tmp, 'finance.json'), FinanceEntry)
+        with manager.transaction():
+            for i in records:
+                manager.insert_data(i)
+        personal_assistant.WRITER.drain()
+        aggregates = manager.attach('aggregates', FinanceAggregates)
+
+        started = time.perf_counter()
+        aggregates.ensure()
+        build = time.perf_counter() - started
+        started = time.perf_counter()
+        engine = FinanceEngine(FinanceLedger.from_records(manager.data))
+        engine_build = time.perf_counter() - started
+
+        print(f'Записей: {count}, дней с записями: {len(aggregates.days)}, месяцев: {len(aggregates.months)}')
+        print(f'Построение: итоги {build * 1000:.0f} мс, столбцы FinanceEngine {engine_build * 1000:.0f} мс')
+        for start, end in periods:
+            vector = timeit(lambda: (engine.totals(start, end), engine.group_by('category', start, end)))
+            materialized = timeit(lambda: aggregates.report(start, end))
+            print(f'Отчёт {start} — {end}: FinanceEngine {vector * 1e6:.0f} мкс, итоги {materialized * 1e6:.0f} мкс')
+            for by in ('week', 'month'):
+                vector = timeit(lambda: engine.group_by(by, start, end))
+                materialized = timeit(lambda: aggregates.group_by(by, start, end))
+                print(f'  по {by}: FinanceEngine {vector * 1e6:.0f} мкс, итоги {materialized * 1e6:.0f} мкс')
+
+        # Изменение записи: итоги обновляются на месте, столбцы пришлось бы строить заново
+        repeat = 10_000
+        added = [FinanceEntry(id=count + i + 1, amount=100.0, category='Еда', date='15-06-2024', description=None)
+                 for i in range(repeat)]
+        started = time.perf_counter()
+        aggregates.apply((), added)
+        insert = (time.perf_counter() - started) / repeat
+        started = time.perf_counter()
+        aggregates.apply([i['id'] for i in added], ())
+        delete = (time.perf_counter() - started) / repeat
+        print(f'Учёт изменения в итогах: добавление {insert * 1e6:.1f} мкс, удаление {delete * 1e6:.1f} мкс на запись')
+
+        started = time.perf_counter()
+        problems = aggregates.check()
+        check = time.perf_counter() - started
+        print(f'Сверка с записями: {check * 1000:.0f} мс, расхождений: {len(problems)}')
+
+        path = os.path.join(tmp, 'finance.aggregates')
+        personal_assistant.WRITER.drain()
+        aggregates.save(path)
+        personal_assistant.WRITER.drain()
+        started = time.perf_counter()
+        loaded = FinanceAggregates.open(manager, path)
+        load = time.perf_counter() - started
+        assert loaded.seq is not None and loaded.total[2] == count
+        print(f'Чтение сохранённых итогов: {load * 1000:.0f} мс против построения {build * 1000:.0f} мс')
+
+
+if __name__ == '__main__':
+    main()
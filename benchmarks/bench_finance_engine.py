@@ -0,0 +1,80 @@
+""" Сравнение отчёта по циклу Python с колоночным FinanceEngine
+
+Запуск: python benchmarks/bench_finance_engine.py [количество записей]
+"""
+import os, sys, random, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from datetime import date
+from personal_assistant import FinanceEngine, FinanceEntry, FinanceLedger, MainManager
+
+
+def make_records(count):
+    """ Случайный журнал за 10 лет """
+    random.seed(1)
+    categories = ['Еда', 'Такси', 'Зарплата', 'Аренда', 'Кафе', 'Связь', 'Подарки', 'Здоровье']
+    records = []
+    for i in range(count):
+        day = random.randint(1, 28)
+        month = random.randint(1, 12)
+        year = random.randint(2016, 2025)
+        records.append(FinanceEntry(
+            id=i + 1,
+            amount=round(random.uniform(-5000, 5000), 2),
+            category=random.choice(categories),
+            date=f'{day:02d}-{month:02d}-{year}',
+            description='None'
+        ))
+    return records
+
+
+def python_report(records, start, end):
+    """ Отчёт перебором записей, как в исходной реализации """
+    start_key, end_key = MainManager.date_key(start), MainManager.date_key(end)
+    result = [i for i in records if start_key <= MainManager.date_key(i['date']) <= end_key]
+    sum_rev = sum([i['amount'] for i in result if i['amount'] > 0])
+    sum_cost = sum([i['amount'] for i in result if i['amount'] < 0])
+    by_category = {}
+    for i in result:
+        totals = by_category.setdefault(i['category'], [0, 0])
+        totals[0 if i['amount'] > 0 else 1] += i['amount']
+    return sum_rev, sum_cost, by_category
+
+
+def engine_report(engine, start, end):
+    """ Тот же отчёт на колоночном движке """
+    return engine.totals(start, end), engine.group_by('category', start, end)
+
+
+def timeit(func, repeat=5):
+    """ Лучшее время из нескольких запусков """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    records = make_records(count)
+    start, end = date(2016, 1, 1), date(2025, 12, 31)
+
+    started = time.perf_counter()
+    engine = FinanceEngine(FinanceLedger.from_records(records))
+    build = time.perf_counter() - started
+
+    loop = timeit(lambda: python_report(records, start, end), repeat=3)
+    vector = timeit(lambda: engine_report(engine, start, end))
+
+    print(f'Записей: {count}')
+    print(f'Построение столбцов: {build * 1000:.1f} мс (один раз на версию хранилища)')
+    print(f'Цикл Python: {loop * 1000:.1f} мс')
+    print(f'FinanceEngine: {vector * 1000:.1f} мс')
+    print(f'Ускорение: {loop / vector:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+""" Открытие колоночного журнала FinanceLedger против загрузки JSON-хранилища
+
+Запуск: python benchmarks/bench_finance_ledger.py [количество записей]
+"""
+import os, sys, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from datetime import date
+from bench_finance_engine import make_records
+from personal_assistant import JSON_CODEC, FinanceEngine, FinanceEntry, FinanceLedger
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    records = make_records(count)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'finance.json')
+        ledger_path = os.path.join(tmp, 'finance.ledger')
+        with open(json_path, 'wb') as f:
+            f.write(JSON_CODEC.encode([i.to_dict() for i in records]))
+        with open(ledger_path, 'wb') as f:
+            FinanceLedger.from_records(records).dump(f)
+        del records
+
+        started = time.perf_counter()
+        with open(json_path, 'rb') as f:
+            loaded = FinanceEntry.from_dicts(JSON_CODEC.decode(f.read()))
+        json_load = time.perf_counter() - started
+        del loaded
+
+        started = time.perf_counter()
+        ledger = FinanceLedger.open(ledger_path)
+        ledger_open = time.perf_counter() - started
+
+        # Отчёт за месяц читает только страницы этого месяца
+        started = time.perf_counter()
+        engine = FinanceEngine(ledger)
+        totals = engine.totals(date(2020, 3, 1), date(2020, 3, 31))
+        month_report = time.perf_counter() - started
+
+        print(f'Записей: {count}')
+        print(f'Размер: JSON {os.path.getsize(json_path) / 2**20:.1f} МБ, '
+              f'журнал {os.path.getsize(ledger_path) / 2**20:.1f} МБ')
+        print(f'Загрузка JSON в записи: {json_load * 1000:.1f} мс')
+        print(f'Открытие журнала: {ledger_open * 1000:.2f} мс')
+        print(f'Отчёт за месяц по журналу: {month_report * 1000:.2f} мс, баланс {totals["balance"]:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+""" Финансы одним файлом против частей по месяцам: запись, отчёт за месяц с холодного запуска, место на диске
+
+Запуск: python benchmarks/bench_finance_shards.py [количество записей]
+Части прошлых месяцев сжаты, как после команды finance compress.
+"""
+import os, sys, time, tempfile, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from datetime import date
+import personal_assistant
+from personal_assistant import FinanceAggregates, FinanceEntry, MainManager, ShardedAggregates, ShardedManager
+from bench_finance_engine import make_records
+
+MONTH = (date(2025, 12, 1), date(2025, 12, 31))
+
+
+def fill(manager, count):
+    with manager.transaction():
+        for i in make_records(count):
+            manager.insert_data(i)
+    personal_assistant.WRITER.drain()
+
+
+def date_key(record):
+    return MainManager.date_key(record['date'])
+
+
+def open_single(path):
+    manager = MainManager(path, FinanceEntry)
+    manager.add_sorted_index('date', date_key)
+    return manager, FinanceAggregates.open(manager, os.path.splitext(path)[0] + '.aggregates')
+
+
+def open_sharded(path):
+    manager = ShardedManager(path, FinanceEntry)
+    manager.add_sorted_index('date', date_key)
+    return manager, ShardedAggregates(manager)
+
+
+def cold(opener, path, action):
+    """ Время и пиковая память Python: открытие хранилища и действие над ним """
+    started = time.perf_counter()
+    action(*opener(path))
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    action(*opener(path))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def disk_size(path):
+    return sum(os.path.getsize(os.path.join(root, i)) for root, _, files in os.walk(path) for i in files
+               if not i.endswith('.lock')) / 2 ** 20
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single_path = os.path.join(tmp, 'single', 'finance.json')
+        sharded_path = os.path.join(tmp, 'monthly', 'finance.json')
+        os.makedirs(os.path.dirname(single_path))
+        single, aggregates = open_single(single_path)
+        fill(single, count)
+        sharded, sharded_aggregates = open_sharded(sharded_path)
+        fill(sharded, count)
+        sharded.compress()
+
+        # Запись: добавление в текущий месяц и сворачивание журнала, которое один файл переписывает целиком
+        for title, manager in (('один файл', single), ('части', sharded)):
+            entry = FinanceEntry(id=manager.next_id(), amount=-100.0, category='Еда', date='15-01-2026',
+                                 description=None)
+            started = time.perf_counter()
+            manager.insert_data(entry)
+            personal_assistant.WRITER.drain()
+            insert = time.perf_counter() - started
+            started = time.perf_counter()
+            manager.compact()
+            personal_assistant.WRITER.drain()
+            compact = time.perf_counter() - started
+            print(f'Запись, {title}: добавление {insert * 1000:.2f} мс, сворачивание журнала {compact * 1000:.1f} мс')
+
+        # Итоги сохранены рядом с данными, как после первого отчёта
+        aggregates.ensure()
+        aggregates.save(os.path.splitext(single_path)[0] + '.aggregates')
+        sharded_aggregates.ensure()
+        sharded_aggregates.save()
+        for name in sharded.names():
+            sharded.unload(name)
+        personal_assistant.WRITER.drain()
+        print(f'Записей: {count + 1}, частей: {len(sharded.names())}')
+        print(f'На диске: один файл {disk_size(os.path.dirname(single_path)):.1f} МБ, '
+              f'части со сжатием {disk_size(os.path.dirname(sharded_path)):.1f} МБ')
+
+        start, end = MONTH
+        for title, action in (('итоги за месяц', lambda manager, aggregates: aggregates.report(start, end)),
+                              ('записи месяца для выгрузки',
+                               lambda manager, aggregates: sum(1 for _ in manager.iter_records(start, end))),
+                              ('итоги за всё время', lambda manager, aggregates: aggregates.report())):
+            for name, opener, path in (('один файл', open_single, single_path),
+                                       ('части', open_sharded, sharded_path)):
+                elapsed, peak = cold(opener, path, action)
+                print(f'Холодный запуск, {title}, {name}: {elapsed * 1000:.1f} мс, пик памяти {peak:.1f} МБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+""" Поиск по тексту заметок: индекс BM25 против перебора записей
+
+Запуск: python benchmarks/bench_note_search.py [количество заметок]
+"""
+import os, sys, random, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from personal_assistant import MainManager, NoteRecord, TextIndex
+
+WORDS = ('встреча проект молоко отчёт бюджет задача клиент договор звонок письмо покупка ремонт '
+         'отпуск билет врач спорт книга фильм подарок праздник команда релиз сервер база данных').split()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    random.seed(1)
+    # Кроме частых слов в заметках встречаются редкие: имена, названия, номера
+    rare = [f'{random.choice(WORDS)}{i}' for i in range(5000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MainManager(os.path.join(tmp, 'notes.json'), NoteRecord)
+        with manager.transaction():
+            for i in range(count):
+                manager.insert_data(NoteRecord(
+                    id=i + 1,
+                    title=' '.join(random.choices(WORDS, k=3)),
+                    content=' '.join(random.choices(WORDS, k=10) + random.choices(rare, k=40)) + f' заметка{i}',
+                    timestamp='01-01-2026 12:00:00'))
+
+        index = TextIndex(manager, {'title': 2, 'content': 1})
+        started = time.perf_counter()
+        index.rebuild()
+        build = time.perf_counter() - started
+
+        queries = ['молоко', 'бюджет проекта', 'договор с клиентом', f'заметка{count // 2}']
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query)
+        indexed = (time.perf_counter() - started) / len(queries)
+
+        # Перебор: поиск подстроки, как при ручном grep по файлу
+        started = time.perf_counter()
+        for query in queries:
+            [i for i in manager.iter_records() if query in (i['title'] + ' ' + i['content']).lower()]
+        scan = (time.perf_counter() - started) / len(queries)
+
+        print(f'Заметок: {count}')
+        print(f'Построение индекса: {build * 1000:.0f} мс (один раз, затем обновляется по изменениям)')
+        print(f'Поиск BM25: {indexed * 1000:.2f} мс на запрос')
+        print(f'Перебор записей: {scan * 1000:.2f} мс на запрос (без ранжирования)')
+
+
+if __name__ == '__main__':
+    main()
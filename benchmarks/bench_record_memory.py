@@ -0,0 +1,64 @@
+""" Память и скорость загрузки: словари против записей со __slots__
+
+Запуск: python benchmarks/bench_record_memory.py [количество записей]
+"""
+import os, sys, random, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from personal_assistant import FinanceEntry, NoteRecord
+
+
+def make_rows(count):
+    """ Записи финансов и заметок в формате хранения """
+    random.seed(1)
+    categories = ['Еда', 'Такси', 'Зарплата', 'Аренда', 'Кафе', 'Связь', 'Подарки', 'Здоровье']
+    finance, notes = [], []
+    for i in range(count):
+        day, month, year = random.randint(1, 28), random.randint(1, 12), random.randint(2016, 2025)
+        finance.append({
+            'id': i + 1,
+            'amount': round(random.uniform(-5000, 5000), 2),
+            'category': random.choice(categories),
+            'date': f'{day:02d}-{month:02d}-{year}',
+            'description': 'None'
+        })
+        notes.append({
+            'id': i + 1,
+            'title': f'Заметка {i + 1}',
+            'content': 'None',
+            'timestamp': f'{day:02d}-{month:02d}-{year} 12:{i % 60:02d}:00'
+        })
+    return finance, notes
+
+
+def measure(build):
+    """ Прирост памяти и время построения списка записей """
+    # Время меряется отдельно: tracemalloc замедляет выделение памяти в разы
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    records = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    finance, notes = make_rows(count)
+
+    print(f'Записей: {count}')
+    for name, rows, record_type in (('finance', finance, FinanceEntry), ('notes', notes, NoteRecord)):
+        # Копия словарей — так хранилище держало записи после json.load
+        dicts, dicts_time = measure(lambda: [dict(i) for i in rows])
+        slots, slots_time = measure(lambda: record_type.from_dicts(rows))
+        print(f'{name}: словари {dicts / count:.0f} байт/запись, {dicts_time * 1000:.0f} мс; '
+              f'{record_type.__name__} {slots / count:.0f} байт/запись, {slots_time * 1000:.0f} мс; '
+              f'экономия {1 - slots / dicts:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+""" Отчёт за период: выгрузка всего журнала против выгрузки периода и повтор из кеша
+
+Запуск: python benchmarks/bench_report_cache.py [количество записей]
+"""
+import io, os, sys, time, tempfile
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import FinanceRecord, parse_date
+from bench_finance_engine import make_records
+
+
+def quiet(func, *args, **kwargs):
+    """ Время вызова без вывода в консоль """
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    start, end = '01-01-2024', '31-03-2024'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.mkdir('data')
+        finance = FinanceRecord()
+        with finance.manager.transaction():
+            for i in make_records(count):
+                finance.manager.insert_data(i)
+        personal_assistant.WRITER.drain()
+        finance.aggregates.ensure()
+
+        # Прежний отчёт выгружал в файл всё хранилище
+        full = quiet(finance.manager.save_file, 'csv', os.path.join('data', 'full.csv'))
+        first = quiet(finance.create_report, start, end)
+        repeat = min(quiet(finance.create_report, start, end) for _ in range(10))
+        dashboard = min(quiet(finance.report, None, None, category='Еда') for _ in range(10))
+        path = finance.report_path(parse_date(start), parse_date(end), {})
+        personal_assistant.WRITER.drain()
+
+        print(f'Записей: {count}, в отчёте за {start} — {end}: {sum(1 for _ in open(path)) - 1}')
+        print(f'Выгрузка всего хранилища, как прежде: {full * 1000:.0f} мс')
+        print(f'Первый отчёт с выгрузкой периода: {first * 1000:.1f} мс')
+        print(f'Повторный отчёт из кеша, файл не переписывается: {repeat * 1000:.2f} мс')
+        print(f'Итоги категории для панели из кеша: {dashboard * 1e6:.1f} мкс')
+        print(f'Попаданий в кеш: {finance.reports.hits}, промахов: {finance.reports.misses}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+""" Скорость записи и чтения снимка хранилища в разных форматах
+
+Запуск: python benchmarks/bench_snapshot_formats.py [количество записей]
+"""
+import os, sys, json, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from personal_assistant import JSON_CODEC, BINARY_CODEC, FinanceEntry
+
+
+def make_records(count):
+    """ Финансовые записи, как их хранит FinanceRecord """
+    return [{'id': i + 1, 'amount': -100.5, 'category': 'Такси', 'date': '18-10-2026',
+             'description': f'Поездка {i}'} for i in range(count)]
+
+
+def stdlib_save(path, records):
+    with open(path, 'w') as f:
+        json.dump(records, f)
+
+
+def stdlib_load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def codec_save(codec):
+    def save(path, records):
+        with open(path, 'wb') as f:
+            f.write(codec.encode(records))
+    return save
+
+
+def codec_load(codec):
+    def load(path):
+        with open(path, 'rb') as f:
+            return codec.decode(f.read())
+    return load
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    records = make_records(count)
+    formats = [('json.dump (прежний)', stdlib_save, stdlib_load),
+               (f'json ({JSON_CODEC.name})', codec_save(JSON_CODEC), codec_load(JSON_CODEC)),
+               ('binary', codec_save(BINARY_CODEC), codec_load(BINARY_CODEC))]
+
+    print(f'Записей: {count}')
+    print(f'{"формат":<24} {"запись, мс":>11} {"чтение, мс":>11} {"размер, КБ":>11}')
+    with tempfile.TemporaryDirectory() as root:
+        for name, save, load in formats:
+            path = os.path.join(root, 'snapshot')
+            started = time.perf_counter()
+            save(path, records)
+            saved = time.perf_counter() - started
+            started = time.perf_counter()
+            result = load(path)
+            loaded = time.perf_counter() - started
+            assert result == records
+            print(f'{name:<24} {saved * 1000:>11.0f} {loaded * 1000:>11.0f} {os.path.getsize(path) // 1024:>11}')
+
+        # Загрузка хранилища: JSON разбирается в словари, двоичный снимок собирается в записи по столбцам
+        print(f'\n{"чтение в FinanceEntry":<24} {"мс":>11}')
+        for name, codec in ((f'json ({JSON_CODEC.name})', JSON_CODEC), ('binary', BINARY_CODEC)):
+            path = os.path.join(root, 'snapshot')
+            codec_save(codec)(path, records)
+            started = time.perf_counter()
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if codec is BINARY_CODEC:
+                result = FinanceEntry.from_columns(codec.decode_columns(raw)[1])
+            else:
+                result = FinanceEntry.from_dicts(codec.decode(raw))
+            loaded = time.perf_counter() - started
+            assert [i.to_dict() for i in result] == records
+            print(f'{name:<24} {loaded * 1000:>11.0f}')
+
+
+if __name__ == '__main__':
+    main()
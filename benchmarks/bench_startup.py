@@ -0,0 +1,77 @@
+""" Холодный запуск: время импорта модуля по python -X importtime, время и память запуска команды
+
+Запуск: python benchmarks/bench_startup.py [повторов]
+Самые дорогие импорты выводятся, чтобы было видно, что тянет запуск.
+"""
+import os, sys, json, statistics, subprocess, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    import resource
+except ImportError:  # не POSIX
+    resource = None
+
+# Модули, которые не должны импортироваться при запуске без отчётов, CSV и сервиса
+HEAVY = ('numpy', 'pandas', 'asyncio')
+
+
+def import_times():
+    """ Время импорта по -X importtime: модуль и его прямые импорты {имя: накопленное время в мкс} """
+    code = ('import sys, json, personal_assistant; '
+            f'print(json.dumps([i for i in {HEAVY!r} if i in sys.modules]))')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    # Вложенные импорты выводятся до импортирующего модуля, глубина — отступ имени
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, total, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(total)
+        elif depth == 0:
+            if name.strip() == 'personal_assistant':
+                return int(total), children, json.loads(result.stdout)
+            children = {}
+    raise RuntimeError('В выводе -X importtime нет personal_assistant')
+
+
+def run_command(args, data_dir):
+    """ Время выполнения команды целиком и пиковая память процесса в МБ """
+    started = os.times().elapsed
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'personal_assistant.py'), *args],
+                               cwd=data_dir, stdout=subprocess.DEVNULL)
+    if resource is None:
+        process.wait()
+        return os.times().elapsed - started, None
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return os.times().elapsed - started, usage.ru_maxrss / 1024
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    samples = [import_times() for _ in range(repeat)]
+    totals = [i[0] for i in samples]
+    print(f'Импорт personal_assistant: медиана {statistics.median(totals) / 1000:.1f} мс, '
+          f'минимум {min(totals) / 1000:.1f} мс за {repeat} запусков')
+    _, children, heavy = samples[-1]
+    print(f'Тяжёлые модули после импорта: {", ".join(heavy) or "нет"}')
+    print('Самые дорогие прямые импорты:')
+    for name in sorted(children, key=children.get, reverse=True)[:8]:
+        print(f'  {name:<24} {children[name] / 1000:7.1f} мс')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.mkdir(os.path.join(tmp, 'data'))
+        for args in (['notes', 'list'], ['finance', 'report', '--from', '01-01-2026', '--to', '31-12-2026']):
+            runs = [run_command(args, tmp) for _ in range(max(1, repeat // 2))]
+            elapsed = statistics.median(i[0] for i in runs)
+            memory = '' if runs[0][1] is None else f', память {max(i[1] for i in runs):.0f} МБ'
+            print(f'Команда {" ".join(args)}: {elapsed * 1000:.0f} мс{memory}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+""" Расписание задач по отсортированному индексу против сортировки всех задач
+
+Запуск: python benchmarks/bench_task_schedule.py [количество задач]
+"""
+import os, sys, random, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from datetime import date, timedelta
+from personal_assistant import MainManager, Task, TaskRecord
+
+
+def timeit(func, repeat=20):
+    """ Среднее время вызова """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(1)
+    today = date(2026, 10, 14)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        task = Task.__new__(Task)
+        task.manager = MainManager(os.path.join(tmp, 'tasks.json'), TaskRecord)
+        for i in range(count):
+            due = today + timedelta(days=random.randint(-365, 365))
+            task.manager.data.append(TaskRecord(
+                id=i + 1, title=f'Задача {i + 1}', description='None', done=random.random() < 0.7,
+                priority=random.choice(('Высокий', 'Средний', 'Низкий')), due_date=due.strftime('%d-%m-%Y')))
+        task.manager.add_sorted_index('schedule', Task.schedule_key)
+
+        started = time.perf_counter()
+        task.next_tasks(10, today)
+        build = time.perf_counter() - started
+
+        def scan():
+            """ Прежний путь: отбор и сортировка всех задач """
+            pending = [i for i in task.manager.data if not i.done and i.due_date >= today]
+            return sorted(pending, key=Task.schedule_key)[:10]
+
+        print(f'Задач: {count}')
+        print(f'Построение индекса: {build * 1000:.0f} мс (один раз, затем обновляется по изменениям)')
+        print(f'Ближайшие 10: {timeit(lambda: task.next_tasks(10, today)) * 1000:.3f} мс')
+        print(f'Просроченные: {timeit(lambda: task.overdue_tasks(today)) * 1000:.1f} мс '
+              f'({len(task.overdue_tasks(today))} задач)')
+        print(f'На этой неделе: {timeit(lambda: task.week_tasks(today)) * 1000:.3f} мс '
+              f'({len(task.week_tasks(today))} задач)')
+        print(f'Сортировка всех задач: {timeit(scan, repeat=1) * 1000:.0f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+""" Нагрузочный тест сервиса: задержка p50/p99 и пропускная способность при множестве соединений
+
+Запуск: python benchmarks/load_test_server.py [соединений] [запросов] [доля записи]
+Сервис запускается отдельным процессом во временном каталоге данных.
+"""
+import os, sys, time, json, random, asyncio, tempfile, subprocess
+from urllib.parse import quote
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+try:
+    import resource
+except ImportError:  # не POSIX
+    resource = None
+
+
+def raise_open_files():
+    """ Увеличение лимита открытых файлов до жёсткого: каждое соединение — дескриптор """
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def request(reader, writer, port, method, path, body=None):
+    """ Запрос по открытому соединению keep-alive, возвращает код ответа """
+    data = b'' if body is None else json.dumps(body, ensure_ascii=False).encode('utf-8')
+    content_type = '' if body is None else 'Content-Type: application/json\r\n'
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n{content_type}'
+                 f'Content-Length: {len(data)}\r\n\r\n'.encode('latin-1') + data)
+    status = int((await reader.readline()).split()[1])
+    size = 0
+    while True:
+        line = await reader.readline()
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            size = int(value)
+    await reader.readexactly(size)
+    return status
+
+
+def next_request(rng, number, write_share):
+    """ Смесь запросов: чтение списков, поиск, отчёт и создание записей """
+    if rng.random() < write_share:
+        if number % 2:
+            return 'POST', '/notes/add', {'title': f'Заметка {number}', 'content': f'заметка тема{number % 97}'}
+        return 'POST', '/finance/add', {'amount': rng.randint(-500, 500), 'category': f'к{number % 9}',
+                                        'date': f'{number % 28 + 1:02d}-{number % 12 + 1:02d}-2026'}
+    kind = rng.random()
+    if kind < 0.4:
+        return 'GET', f'/notes/search?q={quote(f"тема{number % 97}")}&limit=5', None
+    if kind < 0.7:
+        return 'GET', '/finance/report?from=01-01-2026&to=30-06-2026', None
+    return 'GET', '/tasks/schedule?limit=10', None
+
+
+async def client(port, count, write_share, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for i in range(count):
+            method, path, body = next_request(rng, seed * 1_000_000 + i, write_share)
+            started = time.perf_counter()
+            status = await request(reader, writer, port, method, path, body)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(port, connections, total, write_share):
+    latencies, errors = [], []
+    per_client = max(1, total // connections)
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, per_client, write_share, latencies, errors, i + 1)
+                           for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    write_share = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    raise_open_files()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.mkdir(os.path.join(tmp, 'data'))
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'personal_assistant.py'), 'serve', '--port', '0'],
+            cwd=tmp, stdout=subprocess.PIPE, text=True)
+        try:
+            port = int(server.stdout.readline().strip().rstrip('/').rsplit(':', 1)[1])
+            latencies, errors, elapsed = asyncio.run(run(port, connections, total, write_share))
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    count = len(latencies)
+    print(f'Соединений: {connections}, запросов: {count}, доля записи: {write_share:.0%}')
+    print(f'Пропускная способность: {count / elapsed:,.0f} запросов/с за {elapsed:.2f} с')
+    for name, share in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99)):
+        print(f'{name}: {latencies[min(count - 1, int(count * share))] * 1000:.2f} мс')
+    print(f'Ошибок: {len(errors)}')
+
+
+if __name__ == '__main__':
+    main()
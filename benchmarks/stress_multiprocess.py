@@ -0,0 +1,112 @@
+""" Несколько процессов пишут в одно хранилище: проверка, что ни одно изменение не потеряно
+
+Каждый процесс добавляет записи (id выдаётся по своей, возможно устаревшей копии данных)
+и увеличивает общий счётчик чтением и записью в транзакции.
+Запуск: python benchmarks/stress_multiprocess.py [процессов] [операций на процесс]
+"""
+import os, sys, time, tempfile, multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import MainManager, FinanceEntry
+
+
+def entry(id_record, description, amount=1.0):
+    return FinanceEntry.from_dict({'id': id_record, 'amount': amount, 'category': 'нагрузка',
+                                   'date': '01-01-2026', 'description': description})
+
+
+def worker(path, number, count, locking, autosave):
+    if not locking:
+        personal_assistant.fcntl = None # поведение без межпроцессной блокировки
+    manager = MainManager(path, FinanceEntry)
+    if autosave:
+        manager.set_autosave(0.005)
+    for i in range(count):
+        manager.insert_data(entry(manager.next_id(), f'{number}:{i}'))
+        if not autosave:
+            with manager.transaction():
+                counter = manager.find_data('id', 1)[0]
+                manager.update_data(counter, {'amount': counter['amount'] + 1})
+    manager.flush()
+    personal_assistant.WRITER.drain()
+
+
+def run(processes, count, locking, autosave=False):
+    """ Запуск процессов над новым хранилищем, возвращает число потерянных записей и приращений счётчика """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'finance.json')
+        manager = MainManager(path, FinanceEntry)
+        manager.insert_data(entry(1, 'счётчик', 0.0))
+        personal_assistant.WRITER.drain()
+
+        context = multiprocessing.get_context('spawn')
+        started = time.perf_counter()
+        workers = [context.Process(target=worker, args=(path, i, count, locking, autosave))
+                   for i in range(processes)]
+        for i in workers:
+            i.start()
+        for i in workers:
+            i.join()
+        elapsed = time.perf_counter() - started
+
+        result = MainManager(path, FinanceEntry)
+        found = {i['description'] for i in result.data if i['id'] != 1}
+        ids = [i['id'] for i in result.data]
+        lost = processes * count - len(found)
+        duplicates = len(ids) - len(set(ids))
+        counter = result.find_data('id', 1)[0]['amount']
+        lost_increments = 0 if autosave else processes * count - int(counter)
+        return lost, duplicates, lost_increments, elapsed
+
+
+def measure_refresh(size=100_000, delta=100):
+    """ Стоимость проверки изменений и дочитывания части журнала против полного чтения хранилища """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'finance.json')
+        writer = MainManager(path, FinanceEntry)
+        with writer.transaction():
+            for i in range(size):
+                writer.insert_data(entry(i + 1, f'запись {i}'))
+        personal_assistant.WRITER.drain()
+        reader = MainManager(path, FinanceEntry)
+
+        repeat = 10_000
+        started = time.perf_counter()
+        for _ in range(repeat):
+            reader.refresh()
+        unchanged = (time.perf_counter() - started) / repeat
+
+        for i in range(delta):
+            writer.insert_data(entry(writer.next_id(), f'новая {i}'))
+        personal_assistant.WRITER.drain()
+        started = time.perf_counter()
+        reader.refresh()
+        incremental = time.perf_counter() - started
+        assert len(reader.data) == size + delta
+
+        started = time.perf_counter()
+        MainManager(path, FinanceEntry)
+        full = time.perf_counter() - started
+
+    print(f'Хранилище {size} записей: проверка без изменений {unchanged * 1e6:.1f} мкс, '
+          f'дочитывание {delta} операций {incremental * 1000:.2f} мс, полное чтение {full * 1000:.0f} мс')
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    for title, locking, autosave in (('С блокировкой', True, False),
+                                     ('С блокировкой, отложенное сохранение', True, True),
+                                     ('Без блокировки', False, False)):
+        lost, duplicates, lost_increments, elapsed = run(processes, count, locking, autosave)
+        print(f'{title}: {processes} процессов × {count} операций за {elapsed:.2f} с — '
+              f'потеряно записей {lost}, повторных id {duplicates}, потеряно приращений счётчика {lost_increments}')
+
+    measure_refresh()
+
+
+if __name__ == '__main__':
+    main()
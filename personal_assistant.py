@@ -1,65 +1,2537 @@
-import os, json
+import gc, io, os, re, sys, csv, glob, gzip, json, time, argparse, math, heapq, queue, atexit, marshal, signal, struct, sqlite3, threading, traceback, weakref
+import importlib, importlib.util
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from functools import lru_cache
+from collections import Counter
+from itertools import chain, islice, repeat
+
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+try:
+    import fcntl
+except ImportError: # Windows: межпроцессная блокировка недоступна, хранилище используется одним процессом
+    fcntl = None
+
+
+class LazyModule:
+    """ Модуль, импортируемый при первом обращении к его атрибуту """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def available(self):
+        """ Установлен ли модуль, без его импорта """
+        return self._module is not None or importlib.util.find_spec(self._name) is not None
+
+
+# numpy и pandas нужны только колоночному журналу финансов и импорту больших CSV, asyncio — только сервису:
+# их импорт занимал большую часть времени запуска, поэтому они подгружаются при первом использовании
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+asyncio = LazyModule('asyncio')
+# Пул процессов нужен только импорту нескольких файлов
+futures = LazyModule('concurrent.futures')
+multiprocessing = LazyModule('multiprocessing')
+
+class JsonCodec:
+    """ JSON для журнала и снимков: orjson или msgspec, если установлены, иначе stdlib """
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+        try:
+            import msgspec
+        except ImportError:
+            msgspec = None
+
+        if orjson is not None:
+            self.name = 'orjson'
+            self.encode = orjson.dumps
+            self.decode = orjson.loads
+            self.errors = (orjson.JSONDecodeError,)
+        elif msgspec is not None:
+            self.name = 'msgspec'
+            self.encode = msgspec.json.Encoder().encode
+            self.decode = msgspec.json.Decoder().decode
+            self.errors = (msgspec.DecodeError,)
+        else:
+            self.name = 'stdlib'
+            self.encode = lambda obj: json.dumps(obj).encode()
+            self.decode = json.loads
+            self.errors = (json.JSONDecodeError,)
+
+    def dumps(self, obj):
+        """ Объект в строку JSON """
+        return self.encode(obj).decode()
+
+    def loads(self, text):
+        """ Строка или байты JSON в объект """
+        return self.decode(text)
+
+
+class BinaryCodec:
+    """ Двоичный снимок: заголовок с номером формата и данные по столбцам """
+    # Формат 2 не зависит от версии Python: целые и дробные столбцы хранятся массивами int64/float64
+    # в порядке little-endian, остальные — списками JSON. Формат 1 (marshal) только читается:
+    # marshal не обещает совместимости между версиями Python
+    MAGIC = b'PASNAP'
+    VERSION = 2
+    HEADER = struct.Struct('<I')
+    name = 'binary'
+    errors = (ValueError, EOFError, TypeError, KeyError, struct.error)
+
+    def encode(self, obj):
+        fields = list(obj[0]) if obj and isinstance(obj[0], dict) else None
+        if fields is not None:
+            keys = obj[0].keys()
+            if not all(isinstance(i, dict) and i.keys() == keys for i in obj):
+                fields = None
+        if fields is None:
+            # Записи с разным набором полей хранятся одним списком JSON
+            columns, blobs = [], [JSON_CODEC.encode(obj)]
+        else:
+            columns, blobs = [], []
+            for field in fields:
+                kind, blob = self._encode_column([i[field] for i in obj])
+                columns.append(kind)
+                blobs.append(blob)
+        header = JSON_CODEC.encode({'fields': fields, 'columns': columns, 'sizes': [len(i) for i in blobs]})
+        return b''.join([self.MAGIC, bytes([self.VERSION]), self.HEADER.pack(len(header)), header, *blobs])
+
+    @staticmethod
+    def _encode_column(values):
+        """ Столбец снимка: ('q' или 'd', массив) для одних целых или дробных, иначе ('j', список JSON) """
+        for kind, kind_type in (('q', int), ('d', float)):
+            if all(type(i) is kind_type for i in values):
+                try:
+                    column = array(kind, values)
+                except OverflowError:
+                    break
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                return kind, column.tobytes()
+        return 'j', JSON_CODEC.encode(values)
+
+    @staticmethod
+    def _decode_column(kind, blob):
+        if kind == 'j':
+            return JSON_CODEC.decode(blob)
+        column = array(kind)
+        column.frombytes(blob)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column.tolist()
+
+    def decode(self, data):
+        fields, columns = self.decode_columns(data)
+        return columns if fields is None else self.rows(fields, columns)
+
+    @staticmethod
+    def rows(fields, columns):
+        """ Словари записей из столбцов снимка """
+        return list(map(dict, map(zip, repeat(fields), zip(*columns))))
+
+    def decode_columns(self, data):
+        """ Поля и столбцы снимка; для записей с разным набором полей — None и список записей """
+        if not data.startswith(self.MAGIC) or len(data) <= len(self.MAGIC):
+            raise ValueError('Файл не является двоичным снимком хранилища')
+        version = data[len(self.MAGIC)]
+        if version == 1:
+            try:
+                return None, marshal.loads(data[len(self.MAGIC) + 1:])
+            except (ValueError, EOFError, TypeError):
+                raise ValueError('Двоичный снимок формата 1 (marshal) не читается этой версией Python: '
+                                 'откройте хранилище версией, которая его записала, и сохраните снимок заново')
+        if version != self.VERSION:
+            raise ValueError(f'Неизвестная версия двоичного снимка: {version}')
+        pos = len(self.MAGIC) + 1 + self.HEADER.size
+        size, = self.HEADER.unpack_from(data, pos - self.HEADER.size)
+        header = JSON_CODEC.decode(data[pos:pos + size])
+        pos += size
+        blobs = []
+        for size in header['sizes']:
+            blobs.append(data[pos:pos + size])
+            pos += size
+        if pos != len(data):
+            raise ValueError('Двоичный снимок повреждён: размер данных не совпадает с заголовком')
+        fields = header['fields']
+        if fields is None:
+            return None, JSON_CODEC.decode(blobs[0])
+        return fields, [self._decode_column(kind, blob) for kind, blob in zip(header['columns'], blobs)]
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+
+
+class BackgroundWriter:
+    """ Поток фоновой записи файлов с ограниченной очередью """
+    QUEUE_SIZE = 256
+
+    def __init__(self):
+        self.queue = queue.Queue(self.QUEUE_SIZE)
+        self._required = 0 # задания, которые нужно дописать до выхода
+        self._done = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, job, required=True, wait=False):
+        """ Постановка задания в очередь, при wait=True возвращается его отметка для ожидания """
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pa-writer', daemon=True)
+                self._thread.start()
+        if required:
+            with self._done:
+                self._required += 1
+        done = {'event': threading.Event(), 'error': None} if wait else None
+        self.queue.put((job, required, done)) # при заполненной очереди вызывающий ждёт
+        return done
+
+    @staticmethod
+    def wait(done):
+        """ Ожидание выполнения задания и передача его ошибки вызывающему """
+        done['event'].wait()
+        if done['error'] is not None:
+            raise done['error']
+
+    def _run(self):
+        while True:
+            job, required, done = self.queue.get()
+            try:
+                job()
+            except BaseException as error:
+                if done is not None:
+                    done['error'] = error
+                else:
+                    traceback.print_exc()
+            finally:
+                if done is not None:
+                    done['event'].set()
+                if required:
+                    with self._done:
+                        self._required -= 1
+                        self._done.notify_all()
+
+    def drain(self):
+        """ Ожидание записи всех обязательных заданий """
+        with self._done:
+            self._done.wait_for(lambda: self._required == 0)
+
+
+# Общий для процесса поток записи
+WRITER = BackgroundWriter()
+
+
+@lru_cache(maxsize=8192)
+def parse_date(value):
+    """ Дата из строки ДД-ММ-ГГГГ, разбор вручную в разы быстрее strptime """
+    # Дат в журнале немного, поэтому одинаковые объекты date переиспользуются из кеша
+    day, month, year = value.split('-')
+    return date(int(year), int(month), int(day))
+
+
+def parse_datetime(value):
+    """ Дата и время из строки ДД-ММ-ГГГГ ЧЧ:ММ:СС """
+    day_part, _, time_part = value.partition(' ')
+    day, month, year = day_part.split('-')
+    hour, minute, second = time_part.split(':')
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+
+
+class Record:
+    """ Запись хранилища: поля в __slots__, даты хранятся разобранными """
+    __slots__ = ()
+    FIELDS = ()
+    # Поля-даты: {поле: date или datetime}, в файлах хранятся как ДД-ММ-ГГГГ [ЧЧ:ММ:СС]
+    DATE_FIELDS = {}
+    # Поля, значения которых приводятся при загрузке, остальные берутся как есть
+    PARSED_FIELDS = ('id',)
+    # Поля-числа: импортируемая запись без конечного числа в них некорректна
+    NUMERIC_FIELDS = ()
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, self.parse(field, values.get(field)))
+
+    @classmethod
+    def from_dict(cls, values):
+        """ Запись из словаря в формате хранения """
+        record = cls.__new__(cls)
+        get = values.get
+        for field in cls.FIELDS:
+            setattr(record, field, get(field))
+        for field in cls.PARSED_FIELDS:
+            setattr(record, field, cls.parse(field, getattr(record, field)))
+        return record
+
+    @classmethod
+    def from_dicts(cls, rows):
+        """ Список записей из словарей формата хранения """
+        # Словари из одних строк и чисел сборщик мусора не отслеживает, а записи со __slots__ отслеживает:
+        # без паузы загрузка большого файла запускает полные проходы сборщика снова и снова
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [cls.from_dict(i) for i in rows]
+        finally:
+            if enabled:
+                gc.enable()
+
+    @classmethod
+    def from_columns(cls, columns):
+        """ Список записей из столбцов в порядке FIELDS в формате хранения """
+        columns = list(columns)
+        for i, field in enumerate(cls.FIELDS):
+            if field in cls.PARSED_FIELDS:
+                columns[i] = [cls.parse(field, value) for value in columns[i]]
+        return cls.from_tuples(zip(*columns))
+
+    @classmethod
+    def from_tuples(cls, rows):
+        """ Список записей из кортежей значений в порядке FIELDS, уже приведённых parse """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            records = []
+            for values in rows:
+                record = cls.__new__(cls)
+                for field, value in zip(cls.FIELDS, values):
+                    setattr(record, field, value)
+                records.append(record)
+            return records
+        finally:
+            if enabled:
+                gc.enable()
+
+    @classmethod
+    def parse(cls, field, value):
+        """ Значение поля из формата хранения """
+        kind = cls.DATE_FIELDS.get(field)
+        if kind is not None and isinstance(value, str):
+            try:
+                return parse_date(value) if kind is date else parse_datetime(value)
+            except ValueError:
+                return value # некорректное значение остаётся строкой
+        if field == 'id' and isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+    @staticmethod
+    def format(value):
+        """ Значение поля в формате хранения """
+        if isinstance(value, datetime):
+            return (f'{value.day:02d}-{value.month:02d}-{value.year} '
+                    f'{value.hour:02d}:{value.minute:02d}:{value.second:02d}')
+        if isinstance(value, date):
+            return f'{value.day:02d}-{value.month:02d}-{value.year}'
+        return value
+
+    def to_dict(self):
+        """ Запись в словарь формата хранения """
+        return {i: self.format(getattr(self, i)) for i in self.FIELDS}
+
+    def text(self, field):
+        """ Значение поля для вывода """
+        return str(self.format(self[field]))
+
+    # Доступ как к словарю: record['title'], record.get('id'), record.update({...})
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        setattr(self, field, self.parse(field, value))
+
+    def __contains__(self, field):
+        return field in self.FIELDS
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def update(self, changes):
+        for field, value in changes.items():
+            self[field] = value
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, i) == getattr(other, i) for i in self.FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(f"{i}={getattr(self, i)!r}" for i in self.FIELDS)})'
+
+
+class NoteRecord(Record):
+    __slots__ = FIELDS = ('id', 'title', 'content', 'timestamp')
+    DATE_FIELDS = {'timestamp': datetime}
+    PARSED_FIELDS = ('id', 'timestamp')
+
+
+class TaskRecord(Record):
+    __slots__ = FIELDS = ('id', 'title', 'description', 'done', 'priority', 'due_date')
+    DATE_FIELDS = {'due_date': date}
+    PARSED_FIELDS = ('id', 'done', 'due_date')
+
+    @classmethod
+    def parse(cls, field, value):
+        """ Значение поля из формата хранения, done из CSV приходит строкой """
+        if field == 'done' and isinstance(value, str):
+            return value.strip().lower() == 'true'
+        return super().parse(field, value)
+
+
+class ContactRecord(Record):
+    __slots__ = FIELDS = ('id', 'name', 'phone', 'email')
+
+
+class FinanceEntry(Record):
+    __slots__ = FIELDS = ('id', 'amount', 'category', 'date', 'description')
+    DATE_FIELDS = {'date': date}
+    PARSED_FIELDS = ('id', 'date')
+    NUMERIC_FIELDS = ('amount',)
 
-import pandas as pd
-from datetime import datetime, timedelta
 
 class MainManager:
-    def __init__(self, path):
-        if os.path.exists(path):
-            with open(path) as f:
-                self.data = json.load(f)
+    # Число операций в журнале, после которого он сворачивается в снимок
+    COMPACT_THRESHOLD = 1000
+    # Уровни надёжности записи:
+    # none — фоновая запись, при выходе теряются изменения окна отложенного сохранения, exit — при выходе
+    # дописываются и они, fsync — каждая фиксация ждёт записи на диск. Зафиксированное под блокировкой
+    # дописывается при любом уровне: его версию уже видят другие процессы
+    DURABILITY_LEVELS = ('none', 'exit', 'fsync')
+    DURABILITY = os.environ.get('PA_DURABILITY', 'exit')
+    # Формат снимков в каталоге данных: json (data/<kind>.json) или binary (data/<kind>.bin)
+    SNAPSHOT_FORMATS = ('json', 'binary')
+    SNAPSHOT_FORMAT = os.environ.get('PA_SNAPSHOT', 'json')
+    # Поля, по которым поиск идёт через хеш-индекс
+    INDEXED_FIELDS = ('title', 'id', 'name', 'phone', 'category', 'date')
+    # Размер пакета записей при потоковом импорте
+    IMPORT_CHUNKSIZE = 10000
+    # Число процессов для импорта нескольких файлов, 0 — по числу ядер
+    IMPORT_WORKERS = int(os.environ.get('PA_IMPORT_WORKERS', 0))
+    # Файлы меньшего суммарного размера в байтах разбираются в текущем процессе: запуск пула дороже их разбора
+    IMPORT_PARALLEL_SIZE = int(os.environ.get('PA_IMPORT_PARALLEL_SIZE', 4 << 20))
+    # CSV не меньше этого размера в байтах читается через pandas, если он установлен; 0 — всегда модулем csv.
+    # На плоских записях модуль csv оказался быстрее: pandas теряет выигрыш разбора на переводе в словари
+    CSV_PANDAS_SIZE = int(os.environ.get('PA_CSV_PANDAS_SIZE', 0))
+    # Столбцы CSV, которые приводятся к числам; остальные остаются строками, иначе телефоны +7… и 0…
+    # превратились бы в числа
+    CSV_NUMERIC_FIELDS = ('id', 'amount')
+    # Размер пакета записей и буфера файла при потоковом экспорте
+    EXPORT_BATCH_SIZE = 10000
+    EXPORT_BUFFER = 1 << 20
+
+    def __init__(self, path, record_type=None):
+        self.path = path
+        self.record_type = record_type # класс записей, None — обычные словари
+        self.fields = record_type.FIELDS if record_type is not None else None # проверяются при импорте
+        self.log_path = path + '.log'
+        self.binary_path = os.path.splitext(path)[0] + '.bin'
+        self.compressed_path = path + '.gz'
+        self.lock_path = path + '.lock'
+        self.writer_path = self.lock_path + '.writer'
+        if self.SNAPSHOT_FORMAT not in self.SNAPSHOT_FORMATS:
+            raise ValueError(f'Неизвестный формат снимка: {self.SNAPSHOT_FORMAT}. '
+                             f'Доступны: {", ".join(self.SNAPSHOT_FORMATS)}')
+        self.snapshot_format = self.SNAPSHOT_FORMAT
+        self.seq = 0 # номер последней операции
+        self.log_size = 0 # количество операций в журнале
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._inflight = 0 # задания в очереди записи
+        self._inflight_lock = threading.Lock()
+        # Строки журнала, которые допишет ещё не начатое задание: пока оно ждёт в очереди,
+        # новые операции присоединяются к нему, а не занимают очередь
+        self._log_buffer = None
+        self._log_done = None
+        self.durability = self.DURABILITY
+        if self.durability not in self.DURABILITY_LEVELS:
+            raise ValueError(f'Неизвестный уровень надёжности: {self.durability}. '
+                             f'Доступны: {", ".join(self.DURABILITY_LEVELS)}')
+        self._indexes = {} # {поле: {значение: {id: запись}}}
+        self._sorted_keys = {} # {имя: функция ключа}
+        self._sorted = {} # {имя: (ключи, записи)}, отсортированы по (ключ, id)
+        self._pending = [] # операции, ещё не записанные в журнал
+        self._tx_depth = 0 # вложенность транзакций
+        self.autosave_delay = None # окно отложенного сохранения в секундах
+        self._flush_timer = None
+        self._attached = {} # структуры, которые обновляются вместе с данными
+        # Согласование процессов: файл блокировки хранит версию (число записанных операций),
+        # поколение (число сворачиваний журнала) хранилища и процесс, который ещё дописывает файлы
+        self.version = 0
+        self.generation = 0
+        self._lock_fd = None
+        self._writer_fd = None
+        self._lock_depth = 0
+        self._publish_lock = threading.Lock()
+        self._publishing = None # версия, которую опубликует поток записи
+        self._log_offset = 0 # прочитанная часть журнала в байтах
+        self._log_id = None # устройство и inode прочитанного журнала
+        if self._open_lock() is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_SH)
+            try:
+                self._load()
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        else:
+            self._load()
+
+    def _load(self):
+        """ Чтение снимка и журнала с диска """
+        # Из снимков всех форматов читается более свежий: так переход между форматами не теряет данных
+        snapshots = [(os.path.getmtime(path), path, codec)
+                     for path, codec in ((self.path, JSON_CODEC), (self.binary_path, BINARY_CODEC),
+                                         (self.compressed_path, JSON_CODEC))
+                     if os.path.exists(path)]
+        if snapshots:
+            _, path, codec = max(snapshots, key=lambda i: i[0])
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if path == self.compressed_path:
+                raw = gzip.decompress(raw)
+            if codec is BINARY_CODEC:
+                fields, columns = codec.decode_columns(raw)
+                if self.record_type is not None and fields == list(self.record_type.FIELDS):
+                    # Столбцы двоичного снимка собираются в записи без промежуточных словарей
+                    self.data = self.record_type.from_columns(columns)
+                else:
+                    self.data = self._decode_all(columns if fields is None else codec.rows(fields, columns))
+            else:
+                self.data = self._decode_all(codec.decode(raw))
         else:
             self.data = []
+        self._indexes = {}
+        self._sorted = {}
+        self._log_offset, self._log_id = 0, None
+        if self._lock_fd is not None:
+            self.version, self.generation, _ = self._published_version()
+        self._replay()
+        self._touch()
+
+    def _stat(self):
+        """ Время изменения и размер файлов хранилища """
+        return self.stat_files(self.path)
+
+    @classmethod
+    def has_store(cls, path):
+        """ Есть ли на диске хранилище по пути снимка: снимок любого формата или журнал """
+        return any(cls.stat_files(path))
+
+    @staticmethod
+    def stat_files(path):
+        """ Время изменения и размер файлов хранилища по пути снимка, без его загрузки """
+        signature = []
+        for path in (path, os.path.splitext(path)[0] + '.bin', path + '.gz', path + '.log', path + '.log.old'):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _touch(self):
+        """ Запоминание состояния файлов после собственной записи """
+        self._signature = self._stat()
+
+    def is_stale(self):
+        """ Файлы хранилища изменены другим процессом или вручную """
+        if self._inflight:
+            return False # файлы отстают из-за собственной очереди записи
+        return self._stat() != self._signature
+
+    def file_version(self):
+        """ Подпись файлов хранилища, None — если файлы отстают от данных в памяти """
+        if self._pending or self._inflight:
+            return None
+        return self._file_signature()
+
+    def _file_signature(self):
+        """ Подпись файлов в виде, который не меняется при сохранении в JSON """
+        return [None if i is None else list(i) for i in self._stat()]
+
+    def save_derived(self, path, dump):
+        """ Запись производного от данных файла следом за очередью записи хранилища """
+        # Поток записи выполняет задания по порядку: к началу задания на диске лежат ровно те данные,
+        # из которых построен файл, и их подпись сохраняется вместе с ним
+        consistent = not self._pending
+
+        def job():
+            version = self._file_signature() if consistent else None
+            with self._atomic_open(path, 'wb') as f:
+                dump(f, version)
+
+        self._wait(self._submit(job))
+
+    def _replay(self):
+        """ Применение журнала операций поверх снимка """
+        # Операции идемпотентны по id, поэтому журнал, уже попавший в снимок, можно применить повторно
+        log_paths = [i for i in (self.log_path + '.old', self.log_path) if os.path.exists(i)]
+        if not log_paths:
+            return
+
+        records = {i['id']: i for i in self.data}
+        for log_path in log_paths:
+            entries, offset, log_id = self._read_log(log_path)
+            for entry in entries:
+                if entry['op'] == 'delete':
+                    for i in entry['ids']:
+                        records.pop(i, None)
+                else:
+                    record = self._decode(entry['record'])
+                    records[record['id']] = record
+                self.seq = max(self.seq, entry['seq'])
+                self.log_size += 1
+            if log_path == self.log_path:
+                self._log_offset, self._log_id = offset, log_id
+        self.data = list(records.values())
+
+    @staticmethod
+    def _read_log(path, offset=0):
+        """ Операции журнала с позиции offset, позиция после последней целой строки и идентификатор файла """
+        entries = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # строка дописывается или оборвана сбоем
+                try:
+                    entries.append(JSON_CODEC.loads(line))
+                except JSON_CODEC.errors:
+                    break # недописанная при сбое строка
+                offset += len(line)
+            stat = os.fstat(f.fileno())
+        return entries, offset, (stat.st_dev, stat.st_ino)
+
+    def _open_lock(self):
+        """ Дескриптор файла блокировки, None — если блокировка недоступна """
+        if fcntl is not None and self._lock_fd is None:
+            # Пока процесс дописывает файлы опубликованной версии, он держит блокировку файла .writer:
+            # ядро снимет её при завершении процесса, в том числе аварийном
+            self._writer_fd = os.open(self.writer_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._lock_fd
+
+    def _read_version(self):
+        """ Версия, поколение и процесс, который ещё дописывает файлы этой версии (0 — файлы готовы) """
+        values = os.pread(self._lock_fd, 96, 0).split()
+        if len(values) == 2:
+            values.append(b'0')
+        return tuple(int(i) for i in values) if len(values) == 3 else (0, 0, 0)
+
+    def _write_version(self, version, generation, writer=0):
+        os.pwrite(self._lock_fd, f'{version:20d} {generation:20d} {writer:10d}\n'.encode(), 0)
+
+    def _published_version(self):
+        """ Версия и поколение из файла блокировки после того, как записавший процесс допишет файлы,
+        и признак того, что он завершился, так и не дописав их """
+        delay = 0.0002
+        while True:
+            version, generation, writer = self._read_version()
+            if not writer or writer == os.getpid() and (version, generation) == (self.version, self.generation):
+                return version, generation, False
+            if not self._writer_alive():
+                # Процесс мог опубликовать версию перед тем, как снять блокировку
+                version, generation, writer = self._read_version()
+                return version, generation, bool(writer)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+
+    def _writer_alive(self):
+        """ Держит ли какой-нибудь процесс блокировку файла .writer, то есть ещё дописывает файлы """
+        # Проверка идёт через отдельный дескриптор: flock на своём дескрипторе сменил бы свою же блокировку
+        fd = os.open(self.writer_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+        return False
+
+    @contextmanager
+    def _shared(self, exclusive=True):
+        """ Работа с хранилищем под межпроцессной блокировкой, с подхватом изменений других процессов """
+        with self._lock:
+            if self._open_lock() is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
 
-    def save_file(self, kind_file, path):
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            version = None
+            try:
+                self._sync(exclusive)
+                version = self.version
+                yield
+            finally:
+                self._lock_depth -= 1
+                try:
+                    if version is not None and self.version != version:
+                        self._publish()
+                finally:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _publish(self):
+        """ Публикация новой версии хранилища для других процессов """
+        state = (self.version, self.generation)
+        if self.durability == 'fsync':
+            # Операции и так ждут записи на диск: версия публикуется после дозаписи очереди
+            WRITER.wait(WRITER.submit(lambda: None, wait=True))
+            self._write_version(*state)
+            return
+        # Блокировка снимается сразу, файлы дописывает поток записи. До публикации версии в файле блокировки
+        # стоит номер этого процесса, а сам процесс держит блокировку файла .writer: другие процессы ждут её
+        # снятия, прежде чем читать файлы хранилища. Версию публикует поток записи, выполнив последнее
+        # задание хранилища (_submit)
+        with self._publish_lock:
+            if self._inflight:
+                if self._publishing is None:
+                    fcntl.flock(self._writer_fd, fcntl.LOCK_SH)
+                self._publishing = state
+                self._write_version(*state, os.getpid())
+            else:
+                self._write_published(state)
+
+    def _publish_written(self):
+        """ Публикация версии, ожидающей записи файлов, когда у хранилища не осталось заданий в очереди """
+        with self._publish_lock:
+            if self._publishing is not None and not self._inflight:
+                self._write_published(self._publishing)
+
+    def _write_published(self, state):
+        """ Запись готовой версии и снятие блокировки .writer, вызывается под _publish_lock """
+        self._write_version(*state)
+        if self._publishing is not None:
+            self._publishing = None
+            fcntl.flock(self._writer_fd, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """ Подхват изменений других процессов: при неизменной версии — одно чтение файла блокировки """
+        if not self._lock_depth:
+            with self._shared(exclusive=False):
+                pass
+
+    def _sync(self, exclusive=True):
+        """ Дочитывание операций, записанных другими процессами, без повторного чтения всего хранилища """
+        version, generation, abandoned = self._published_version()
+        if abandoned and (exclusive or (version, generation) != (self.version, self.generation)):
+            self._recover(exclusive)
+            return
+        if (version, generation) == (self.version, self.generation):
+            return
+        try:
+            stat = os.stat(self.log_path)
+            log_id = (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            stat, log_id = None, None
+        if self._pending:
+            self._withdraw()
+        if generation == self.generation and (self._log_id is None or (
+                log_id == self._log_id and stat.st_size >= self._log_offset)):
+            entries = []
+            if stat is not None:
+                entries, self._log_offset, self._log_id = self._read_log(self.log_path, self._log_offset)
+            self.log_size += len(entries)
+            self._apply_entries(entries)
+        else:
+            # Журнал свёрнут в снимок другим процессом: хранилище перечитывается целиком
+            self._load()
+            self.seq += 1
+            self._notify()
+        self.version, self.generation = version, generation
+        if self._pending:
+            self._rebase()
+        self._touch()
+
+    def _recover(self, exclusive):
+        """ Перечитывание хранилища, которое процесс изменил и завершился, не дописав файлы """
+        if self._pending:
+            self._withdraw()
+        self._load()
+        self.seq += 1
+        self._notify()
+        if exclusive:
+            # Оборванная строка в конце журнала отрезается, иначе к ней приклеится следующая запись;
+            # новое поколение заставит остальные процессы перечитать хранилище
+            if self._log_id is not None and os.path.getsize(self.log_path) > self._log_offset:
+                os.truncate(self.log_path, self._log_offset)
+            self.generation += 1
+            self._write_version(self.version, self.generation)
+        if self._pending:
+            self._rebase()
+        self._touch()
+
+    def _apply_entries(self, entries):
+        """ Применение операций журнала к данным в памяти вместе с индексами и подключёнными структурами """
+        ids = self._index('id')
+        for entry in entries:
+            self.seq += 1
+            if entry['op'] == 'delete':
+                removed = [next(iter(ids[i].values())) for i in entry['ids'] if i in ids]
+                if removed:
+                    removed_ids = {i['id'] for i in removed}
+                    self.data[:] = [i for i in self.data if i['id'] not in removed_ids]
+                    for record in removed:
+                        self._remove_from_indexes(record)
+                        self._remove_from_sorted(record)
+                    self._notify(list(removed_ids), ())
+                continue
+
+            record = self._decode(entry['record'])
+            bucket = ids.get(record['id'])
+            if not bucket:
+                self.data.append(record)
+                self._add_to_indexes(record)
+                self._add_to_sorted(record)
+                self._notify((), (record,))
+                continue
+            current = next(iter(bucket.values()))
+            changes = {i: record[i] for i in (self.fields or record.keys()) if current.get(i) != record[i]}
+            if changes:
+                self._remove_from_indexes(current, changes)
+                self._remove_from_sorted(current)
+                current.update(changes)
+                self._add_to_indexes(current, changes)
+                self._add_to_sorted(current)
+                self._notify((current['id'],), (current,))
+
+    def _withdraw(self):
+        """ Снятие из памяти своих ещё не записанных вставок: они всегда в конце данных """
+        inserted = {i['record']['id'] for i in self._pending if i['op'] == 'insert'}
+        removed = []
+        while self.data and self.data[-1]['id'] in inserted:
+            record = self.data.pop()
+            self._remove_from_indexes(record)
+            self._remove_from_sorted(record)
+            removed.append(record['id'])
+        if removed:
+            self.seq += 1
+            self._notify(removed, ())
+
+    def _rebase(self):
+        """ Свои ещё не записанные операции переносятся поверх чужих, устаревшие id выдаются заново """
+        ids = self._index('id')
+        renamed, pending = {}, []
+        for entry in self._pending:
+            if entry['op'] == 'delete':
+                entry['ids'] = [renamed.get(i, i) for i in entry['ids']]
+            else:
+                record = entry['record']
+                if entry['op'] == 'insert':
+                    # id не меньше следующего свободного: данные остаются упорядоченными по id
+                    if record['id'] < self.next_id():
+                        renamed[record['id']] = record['id'] = self.next_id()
+                else:
+                    record['id'] = renamed.get(record['id'], record['id'])
+                    if record['id'] not in ids:
+                        continue # запись удалена другим процессом
+            pending.append(entry)
+            self._apply_entries([entry])
+        self._pending = pending
+
+    def _log(self, op, **fields):
+        """ Запись операции в конец журнала """
+        with self._lock:
+            self.seq += 1
+            entry = {'seq': self.seq, 'op': op, **fields}
+            # В транзакции и при отложенном сохранении операции копятся в памяти
+            if self._tx_depth or self.autosave_delay is not None:
+                self._pending.append(entry)
+                if not self._tx_depth:
+                    self._schedule_flush()
+                return
+            self._write_log([entry])
+
+    def _write_log(self, entries):
+        """ Запись пакета операций одним обращением к файлу """
+        with self._lock:
+            # Пакет, который всё равно привёл бы к сворачиванию, сразу пишется снимком
+            if len(entries) > 1 and self.log_size + len(entries) >= self.COMPACT_THRESHOLD:
+                self.compact()
+                return
+            self.log_size += len(entries)
+            self.version += len(entries)
+            text = ''.join(JSON_CODEC.dumps(i) + '\n' for i in entries)
+            with self._inflight_lock:
+                buffer = self._log_buffer
+                if buffer is not None:
+                    buffer.append(text)
+                    done = self._log_done
+            if buffer is None:
+                buffer = self._log_buffer = [text]
+                done = self._log_done = self._submit(lambda: self._append_buffer(buffer))
+
+        if self.log_size >= self.COMPACT_THRESHOLD:
+            self.compact(background=True)
+        self._wait(done)
+
+    def _append_buffer(self, buffer):
+        """ Дозапись накопленных строк журнала, выполняется потоком записи """
+        with self._inflight_lock:
+            if self._log_buffer is buffer:
+                self._log_buffer = None
+            text = ''.join(buffer)
+        self._append_log(text)
+
+    def _restart_log_buffer(self):
+        """ Операции после снимка дописываются отдельным заданием, уже после его записи """
+        with self._inflight_lock:
+            self._log_buffer = None
+
+    def _append_log(self, text):
+        """ Дозапись журнала, выполняется потоком записи """
+        with open(self.log_path, 'ab') as f:
+            f.write(text.encode())
+            if self.durability == 'fsync':
+                f.flush()
+                os.fsync(f.fileno())
+            # До публикации версии журнал дописывает только этот процесс: позиция конца — прочитанная часть
+            stat = os.fstat(f.fileno())
+            self._log_offset, self._log_id = f.tell(), (stat.st_dev, stat.st_ino)
+        self._touch()
+
+    def _submit(self, job, wait=None):
+        """ Передача записи в фоновый поток с учётом уровня надёжности, wait=True — с отметкой для ожидания """
+        with self._inflight_lock:
+            self._inflight += 1
+
+        def run():
+            try:
+                job()
+            finally:
+                with self._inflight_lock:
+                    self._inflight -= 1
+                self._publish_written()
+
+        # Задание обязательно при любом уровне надёжности: версию, которую оно дописывает, другие процессы
+        # уже видят в файле блокировки и будут ждать её файлов
+        return WRITER.submit(run, wait=self.durability == 'fsync' if wait is None else wait)
+
+    @staticmethod
+    def _wait(done):
+        """ Ожидание синхронной записи (уровень fsync) """
+        if done is not None:
+            WRITER.wait(done)
+
+    def flush(self):
+        """ Запись накопленных операций """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._tx_depth or not self._pending:
+                return
+            with self._shared():
+                # Подхват чужих изменений мог перенести накопленные операции на новые id
+                entries, self._pending = self._pending, []
+                self._write_log(entries)
+
+    def _schedule_flush(self):
+        """ Отложенная запись: все изменения в пределах окна попадают в одну запись """
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.autosave_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def set_autosave(self, delay):
+        """ Включение отложенного сохранения с окном delay секунд, None — запись сразу """
+        with self._lock:
+            self.autosave_delay = delay
+            if delay is None:
+                self.flush()
+            else:
+                _BUFFERED_MANAGERS.add(self)
+
+    @contextmanager
+    def transaction(self):
+        """ Пакет изменений: записывается одним обращением при выходе, при ошибке откатывается """
+        # Блокировка хранилища держится всю транзакцию: другие процессы не пишут между чтением и записью
+        with self._shared():
+            with self._lock:
+                if not self._tx_depth and self._compacting:
+                    # Изменения транзакции могут откатиться, поэтому не должны попасть в сериализуемый снимок
+                    WRITER.wait(WRITER.submit(lambda: None, wait=True))
+                self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                with self._lock:
+                    self._tx_depth -= 1
+                    if not self._tx_depth:
+                        # Откат: несохранённые операции отбрасываются, данные перечитываются с диска
+                        self._pending = []
+                        seq = self.seq
+                        WRITER.wait(WRITER.submit(lambda: None, wait=True))
+                        self._load()
+                        self.seq = max(self.seq, seq) + 1
+                        self._notify()
+                raise
+            else:
+                with self._lock:
+                    self._tx_depth -= 1
+                    if not self._tx_depth:
+                        self.flush()
+
+    def compact(self, background=False):
+        """ Сворачивание журнала операций в снимок """
+        with self._shared():
+            if self._compacting and background:
+                return
+            # Под блокировкой копируется только список записей, сериализует его поток записи. Запись,
+            # изменённая после этого, может попасть в снимок уже новой: её операция есть в журнале
+            # после снимка и применяется поверх него повторно
+            records = list(self.data)
+            self._restart_log_buffer()
+            self._pending = [] # накопленные операции уже входят в снимок
+            self.log_size = 0
+            self._compacting = True
+            # Новое поколение: другие процессы перечитают снимок, а не продолжат журнал
+            self.version += 1
+            self.generation += 1
+            done = self._submit(lambda: self._write_snapshot(records), wait=None if background else True)
+        self._wait(done)
+
+    def _write_snapshot(self, records):
+        """ Сериализация и запись снимка хранилища, выполняется потоком записи """
+        old_path = self.log_path + '.old'
+        try:
+            snapshot = [self._encode(i) for i in records]
+            # Текущий журнал откладывается до записи снимка, новые операции пишутся в новый файл
+            if os.path.exists(self.log_path):
+                if os.path.exists(old_path):
+                    with open(self.log_path) as src, open(old_path, 'a') as dst:
+                        dst.write(src.read())
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, old_path)
+            self._log_offset, self._log_id = 0, None
+
+            if self.snapshot_format == 'binary':
+                path, codec = self.binary_path, BINARY_CODEC
+            else:
+                path, codec = self.path, JSON_CODEC
+            with self._atomic_open(path, 'wb') as f:
+                f.write(codec.encode(snapshot))
+            for i in (old_path, self.compressed_path):
+                if os.path.exists(i):
+                    os.remove(i)
+            self._touch()
+        finally:
+            self._compacting = False
+
+    def compress(self):
+        """ Замена снимка и журнала сжатым снимком: для данных, которые больше не меняются """
+        with self._shared():
+            snapshot = [self._encode(i) for i in self.data]
+            self._restart_log_buffer()
+            self._pending = []
+            self.log_size = 0
+            self.version += 1
+            self.generation += 1
+            done = self._submit(lambda: self._write_compressed(snapshot), wait=True)
+        self._wait(done)
+
+    def _write_compressed(self, snapshot):
+        """ Запись сжатого снимка, выполняется потоком записи """
+        with self._atomic_open(self.compressed_path, 'wb') as f:
+            f.write(gzip.compress(JSON_CODEC.encode(snapshot)))
+        # Снимок и журнал удаляются после записи сжатой копии: при сбое остаётся одно из двух
+        for i in (self.path, self.binary_path, self.log_path, self.log_path + '.old'):
+            if os.path.exists(i):
+                os.remove(i)
+        self._log_offset, self._log_id = 0, None
+        self._touch()
+
+    @contextmanager
+    def _atomic_open(self, path, mode='w', **kwargs):
+        """ Запись во временный файл с атомарной заменой: при сбое прежний файл остаётся целым """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+            if self.durability == 'fsync':
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if self.durability == 'fsync':
+            # Переименование надёжно только после синхронизации каталога
+            fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _decode(self, values):
+        """ Запись из словаря формата хранения """
+        return self.record_type.from_dict(values) if self.record_type is not None else values
+
+    def _decode_all(self, rows):
+        """ Список записей из списка словарей формата хранения """
+        return self.record_type.from_dicts(rows) if self.record_type is not None else rows
+
+    def _encode(self, record):
+        """ Словарь формата хранения из записи """
+        return record.to_dict() if self.record_type is not None else dict(record)
+
+    def _parse(self, key_dict, key_result):
+        """ Значение для поиска в том же виде, в каком хранится поле записи """
+        return self.record_type.parse(key_dict, key_result) if self.record_type is not None else key_result
+
+    def _index(self, key_dict):
+        """ Хеш-индекс по полю, строится при первом обращении """
+        index = self._indexes.get(key_dict)
+        if index is None:
+            index = {}
+            # Как и при загрузке: сотни тысяч новых словарей без паузы сборщика строятся вдвое дольше
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                for i in self.data:
+                    index.setdefault(i[key_dict], {})[i['id']] = i
+            finally:
+                if enabled:
+                    gc.enable()
+            self._indexes[key_dict] = index
+        return index
+
+    def _add_to_indexes(self, record, fields=None):
+        """ Добавление записи в построенные индексы """
+        for key_dict, index in self._indexes.items():
+            if fields is None or key_dict in fields:
+                index.setdefault(record[key_dict], {})[record['id']] = record
+
+    def _remove_from_indexes(self, record, fields=None):
+        """ Удаление записи из построенных индексов """
+        for key_dict, index in self._indexes.items():
+            if fields is None or key_dict in fields:
+                bucket = index.get(record[key_dict])
+                if bucket is not None:
+                    bucket.pop(record['id'], None)
+                    if not bucket:
+                        del index[record[key_dict]]
+
+    @staticmethod
+    def date_key(date):
+        """ Сортируемый ключ даты вида ГГГГММДД из строки ДД-ММ-ГГГГ [ЧЧ:ММ:СС] или объекта date """
+        if isinstance(date, str):
+            try:
+                day, month, year = date.split(' ')[0].split('-')
+                return int(year) * 10000 + int(month) * 100 + int(day)
+            except ValueError:
+                return 0 # некорректные даты оказываются в начале индекса
+        return date.year * 10000 + date.month * 100 + date.day
+
+    def add_sorted_index(self, name, key_func):
+        """ Регистрация отсортированного индекса, строится при первом обращении """
+        if name not in self._sorted_keys:
+            self._sorted_keys[name] = key_func
+
+    def _require_sorted(self, name):
+        """ Проверка, что отсортированный индекс зарегистрирован: без него отбор по диапазону невозможен """
+        if name not in self._sorted_keys:
+            raise ValueError(f'Отбор по диапазону недоступен: у хранилища {os.path.basename(self.path)} '
+                             f'нет упорядоченного индекса {name!r}')
+
+    def _sorted_index(self, name):
+        """ Отсортированный индекс по имени """
+        index = self._sorted.get(name)
+        if index is None:
+            self._require_sorted(name)
+            key_func = self._sorted_keys[name]
+            # Сортируются номера записей по готовым ключам: пары (ключ, запись) сравнивались бы медленнее,
+            # а сотни тысяч новых кортежей без паузы сборщика запускают его полные проходы
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                keys = [(key_func(i), i['id']) for i in self.data]
+                order = sorted(range(len(keys)), key=keys.__getitem__)
+                index = ([keys[i] for i in order], [self.data[i] for i in order])
+            finally:
+                if enabled:
+                    gc.enable()
+            self._sorted[name] = index
+        return index
+
+    def _add_to_sorted(self, record):
+        """ Добавление записи в построенные отсортированные индексы """
+        for name, (keys, records) in self._sorted.items():
+            key = (self._sorted_keys[name](record), record['id'])
+            i = bisect_right(keys, key)
+            keys.insert(i, key)
+            records.insert(i, record)
+
+    def _remove_from_sorted(self, record):
+        """ Удаление записи из построенных отсортированных индексов """
+        for name, (keys, records) in self._sorted.items():
+            key = (self._sorted_keys[name](record), record['id'])
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+                del records[i]
+
+    def range_data(self, name, start, end, limit=None):
+        """ Записи с ключом отсортированного индекса в диапазоне [start, end], не больше limit первых """
+        keys, records = self._sorted_index(name)
+        lo = bisect_left(keys, (start,))
+        hi = bisect_right(keys, (end, float('inf')))
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return records[lo:hi]
+
+    def attach(self, name, factory):
+        """ Производная структура, которая обновляется вместе с данными, а не пересобирается """
+        # У структуры два метода: apply(removed_ids, added_records) после изменения и reset() после замены данных
+        attached = self._attached.get(name)
+        if attached is None:
+            attached = self._attached[name] = factory(self)
+        return attached
+
+    def _notify(self, removed=None, added=None):
+        """ Передача изменения подключённым структурам, без аргументов — данные заменены целиком """
+        for i in self._attached.values():
+            if removed is None and added is None:
+                i.reset()
+            else:
+                i.apply(removed, added)
+
+    def count(self):
+        """ Количество записей в хранилище """
+        return len(self.data)
+
+    def next_id(self):
+        """ Следующий свободный id """
+        if len(self.data) == 0:
+            return 1
+        return self.data[-1]['id'] + 1
+
+    def insert_data(self, record, keep_id=False):
+        """ Добавление записи, keep_id — с прежним id на своё место по порядку (перенос между хранилищами) """
+        with self._shared():
+            if keep_id:
+                self.data.insert(bisect_left(self.data, record['id'], key=lambda i: i['id']), record)
+            else:
+                # id выдан до блокировки: если другой процесс успел добавить записи, выдаётся следующий
+                if record['id'] < self.next_id():
+                    record['id'] = self.next_id()
+                self.data.append(record)
+            self._add_to_indexes(record)
+            self._add_to_sorted(record)
+            self._log('insert', record=self._encode(record))
+            self._notify((), (record,))
+
+    def update_data(self, record, changes):
+        """ Обновление полей записи """
+        with self._shared():
+            # После подхвата чужих изменений запись могла смениться или быть удалена другим процессом
+            bucket = self._index('id').get(record['id'])
+            if not bucket:
+                return
+            record = next(iter(bucket.values()))
+            # При смене id запись переиндексируется целиком
+            old_id = record['id']
+            fields = None if 'id' in changes else changes
+            self._remove_from_indexes(record, fields)
+            self._remove_from_sorted(record)
+            record.update(changes)
+            self._add_to_indexes(record, fields)
+            self._add_to_sorted(record)
+            self._log('update', record=self._encode(record))
+            self._notify((old_id,), (record,))
+
+    def iter_records(self, date_from=None, date_to=None, **equals):
+        """ Записи, подходящие под фильтры: период по индексу 'date' и равенство полей """
+        if date_from is not None or date_to is not None:
+            records = self.range_data('date',
+                                      0 if date_from is None else self.date_key(date_from),
+                                      float('inf') if date_to is None else self.date_key(date_to))
+        else:
+            records = self.data
+        if not equals:
+            return iter(records)
+        equals = {k: self._parse(k, v) for k, v in equals.items()}
+        return (i for i in records if all(i[k] == v for k, v in equals.items()))
+
+    @staticmethod
+    def _batches(records, size):
+        """ Разбиение потока записей на пакеты фиксированного размера """
+        records = iter(records)
+        while True:
+            batch = list(islice(records, size))
+            if not batch:
+                return
+            yield batch
+
+    def save_file(self, kind_file, path, batch_size=None, **filters):
         """ Экспорт файла """
+        if batch_size is None:
+            batch_size = self.EXPORT_BATCH_SIZE
+        records = (self._encode(i) for i in self.iter_records(**filters))
 
         if kind_file == 'json':
-            with open(path, 'w') as f:
-                json.dump(self.data, f)
+            with self._atomic_open(path, buffering=self.EXPORT_BUFFER) as f:
+                f.write('[')
+                separator = ''
+                for batch in self._batches(records, batch_size):
+                    f.write(separator + ', '.join(json.dumps(i) for i in batch))
+                    separator = ', '
+                f.write(']')
+        elif kind_file == 'jsonl':
+            with self._atomic_open(path, buffering=self.EXPORT_BUFFER) as f:
+                for batch in self._batches(records, batch_size):
+                    f.write(''.join(json.dumps(i) + '\n' for i in batch))
         else:
-            df = pd.DataFrame(self.data)
-            df.to_csv(path)
-
-    def load_file(self, kind_file, path_import, path_home):
-        """ Импорт файла """
+            with self._atomic_open(path, newline='', buffering=self.EXPORT_BUFFER) as f:
+                writer = None
+                for batch in self._batches(records, batch_size):
+                    if writer is None:
+                        fields = self.fields if self.fields is not None else list(batch[0])
+                        writer = csv.DictWriter(f, fields, extrasaction='ignore')
+                        writer.writeheader()
+                    writer.writerows(batch)
+
+        if os.path.abspath(path) == os.path.abspath(self.path):
+            self._touch()
+
+    @staticmethod
+    def _iter_json_array(f, buffer_size=1 << 16):
+        """ Поэлементный разбор JSON-массива без чтения файла целиком """
+        decoder = json.JSONDecoder()
+        buffer, pos, eof = '', 0, False
+        state = 'start' # start -> first -> (value -> sep)*
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError('Файл JSON оборван: массив не закрыт')
+                chunk = f.read(buffer_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, chunk == ''
+                continue
+
+            char = buffer[pos]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError('Файл JSON должен содержать массив записей')
+                pos += 1
+                state = 'first'
+            elif state in ('first', 'sep') and char == ']':
+                return
+            elif state == 'sep':
+                if char != ',':
+                    raise ValueError(f'Ошибка в файле JSON: ожидалась запятая, получено {char!r}')
+                pos += 1
+                state = 'value'
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    end = None
+                # Значение могло оборваться на границе буфера — дочитываем файл
+                if (end is None or end == len(buffer)) and not eof:
+                    chunk = f.read(buffer_size)
+                    buffer, pos, eof = buffer[pos:] + chunk, 0, chunk == ''
+                    continue
+                if end is None:
+                    raise ValueError('Ошибка в файле JSON: некорректная запись')
+                yield item
+                pos = end
+                state = 'sep'
+
+    @classmethod
+    def _iter_import(cls, kind_file, path_import, chunksize):
+        """ Пакеты записей из импортируемого файла """
         if kind_file == 'json':
             with open(path_import) as f:
-                self.data = json.load(f)
+                batch = []
+                for item in cls._iter_json_array(f):
+                    batch.append(item)
+                    if len(batch) >= chunksize:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+        elif cls.CSV_PANDAS_SIZE and os.path.getsize(path_import) >= cls.CSV_PANDAS_SIZE and pd.available():
+            for df in pd.read_csv(path_import, chunksize=chunksize, dtype=str, keep_default_na=False):
+                # Столбец индекса, записанный при экспорте в CSV, не является полем записи
+                df = df.loc[:, ~df.columns.str.startswith('Unnamed:')]
+                yield cls._csv_records(list(df.columns), [df[i].tolist() for i in df.columns])
         else:
-            df = pd.read_csv(path_import)
-            self.data = df.to_csv()
+            with open(path_import, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    return
+                # Столбец индекса без имени, записанный при экспорте в CSV, не является полем записи
+                columns = [(i, name) for i, name in enumerate(header) if name and not name.startswith('Unnamed:')]
+                while True:
+                    rows = list(islice(reader, chunksize))
+                    if not rows:
+                        return
+                    yield cls._csv_records([name for _, name in columns],
+                                           [[row[i] if i < len(row) else '' for row in rows] for i, _ in columns])
+
+    @classmethod
+    def _csv_records(cls, names, columns):
+        """ Записи из строковых столбцов CSV: числа только в CSV_NUMERIC_FIELDS, пустые ячейки — None """
+        values = [[cls._parse_csv_number(i) for i in column] if name in cls.CSV_NUMERIC_FIELDS
+                  else [None if i == '' else i for i in column] for name, column in zip(names, columns)]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    @staticmethod
+    def _parse_csv_number(value):
+        """ Ячейка числового столбца CSV: число, None для пустой, иначе строка как есть — её отбросит проверка """
+        if value == '':
+            return None
+        for convert in (int, float):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+        return value
 
-        self.save_file('json', path_home)
+    @staticmethod
+    def _is_valid(item, record_type):
+        """ Импортируемая запись — словарь со всеми полями, кроме, может быть, id, и с числами в NUMERIC_FIELDS """
+        if not isinstance(item, dict):
+            return False
+        if record_type is None:
+            return True
+        if not all(i in item for i in record_type.FIELDS if i != 'id'):
+            return False
+        for field in record_type.NUMERIC_FIELDS:
+            value = item[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return False
+        return True
+
+    def _validate(self, item):
+        """ Проверка импортируемой записи, None — если запись некорректна """
+        if not self._is_valid(item, self.record_type):
+            return None
+        return item if self.fields is None else self.record_type.from_dict(item)
+
+    @staticmethod
+    def _renumber(records, last_id):
+        """ Установка id: сохраняется, если не нарушает возрастание, иначе выдаётся следующий; возвращает последний """
+        for record in records:
+            id_record = record.get('id')
+            if isinstance(id_record, float) and id_record.is_integer():
+                id_record = int(id_record)
+            if not isinstance(id_record, int) or isinstance(id_record, bool) or id_record <= last_id:
+                id_record = last_id + 1
+            record['id'] = last_id = id_record
+        return last_id
+
+    @staticmethod
+    def print_progress(count, rejected, duplicates=None):
+        """ Вывод хода импорта """
+        suffix = '' if duplicates is None else f', повторов: {duplicates}'
+        print(f'Загружено записей: {count}, пропущено некорректных: {rejected}{suffix}')
+
+    def _clear(self):
+        """ Очистка хранилища перед импортом """
+        self.data = []
+        self._indexes = {}
+        self._sorted = {}
+        self.seq += 1 # новая версия хранилища для производных структур
+
+    def _append_batch(self, records):
+        """ Добавление пакета импортированных записей """
+        self.data.extend(records)
+
+    def _finish_import(self, path_home):
+        """ Сохранение результата импорта """
+        if path_home == self.path:
+            self.compact() # снимок заменяет и прежний журнал
+        else:
+            self.save_file('json', path_home)
+
+    def load_file(self, kind_file, path_import, path_home, chunksize=None, progress=None):
+        """ Импорт файла; каталог или шаблон glob импортируются всеми файлами сразу через load_files """
+        if os.path.isdir(path_import) or (glob.has_magic(path_import) and not os.path.isfile(path_import)):
+            return self.load_files(kind_file, self.import_paths(kind_file, path_import), path_home,
+                                   chunksize=chunksize, progress=progress)
+        if chunksize is None:
+            chunksize = self.IMPORT_CHUNKSIZE
+        # Файл разбирается и проверяется до изменения хранилища: ошибка в середине файла его не затрагивает
+        count, rejected, last_id = 0, 0, 0
+        staged = []
+        for batch in self._iter_import(kind_file, path_import, chunksize):
+            records = []
+            for item in batch:
+                record = self._validate(item)
+                if record is None:
+                    rejected += 1
+                else:
+                    records.append(record)
+            last_id = self._renumber(records, last_id)
+            staged.append(records)
+            count += len(records)
+            if progress is not None:
+                progress(count, rejected)
+        if not count:
+            raise ValueError(f'В файле {path_import} нет корректных записей, хранилище не изменено')
+
+        # Импорт заменяет хранилище целиком и записывается снимком под блокировкой
+        with self._shared():
+            self._clear()
+            for records in staged:
+                self._append_batch(records)
+            self._finish_import(path_home)
+            self._notify()
+        return count, rejected
+
+    @staticmethod
+    def import_paths(kind_file, pattern):
+        """ Файлы для импорта по алфавиту: все *.csv или *.json каталога либо подходящие под шаблон glob """
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, f'*.{kind_file}')
+        paths = sorted(i for i in glob.glob(pattern, recursive=True) if os.path.isfile(i))
+        if not paths:
+            raise FileNotFoundError(f'Нет файлов для импорта: {pattern}')
+        return paths
+
+    @classmethod
+    def _read_import(cls, kind_file, path_import, record_type, chunksize):
+        """ Разбор и проверка файла в процессе пула: значения полей корректных записей и число некорректных """
+        # Записи передаются кортежами значений в порядке FIELDS, уже приведёнными parse:
+        # их дешевле передать между процессами, а основному процессу остаётся только собрать записи
+        fields = None if record_type is None else record_type.FIELDS
+        parsed = [(i, field) for i, field in enumerate(fields or ()) if field in record_type.PARSED_FIELDS]
+        rows, rejected = [], 0
+        for batch in cls._iter_import(kind_file, path_import, chunksize):
+            for item in batch:
+                if not cls._is_valid(item, record_type):
+                    rejected += 1
+                elif fields is None:
+                    rows.append(item)
+                else:
+                    values = [item.get(i) for i in fields]
+                    for i, field in parsed:
+                        values[i] = record_type.parse(field, values[i])
+                    rows.append(tuple(values))
+        return rows, rejected
+
+    def _duplicate_key(self, row):
+        """ Значения записи без id: одинаковые записи из разных файлов — повтор, например пересекающиеся выписки """
+        if self.fields is None:
+            values = tuple(v for k, v in sorted(row.items()) if k != 'id')
+        else:
+            position = self.fields.index('id')
+            values = row[:position] + row[position + 1:]
+        try:
+            hash(values)
+        except TypeError: # вложенные списки и словари из JSON
+            return JSON_CODEC.encode(values)
+        return values
+
+    def load_files(self, kind_file, paths, path_home, workers=None, chunksize=None, progress=None):
+        """ Импорт нескольких файлов: разбор в процессах пула, слияние с новыми id и без повторов, одна запись """
+        paths = list(paths)
+        if chunksize is None:
+            chunksize = self.IMPORT_CHUNKSIZE
+        if workers is None:
+            workers = self.IMPORT_WORKERS or os.cpu_count() or 1
+            if sum(os.path.getsize(i) for i in paths) < self.IMPORT_PARALLEL_SIZE:
+                workers = 1
+        workers = max(1, min(workers, len(paths)))
+
+        # Все файлы разбираются до изменения хранилища: ошибка в любом из них его не затрагивает
+        args = (repeat(kind_file), paths, repeat(self.record_type), repeat(chunksize))
+        if workers > 1:
+            # spawn: дочерний процесс не наследует поток записи и блокировки текущего
+            with futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(self._read_import, *args))
+        else:
+            results = list(map(self._read_import, *args))
+        if not any(rows for rows, _ in results):
+            raise ValueError('В файлах нет корректных записей, хранилище не изменено')
+
+        # Файлы разбираются параллельно, а сливаются по порядку: результат не зависит от числа процессов.
+        # Запись, которая уже встречалась в другом файле, пропускается столько раз, сколько там встречалась
+        with self._shared():
+            self._clear()
+            count, rejected, duplicates, last_id = 0, 0, 0, 0
+            accepted = {} # {значения записи: наибольшее число повторов в одном файле}
+            key_of = self._duplicate_key
+            for rows, file_rejected in results:
+                rejected += file_rejected
+                seen = {}
+                unique = []
+                for row in rows:
+                    key = key_of(row)
+                    times = seen[key] = seen.get(key, 0) + 1
+                    if times > accepted.get(key, 0):
+                        accepted[key] = times
+                        unique.append(row)
+                duplicates += len(rows) - len(unique)
+                for batch in self._batches(unique, chunksize):
+                    records = batch if self.record_type is None else self.record_type.from_tuples(batch)
+                    last_id = self._renumber(records, last_id)
+                    self._append_batch(records)
+                count += len(unique)
+                if progress is not None:
+                    progress(count, rejected, duplicates)
+
+            self._finish_import(path_home)
+            self._notify()
+            return count, rejected, duplicates
 
     def find_data(self, key_dict, key_result):
         """ Поиск данных в хранилище по ключу """
+        key_result = self._parse(key_dict, key_result)
+        if key_dict in self.INDEXED_FIELDS:
+            return list(self._index(key_dict).get(key_result, {}).values())
         data_res = [i for i in self.data if i[key_dict] == key_result]
         return data_res
 
+    def exists(self, key_dict, key_result):
+        """ Проверка наличия записи с заданным значением поля """
+        key_result = self._parse(key_dict, key_result)
+        if key_dict in self.INDEXED_FIELDS:
+            return key_result in self._index(key_dict)
+        return any(i[key_dict] == key_result for i in self.data)
+
+    def delete_many(self, predicate=None, ids=None):
+        """ Удаление всех записей, подходящих под условие или входящих в набор id """
+        if ids is not None:
+            ids = set(ids)
+        with self._shared():
+            kept, removed = [], []
+            for i in self.data:
+                if (ids is not None and i['id'] in ids) or (predicate is not None and predicate(i)):
+                    removed.append(i)
+                else:
+                    kept.append(i)
+            if not removed:
+                return 0
+
+            self.data[:] = kept
+            for i in removed:
+                self._remove_from_indexes(i)
+                self._remove_from_sorted(i)
+            ids = [i['id'] for i in removed]
+            self._log('delete', ids=ids)
+            self._notify(ids, ())
+            return len(removed)
+
     def delete_data(self, kind_data, key_dict, key_result):
         """ Удаление данных по ключу """
         data_res = self.find_data(key_dict, key_result)
-        index_list = [self.data.index(data) for data in data_res]
         test = data_res[0] # для проверки на нахождение
 
-        for i in index_list:
-            self.data.pop(i)
+        return self.delete_many(ids=[i['id'] for i in data_res])
+
+
+class SqliteManager(MainManager):
+    """ Хранилище в SQLite с тем же интерфейсом, что и MainManager """
+    # Общий файл базы в каталоге данных
+    DB_NAME = 'assistant.db'
+
+    def __init__(self, path, record_type=None):
+        self.path = path
+        self.record_type = record_type
+        self.fields = record_type.FIELDS if record_type is not None else None
+        self.table = os.path.splitext(os.path.basename(path))[0]
+        self.db_path = os.path.join(os.path.dirname(path), self.DB_NAME)
+        self._seq = 0
+        self._sorted_keys = {}
+        self._attached = {}
+
+        self.durability = self.DURABILITY
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # Уровень надёжности соответствует режиму синхронизации SQLite
+        synchronous = {'none': 'OFF', 'exit': 'NORMAL', 'fsync': 'FULL'}[self.durability]
+        self.conn.execute(f'PRAGMA synchronous={synchronous}')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (id INTEGER PRIMARY KEY, body TEXT NOT NULL)')
+        # Поля из INDEXED_FIELDS хранятся отдельными столбцами с индексом
+        self.columns = [i for i in (self.fields or ()) if i in self.INDEXED_FIELDS and i != 'id']
+        for column in self.columns:
+            self._add_column(column)
+
+    def is_stale(self):
+        """ Данные читаются из базы при каждом запросе и не устаревают """
+        return False
+
+    @contextmanager
+    def _shared(self, exclusive=True):
+        """ Согласованием процессов занимается сама база """
+        yield
+
+    def refresh(self):
+        """ Изменения других процессов видны в базе сразу """
+
+    def file_version(self):
+        """ Подписи файлов у базы нет: производные файлы пересобираются в каждом процессе """
+        return None
+
+    def save_derived(self, path, dump):
+        """ Запись производного от данных файла без подписи хранилища """
+        def job():
+            with self._atomic_open(path, 'wb') as f:
+                dump(f, None)
+
+        done = WRITER.submit(job, required=self.durability != 'none', wait=self.durability == 'fsync')
+        self._wait(done)
+
+    @property
+    def seq(self):
+        """ Версия хранилища: свои изменения и коммиты других соединений """
+        return self._seq + self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    @property
+    def data(self):
+        """ Все записи списком — только для совместимости, читает таблицу целиком """
+        return list(self.iter_records())
+
+    def _add_column(self, column):
+        """ Добавление индексированного столбца, если его ещё нет """
+        existing = [i[1] for i in self.conn.execute(f'PRAGMA table_info({self.table})')]
+        if column not in existing:
+            self.conn.execute(f'ALTER TABLE {self.table} ADD COLUMN {column}')
+        self.conn.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_{column} ON {self.table} ({column}, id)')
+
+    def _row(self, record):
+        """ Значения столбцов записи """
+        stored = self._encode(record)
+        values = {'id': stored['id'], 'body': JSON_CODEC.dumps(stored)}
+        for column in self.columns:
+            values[column] = stored[column]
+        for name, key_func in self._sorted_keys.items():
+            values[f'sort_{name}'] = key_func(record)
+        return values
+
+    def _write_rows(self, records, replace=False):
+        """ Вставка записей одним выражением """
+        records = [self._row(i) for i in records]
+        if not records:
+            return
+        columns = list(records[0])
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        self.conn.executemany(
+            f'{verb} INTO {self.table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+            [tuple(i[c] for c in columns) for i in records])
+
+    def _select(self, where='', params=(), order='id', limit=None):
+        """ Записи по условию в порядке order """
+        if limit is not None:
+            where, params = f'{where} ORDER BY {order} LIMIT ?', (*params, limit)
+        else:
+            where = f'{where} ORDER BY {order}'
+        cursor = self.conn.execute(f'SELECT body FROM {self.table} {where}', params)
+        return (self._decode(JSON_CODEC.loads(i[0])) for i in cursor)
+
+    def _parse(self, key_dict, key_result):
+        """ Значение для поиска в том виде, в каком поле хранится в базе """
+        return Record.format(super()._parse(key_dict, key_result))
+
+    def _condition(self, key_dict):
+        """ Выражение SQL для поля записи """
+        if key_dict == 'id' or key_dict in self.columns:
+            return key_dict
+        return f"json_extract(body, '$.{key_dict}')"
+
+    def add_sorted_index(self, name, key_func):
+        """ Регистрация отсортированного индекса как столбца sort_<name> """
+        if name in self._sorted_keys:
+            return
+        self._sorted_keys[name] = key_func
+        self._add_column(f'sort_{name}')
+        # Заполнение столбца для записей, сохранённых без него (до регистрации или при миграции)
+        rows = [(key_func(i), i['id']) for i in self._select(f'WHERE sort_{name} IS NULL')]
+        if rows:
+            self.conn.executemany(f'UPDATE {self.table} SET sort_{name} = ? WHERE id = ?', rows)
+
+    def range_data(self, name, start, end, limit=None):
+        """ Записи с ключом отсортированного индекса в диапазоне [start, end], не больше limit первых """
+        self._require_sorted(name)
+        return list(self._select(f'WHERE sort_{name} BETWEEN ? AND ?', (start, end), f'sort_{name}, id', limit))
+
+    def iter_records(self, date_from=None, date_to=None, **equals):
+        """ Записи, подходящие под фильтры: период по индексу 'date' и равенство полей """
+        conditions, params = [], []
+        order = 'id'
+        if date_from is not None or date_to is not None:
+            self._require_sorted('date')
+            conditions.append('sort_date BETWEEN ? AND ?')
+            params += [0 if date_from is None else self.date_key(date_from),
+                       float('inf') if date_to is None else self.date_key(date_to)]
+            order = 'sort_date, id'
+        for key_dict, key_result in equals.items():
+            conditions.append(f'{self._condition(key_dict)} IS ?')
+            params.append(self._parse(key_dict, key_result))
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return self._select(where, params, order)
+
+    def count(self):
+        """ Количество записей в хранилище """
+        return self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def next_id(self):
+        """ Следующий свободный id """
+        return (self.conn.execute(f'SELECT MAX(id) FROM {self.table}').fetchone()[0] or 0) + 1
 
-        # Сохранение
-        path = os.path.join('data', f'{kind_data}.json')
-        with open(path, 'w') as f:
-            json.dump(self.data, f)
+    def find_data(self, key_dict, key_result):
+        """ Поиск данных в хранилище по ключу """
+        return list(self.iter_records(**{key_dict: key_result}))
+
+    def exists(self, key_dict, key_result):
+        """ Проверка наличия записи с заданным значением поля """
+        row = self.conn.execute(f'SELECT 1 FROM {self.table} WHERE {self._condition(key_dict)} IS ? LIMIT 1',
+                                (self._parse(key_dict, key_result),)).fetchone()
+        return row is not None
+
+    def insert_data(self, record):
+        """ Добавление записи """
+        self._write_rows([record])
+        self._seq += 1
+        self._notify((), (record,))
+
+    def update_data(self, record, changes):
+        """ Обновление полей записи """
+        old_id = record['id']
+        record.update(changes)
+        values = self._row(record)
+        self.conn.execute(f'UPDATE {self.table} SET {", ".join(f"{i} = ?" for i in values)} WHERE id = ?',
+                          (*values.values(), old_id))
+        self._seq += 1
+        self._notify((old_id,), (record,))
+
+    def delete_many(self, predicate=None, ids=None):
+        """ Удаление всех записей, подходящих под условие или входящих в набор id """
+        ids = set() if ids is None else set(ids)
+        if predicate is not None:
+            ids.update(i['id'] for i in self._select() if predicate(i))
+        if not ids:
+            return 0
+
+        deleted = 0
+        ids = list(ids)
+        with self.transaction():
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                deleted += self.conn.execute(f'DELETE FROM {self.table} WHERE id IN ({", ".join("?" * len(part))})',
+                                             part).rowcount
+        self._seq += 1
+        self._notify(ids, ())
+        return deleted
+
+    @contextmanager
+    def transaction(self):
+        """ Пакет изменений в одной транзакции SQLite """
+        outer = not self.conn.in_transaction
+        if outer:
+            self.conn.execute('BEGIN')
+        try:
+            yield self
+        except BaseException:
+            if outer:
+                self.conn.execute('ROLLBACK')
+                self._seq += 1
+                self._notify()
+            raise
+        else:
+            if outer:
+                self.conn.execute('COMMIT')
+
+    def flush(self):
+        """ Каждое изменение фиксируется в базе сразу """
+
+    def set_autosave(self, delay):
+        """ Отложенное сохранение не требуется: запись в базу не переписывает хранилище """
+
+    def compact(self, background=False):
+        """ Перенос журнала WAL в основной файл базы """
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def _clear(self):
+        """ Очистка таблицы перед импортом """
+        self.conn.execute(f'DELETE FROM {self.table}')
+        self._seq += 1
+
+    def _append_batch(self, records):
+        """ Добавление пакета импортированных записей """
+        self._write_rows(records)
+
+    def _finish_import(self, path_home):
+        """ Сохранение результата импорта """
+        if path_home != self.path:
+            self.save_file('json', path_home)
+
+    def load_file(self, kind_file, path_import, path_home, chunksize=None, progress=None):
+        """ Импорт файла одной транзакцией """
+        with self.transaction():
+            return super().load_file(kind_file, path_import, path_home, chunksize, progress)
+
+    def load_files(self, kind_file, paths, path_home, workers=None, chunksize=None, progress=None):
+        """ Импорт нескольких файлов одной транзакцией """
+        with self.transaction():
+            return super().load_files(kind_file, paths, path_home, workers, chunksize, progress)
+
+    def migrate_from_json(self, source=None):
+        """ Перенос записей из JSON-хранилища по тому же пути, source — уже открытое хранилище """
+        if source is None:
+            source = MainManager(self.path, self.record_type)
+        count = 0
+        with self.transaction():
+            for batch in self._batches(source.iter_records(), self.IMPORT_CHUNKSIZE):
+                self._write_rows(batch, replace=True)
+                count += len(batch)
+        self._seq += 1
+        return count
+
+
+class ShardedManager(MainManager):
+    """ Хранилище, разбитое по месяцам поля даты: data/<вид>/ГГГГ-ММ.json и манифест частей """
+    # Запись меняет только часть своего месяца, отчёт за период читает только пересекающиеся части,
+    # а прошлые месяцы не меняются и хранятся сжатыми
+    SHARD_FIELD = 'date'
+    UNDATED = 'undated' # часть для записей без даты или с некорректной датой
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, path, record_type=None):
+        self.path = path
+        self.record_type = record_type
+        self.fields = record_type.FIELDS if record_type is not None else None
+        self.dir = os.path.splitext(path)[0]
+        self.manifest_path = os.path.join(self.dir, self.MANIFEST)
+        # Файл блокировки манифеста хранит общий для частей счётчик id
+        self.lock_path = self.manifest_path + '.lock'
+        self.manifest = {'field': self.SHARD_FIELD, 'shards': {}} # {'shards': {имя: {'sealed': сжата ли}}}
+        self.shards = {} # загруженные части {имя: MainManager}
+        self.durability = self.DURABILITY
+        self.autosave_delay = None
+        self._manifest_signature = None
+        self._seq = 0
+        self._sorted_keys = {}
+        self._attached = {}
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._tx = None # транзакции затронутых частей, пока идёт общая транзакция
+        self._tx_names = set()
+        self._staged = None # импортируемые записи по частям
+
+        os.makedirs(self.dir, exist_ok=True)
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._shared():
+            if not os.path.exists(self.manifest_path):
+                self._migrate()
+
+    @contextmanager
+    def _shared(self, exclusive=True):
+        """ Работа с частями под блокировкой манифеста: список частей и счётчик id общие для процессов """
+        with self._lock:
+            if not self._lock_depth and fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    self._read_manifest()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth and fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        """ Перечитывание манифеста, если его изменил другой процесс """
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._manifest_signature:
+            return
+        with open(self.manifest_path, 'rb') as f:
+            self.manifest = JSON_CODEC.decode(f.read())
+        self._manifest_signature = signature
+        # Части, удалённые другим процессом при импорте, выгружаются
+        for name in [i for i in self.shards if i not in self.manifest['shards']]:
+            del self.shards[name]
+        self._seq += 1
+
+    def _write_manifest(self):
+        with self._atomic_open(self.manifest_path, 'wb') as f:
+            f.write(JSON_CODEC.encode(self.manifest))
+        stat = os.stat(self.manifest_path)
+        self._manifest_signature = (stat.st_mtime_ns, stat.st_size)
+
+    def _migrate(self):
+        """ Перенос записей из хранилища одним файлом по тому же пути, прежние файлы остаются как есть """
+        self.manifest = {'field': self.SHARD_FIELD, 'shards': {}}
+        if any(self.stat_files(self.path)):
+            source = MainManager(self.path, self.record_type)
+            groups = {}
+            for record in source.data:
+                groups.setdefault(self.shard_name(record.get(self.SHARD_FIELD)), []).append(record)
+            self._replace(groups)
+        self._write_manifest()
+
+    def shard_name(self, value):
+        """ Имя части для значения поля даты: ГГГГ-ММ, для пустой или некорректной даты — UNDATED """
+        month = 0 if value is None else self.date_key(value) // 100
+        return f'{month // 100:04d}-{month % 100:02d}' if month else self.UNDATED
+
+    @classmethod
+    def has_store(cls, path):
+        """ Есть ли на диске хранилище частей по пути снимка: прежний файл по этому пути им не считается """
+        return os.path.exists(os.path.join(os.path.splitext(path)[0], cls.MANIFEST))
+
+    def shard_path(self, name):
+        return os.path.join(self.dir, name + '.json')
+
+    def names(self, start=None, end=None):
+        """ Имена частей по порядку, для периода — только пересекающихся с ним """
+        names = sorted(self.manifest['shards'])
+        if start is None and end is None:
+            return names
+        low = '' if start is None else self.shard_name(start)
+        high = '9999-12' if end is None else self.shard_name(end)
+        # Записи без даты попадают в период без начала, как и в индексе дат MainManager
+        return [i for i in names if (start is None if i == self.UNDATED else low <= i <= high)]
+
+    def shard(self, name, create=False):
+        """ Часть хранилища, загружается при первом обращении; None — если её нет и create не задан """
+        shard = self.shards.get(name)
+        if shard is not None:
+            return shard
+        if name not in self.manifest['shards']:
+            if not create:
+                return None
+            self.manifest['shards'][name] = {'sealed': False}
+            self._write_manifest()
+        shard = self.shards[name] = MainManager(self.shard_path(name), self.record_type)
+        for key, func in self._sorted_keys.items():
+            shard.add_sorted_index(key, func)
+        if self.autosave_delay is not None:
+            shard.set_autosave(self.autosave_delay)
+        # Изменения части меняют версию всего хранилища: через apply и reset ниже
+        shard.attach('sharded', lambda manager: self)
+        return shard
+
+    def apply(self, removed, added):
+        """ Изменение записей одной из частей """
+        self._seq += 1
+
+    def reset(self):
+        """ Замена данных одной из частей """
+        self._seq += 1
+
+    def _writable(self, name):
+        """ Часть для изменения: создаётся при необходимости и входит в текущую транзакцию """
+        shard = self.shard(name, create=True)
+        info = self.manifest['shards'][name]
+        if info.get('sealed'):
+            # Запись в прошлый месяц: часть снова считается изменяемой, журнал ляжет поверх сжатого снимка
+            info['sealed'] = False
+            self._write_manifest()
+        if self._tx is not None and name not in self._tx_names:
+            self._tx.enter_context(shard.transaction())
+            self._tx_names.add(name)
+        return shard
+
+    def is_stale(self):
+        """ Изменения других процессов подхватываются refresh по манифесту и частям """
+        return False
+
+    def refresh(self):
+        """ Подхват изменений других процессов: манифест и загруженные части """
+        if not self._lock_depth:
+            with self._shared(exclusive=False):
+                for shard in self.shards.values():
+                    shard.refresh()
+
+    def file_version(self):
+        """ Подпись манифеста и файлов всех частей, None — если загруженные части отстают от памяти """
+        if any(i.file_version() is None for i in self.shards.values()):
+            return None
+        return self._file_signature()
+
+    def _file_signature(self):
+        signature = [list(self.stat_files(self.manifest_path)[0] or ())]
+        for name in self.names():
+            version = self.shard_version(name)
+            if version is None:
+                return None # файлы части отстают от памяти
+            signature.extend(version)
+        return signature
+
+    def shard_version(self, name):
+        """ Подпись файлов части как file_version у MainManager, не загружая её """
+        shard = self.shards.get(name)
+        if shard is not None:
+            return shard.file_version()
+        return [None if i is None else list(i) for i in self.stat_files(self.shard_path(name))]
+
+    def save_derived(self, path, dump):
+        """ Запись производного от данных файла следом за очередью записи частей """
+        consistent = not any(i._pending or i._inflight for i in self.shards.values())
+
+        def job():
+            version = self._file_signature() if consistent else None
+            with self._atomic_open(path, 'wb') as f:
+                dump(f, version)
+
+        done = WRITER.submit(job, required=self.durability != 'none', wait=self.durability == 'fsync')
+        self._wait(done)
+
+    def _touch(self):
+        """ Путь хранилища одним файлом не используется: состояние файлов ведут части """
+
+    @property
+    def seq(self):
+        """ Версия хранилища: растёт при изменении любой из частей """
+        return self._seq
+
+    @property
+    def data(self):
+        """ Все записи списком — только для совместимости, загружает все части """
+        return list(chain.from_iterable(self.shard(i).data for i in self.names()))
+
+    def add_sorted_index(self, name, key_func):
+        self._sorted_keys[name] = key_func
+        for shard in self.shards.values():
+            shard.add_sorted_index(name, key_func)
+
+    def range_data(self, name, start, end, limit=None):
+        """ Записи в диапазоне ключа упорядоченного индекса по всем частям """
+        self._require_sorted(name)
+        records = heapq.merge(*(self.shard(i).range_data(name, start, end) for i in self.names()),
+                              key=lambda i: (self._sorted_keys[name](i), i['id']))
+        return list(islice(records, limit))
+
+    def iter_records(self, date_from=None, date_to=None, **equals):
+        """ Записи, подходящие под фильтры: загружаются только части периода """
+        names = self.names(date_from, date_to)
+        if self.SHARD_FIELD in equals:
+            name = self.shard_name(self._parse(self.SHARD_FIELD, equals[self.SHARD_FIELD]))
+            names = [i for i in names if i == name]
+        return chain.from_iterable(self.shard(i).iter_records(date_from, date_to, **equals) for i in names)
+
+    def count(self):
+        return sum(self.shard(i).count() for i in self.names())
+
+    def next_id(self):
+        """ Следующий свободный id из общего счётчика, при его отсутствии — по всем частям """
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        values = os.read(self._lock_fd, 64).split()
+        if values:
+            return int(values[0])
+        return max((self.shard(i).next_id() for i in self.names()), default=1)
+
+    def _set_next_id(self, value):
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        os.write(self._lock_fd, f'{value:20d}\n'.encode())
+
+    def find_data(self, key_dict, key_result):
+        """ Поиск по ключу: по дате — в одной части, по другим полям — во всех """
+        if key_dict == self.SHARD_FIELD:
+            shard = self.shard(self.shard_name(self._parse(key_dict, key_result)))
+            return [] if shard is None else shard.find_data(key_dict, key_result)
+        return [i for name in self.names() for i in self.shard(name).find_data(key_dict, key_result)]
+
+    def exists(self, key_dict, key_result):
+        return bool(self.find_data(key_dict, key_result))
+
+    def insert_data(self, record, keep_id=False):
+        """ Добавление записи в часть её месяца """
+        with self._shared():
+            next_id = self.next_id()
+            if not keep_id and record['id'] < next_id:
+                record['id'] = next_id
+            self._writable(self.shard_name(record.get(self.SHARD_FIELD))).insert_data(record, keep_id=True)
+            self._set_next_id(max(next_id, record['id'] + 1))
+
+    def update_data(self, record, changes):
+        """ Обновление полей записи, при смене месяца запись переносится в другую часть """
+        with self._shared():
+            source = self.shard_name(record.get(self.SHARD_FIELD))
+            target = source
+            if self.SHARD_FIELD in changes:
+                target = self.shard_name(self._parse(self.SHARD_FIELD, changes[self.SHARD_FIELD]))
+            if target == source:
+                self._writable(source).update_data(record, changes)
+                return
+            moved = self._decode(self._encode(record))
+            moved.update(changes)
+            self._writable(source).delete_many(ids=[record['id']])
+            self._writable(target).insert_data(moved, keep_id=True)
+
+    def delete_many(self, predicate=None, ids=None):
+        with self._shared():
+            return sum(self._writable(i).delete_many(predicate, ids) for i in self.names())
+
+    def delete_data(self, kind_data, key_dict, key_result):
+        """ Удаление данных по ключу: каждая часть удаляет свои записи одной операцией """
+        data_res = self.find_data(key_dict, key_result)
+        if not data_res:
+            raise IndexError(f'Нет записей с {key_dict} = {key_result}')
+
+        groups = {}
+        for i in data_res:
+            groups.setdefault(self.shard_name(i.get(self.SHARD_FIELD)), []).append(i['id'])
+        with self._shared():
+            return sum(self._writable(name).delete_many(ids=ids) for name, ids in groups.items())
+
+    @contextmanager
+    def transaction(self):
+        """ Пакет изменений: каждая затронутая часть записывается своей транзакцией при выходе """
+        # Атомарна запись каждой части; при сбое процесса между частями записанной окажется часть пакета
+        with self._shared():
+            if self._tx is not None:
+                yield self
+                return
+            with ExitStack() as stack:
+                self._tx, self._tx_names = stack, set()
+                try:
+                    yield self
+                finally:
+                    self._tx = None
+
+    def flush(self):
+        for shard in self.shards.values():
+            shard.flush()
+
+    def set_autosave(self, delay):
+        self.autosave_delay = delay
+        for shard in self.shards.values():
+            shard.set_autosave(delay)
+
+    def compact(self, background=False):
+        """ Сворачивание журналов загруженных частей; части без журнала, в том числе сжатые, не переписываются """
+        for shard in self.shards.values():
+            if shard.log_size or shard._pending:
+                shard.compact(background)
+
+    def compress(self, before=None):
+        """ Сжатие частей месяцев раньше before (ГГГГ-ММ, по умолчанию текущего), возвращает имена сжатых """
+        if before is None:
+            before = date.today().strftime('%Y-%m')
+        compressed = []
+        with self._shared():
+            for name, info in sorted(self.manifest['shards'].items()):
+                if name == self.UNDATED or name >= before or info.get('sealed'):
+                    continue
+                self.shard(name).compress()
+                info['sealed'] = True
+                compressed.append(name)
+            if compressed:
+                self._write_manifest()
+        return compressed
+
+    def unload(self, name):
+        """ Выгрузка части из памяти, при следующем обращении она читается с диска """
+        with self._lock:
+            self.shards.pop(name, None)
+
+    def _replace(self, groups):
+        """ Замена всех частей записями {имя: записи по возрастанию id}, каждая часть пишется снимком """
+        for name in [i for i in self.manifest['shards'] if i not in groups]:
+            self.shards.pop(name, None)
+            path = self.shard_path(name)
+            for i in (path, os.path.splitext(path)[0] + '.bin', path + '.gz', path + '.log', path + '.log.old'):
+                if os.path.exists(i):
+                    os.remove(i)
+            del self.manifest['shards'][name]
+        for name, records in groups.items():
+            shard = self.shard(name, create=True)
+            with shard._shared():
+                shard._clear()
+                shard._append_batch(records)
+                shard.compact()
+                shard._notify()
+        self._write_manifest()
+        self._set_next_id(max((i['id'] for records in groups.values() for i in records), default=0) + 1)
+        self._seq += 1
+
+    def _clear(self):
+        """ Импорт копит записи по частям, хранилище заменяется в _finish_import """
+        self._staged = {}
+
+    def _append_batch(self, records):
+        for record in records:
+            self._staged.setdefault(self.shard_name(record.get(self.SHARD_FIELD)), []).append(record)
+
+    def _finish_import(self, path_home):
+        """ Сохранение результата импорта """
+        staged, self._staged = self._staged, None
+        if path_home == self.path:
+            self._replace(staged)
+            return
+        records = sorted(chain.from_iterable(staged.values()), key=lambda i: i['id'])
+        with self._atomic_open(path_home, 'wb') as f:
+            f.write(JSON_CODEC.encode([self._encode(i) for i in records]))
+
+
+# Доступные движки хранения, выбираются переменной окружения PA_STORAGE
+STORAGES = {'json': MainManager, 'sqlite': SqliteManager, 'monthly': ShardedManager}
+# Загруженные хранилища процесса: {(движок, путь): менеджер}
+_STORES = {}
+# Хранилища с отложенным сохранением, дописываются при выходе
+_BUFFERED_MANAGERS = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_buffered():
+    """ Запись накопленных изменений и очереди записи при завершении процесса """
+    for manager in list(_BUFFERED_MANAGERS):
+        if manager.durability != 'none':
+            manager.flush()
+    WRITER.drain()
+
+
+def open_manager(path, record_type=None, storage=None):
+    """ Хранилище для файла данных в выбранном движке, загружается один раз за процесс """
+    if storage is None:
+        storage = os.environ.get('PA_STORAGE', 'json')
+    if storage not in STORAGES:
+        raise ValueError(f'Неизвестный движок хранения: {storage}. Доступны: {", ".join(STORAGES)}')
+
+    key = (storage, os.path.abspath(path))
+    manager = _STORES.get(key)
+    if manager is not None:
+        manager.refresh() # записи других процессов дочитываются из журнала
+    # Изменённые извне файлы перечитываются
+    if manager is None or manager.is_stale():
+        manager = STORAGES[storage](path, record_type)
+        _STORES[key] = manager
+    return manager
+
+
+def migrate_to_sqlite(data_dir='data'):
+    """ Перенос JSON-хранилищ каталога данных в базу SQLite """
+    for name, record_type in (('notes', NoteRecord), ('tasks', TaskRecord),
+                              ('contacts', ContactRecord), ('finance', FinanceEntry)):
+        path = os.path.join(data_dir, f'{name}.json')
+        # Хранилище читается тем же менеджером, которым записано: части по месяцам важнее
+        # оставшегося после перехода на них файла, снимок читается в любом формате вместе с журналом
+        manager_type = next((i for i in (ShardedManager, MainManager) if i.has_store(path)), None)
+        if manager_type is None:
+            continue
+        count = SqliteManager(path, record_type).migrate_from_json(manager_type(path, record_type))
+        print(f'{name}: перенесено записей — {count}')
+
+
+class LiveIndex:
+    """ Основа структур для MainManager.attach: обновляются по изменениям, пересобираются по версии хранилища """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.seq = None # версия хранилища, которой соответствует индекс; None — нужна пересборка
+        self.dirty = False # есть изменения, не записанные на диск
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _add(self, record):
+        raise NotImplementedError
+
+    def _remove(self, record_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """ Построение индекса по всем записям хранилища """
+        self._clear()
+        for record in self.manager.iter_records():
+            self._add(record)
+        self.seq = self.manager.seq
+        self.dirty = True
+
+    def apply(self, removed, added):
+        """ Учёт изменённых записей без пересборки """
+        if self.seq is None:
+            return # индекс всё равно будет пересобран перед использованием
+        for record_id in removed:
+            self._remove(record_id)
+        for record in added:
+            self._remove(record['id'])
+            self._add(record)
+        self.seq = self.manager.seq
+        self.dirty = True
+
+    def reset(self):
+        """ Данные заменены целиком, индекс пересобирается при следующем обращении """
+        self.seq = None
+
+    def ensure(self):
+        """ Пересборка, если версия хранилища сменилась """
+        # Версия может смениться и без уведомления: например, после записи другим соединением SQLite.
+        # Структура без хранилища (manager None) — готовый результат, пересобирать её не из чего
+        if self.manager is not None and self.seq != self.manager.seq:
+            self.rebuild()
+
+
+class TextIndex(LiveIndex):
+    """ Инвертированный индекс слов записей с ранжированием BM25 """
+    K1 = 1.2
+    B = 0.75
+    TOKEN = re.compile(r'\w+')
+    # Окончания для облегчённого стемминга, длинные проверяются раньше коротких
+    SUFFIXES = tuple(sorted((
+        'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'ость', 'ости',
+        'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ую', 'юю',
+        'ия', 'ья', 'ов', 'ев', 'ей', 'ию', 'ью', 'ть', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+        'ing', 'ed', 'es', 's'), key=len, reverse=True))
+
+    def __init__(self, manager, fields, stem=True):
+        super().__init__(manager)
+        self.fields = fields # {поле: вес}, слова поля учитываются вес раз
+        self.stem = stem
+        self._clear()
+        self._stems = {} # словарь языка невелик, основа каждого слова вычисляется один раз
+
+    def tokenize(self, text):
+        """ Слова текста в нижнем регистре, с облегчённым стеммингом """
+        words = self.TOKEN.findall(text.lower().replace('ё', 'е'))
+        if not self.stem:
+            return words
+        stems = self._stems
+        return [stems[i] if i in stems else self._stem(i) for i in words]
+
+    def _stem(self, word):
+        """ Основа слова: отбрасывается самое длинное подходящее окончание """
+        stem = word
+        if len(word) > 4 and not word.isdigit():
+            for suffix in self.SUFFIXES:
+                if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                    stem = word[:-len(suffix)]
+                    break
+        self._stems[word] = stem
+        return stem
+
+    def _clear(self):
+        self.docs = {} # {id: {слово: частота}}
+        self.postings = {} # {слово: {id: частота}}
+        self.lengths = {} # {id: количество слов}
+        self.total = 0 # суммарная длина всех записей
+
+    def _add(self, record):
+        self._insert(record['id'], self._terms(record))
+
+    def _insert(self, record_id, terms):
+        self.docs[record_id] = terms
+        length = sum(terms.values())
+        self.lengths[record_id] = length
+        self.total += length
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[record_id] = count
+
+    def _remove(self, record_id):
+        terms = self.docs.pop(record_id, None)
+        if terms is None:
+            return
+        self.total -= self.lengths.pop(record_id)
+        for term in terms:
+            posting = self.postings[term]
+            del posting[record_id]
+            if not posting:
+                del self.postings[term]
+
+    def _terms(self, record):
+        """ Частоты слов записи с учётом веса полей """
+        terms = {}
+        for field, weight in self.fields.items():
+            value = record[field]
+            if value is None:
+                continue
+            for word in self.tokenize(str(value)):
+                terms[word] = terms.get(word, 0) + weight
+        return terms
+
+    def search(self, query, limit=10):
+        """ До limit пар (id, оценка BM25) по убыванию оценки """
+        self.ensure()
+        if not self.docs:
+            return []
+        count = len(self.docs)
+        average = self.total / count
+        scores = {}
+        for term in set(self.tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for record_id, frequency in posting.items():
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[record_id] / average)
+                scores[record_id] = scores.get(record_id, 0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda i: i[1])
+
+    def dump(self):
+        """ Функция записи индекса для save_derived: содержимое сериализуется сразу, до фоновой записи """
+        body = JSON_CODEC.encode([[i, terms] for i, terms in self.docs.items()])
+
+        def write(f, version):
+            f.write(JSON_CODEC.encode({'version': version, 'stem': self.stem, 'fields': self.fields}) + b'\n')
+            f.write(body)
+
+        return write
+
+    def save(self, path):
+        """ Запись индекса рядом с хранилищем, если он изменился """
+        if self.dirty:
+            self.manager.save_derived(path, self.dump())
+            self.dirty = False
+
+    @classmethod
+    def open(cls, manager, path, fields, stem=True):
+        """ Индекс с диска, если он построен по тем же файлам хранилища, иначе пустой до первого поиска """
+        index = cls(manager, fields, stem)
+        version = manager.file_version()
+        if version is None:
+            return index
+        try:
+            with open(path, 'rb') as f:
+                header = JSON_CODEC.decode(f.readline())
+                if header != {'version': version, 'stem': stem, 'fields': fields}:
+                    return index
+                docs = JSON_CODEC.decode(f.read())
+        except (FileNotFoundError, ValueError, *JSON_CODEC.errors):
+            return index
+        for record_id, terms in docs:
+            index._insert(record_id, terms)
+        index.seq = manager.seq
+        return index
 
 
 class Note:
+    RECORD = NoteRecord
+
     def __init__(self):
         self.path = os.path.join('data', 'notes.json')
-        self.manager = MainManager(self.path)
+        self.index_path = os.path.join('data', 'notes.index')
+        self.manager = open_manager(self.path, self.RECORD)
+        self.manager.add_sorted_index('date', lambda i: MainManager.date_key(i['timestamp']))
+        # Полнотекстовый индекс: слова названия весят вдвое больше слов описания
+        self.index = self.manager.attach('text', lambda manager: TextIndex.open(
+            manager, self.index_path, {'title': 2, 'content': 1}))
 
     def create_note(self, title, content):
         """ Создание заметки """
-        if title in [i['title'] for i in self.manager.data]:
+        if self.manager.exists('title', title):
             print('Заметка с таким названием уже существует. Пожалуйста, придумайте новое название.\n')
             return
         timestamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S") # дата создания заметки
@@ -67,34 +2539,27 @@ class Note:
             content = None
 
         # Установка id
-        if len(self.manager.data) == 0:
-            id_note = 1
-        else:
-            id_note = self.manager.data[-1]['id'] + 1
+        id_note = self.manager.next_id()
 
         # Заполнение данных
-        note = {
+        note = NoteRecord.from_dict({
             'id': id_note,
             'title': str(title),
             'content': str(content),
             'timestamp': str(timestamp)
-        }
-        self.manager.data.append(note) # Сохранение в базе
-
-        # Сохранение
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
+        })
+        self.manager.insert_data(note) # Сохранение в базе
 
         print(f'Заметка {id_note} успешно создана!\n')
 
     def show_list_notes(self):
         """ Вывод списка заметок """
-        if len(self.manager.data) == 0:
+        if self.manager.count() == 0:
             print('Список заметок пуст. Создайте новую заметку прямо сейчас!\n')
         else:
             print('Список заметок:')
-            for note in self.manager.data:
-                print(f'Заметка {note["id"]} — {note["title"]} — {note["timestamp"]}')
+            for note in self.manager.iter_records():
+                print(f'Заметка {note["id"]} — {note["title"]} — {note.text("timestamp")}')
             print(' ') # просто отступ
 
     def print_note(self, title):
@@ -108,9 +2573,22 @@ class Note:
             print(f'Заметка {note_res['id']}')
             print(f"\"{note_res['title']}\"")
             print(note_res['content'])
-            print('Дата обновления:', note_res['timestamp'])
+            print('Дата обновления:', note_res.text('timestamp'))
             print(' ') # просто отступ
 
+    def search_notes(self, query, limit=10):
+        """ Поиск заметок по словам названия и описания """
+        results = self.index.search(query, limit)
+        self.index.save(self.index_path)
+        if not results:
+            print('Заметки не найдены. Попробуйте другие слова.\n')
+            return
+        print('Результаты поиска:')
+        for note_id, score in results:
+            note = self.manager.find_data('id', note_id)[0]
+            print(f'Заметка {note["id"]} — {note["title"]} — {note.text("timestamp")} (релевантность {score:.2f})')
+        print(' ') # просто отступ
+
     def update_note(self, title, type_change, new_data):
         """ Обновление заметки """
         # Нахождение заметки
@@ -121,12 +2599,8 @@ class Note:
             return
         else:
             # Обновление данных
-            note[type_change] = new_data
-            note['timestamp'] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-
-            # Сохранение
-            with open(self.path, 'w') as f:
-                json.dump(self.manager.data, f)
+            timestamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+            self.manager.update_data(note, {type_change: new_data, 'timestamp': timestamp})
 
             print(f'Заметка {title} успешно обновлена!\n')
 
@@ -140,29 +2614,76 @@ class Note:
         else:
             print(f'Заметка {title} успешна удалена.\n')
 
-    def export_notes(self, kind_file, path=None):
+    def export_notes(self, kind_file, path=None, **filters):
         """ Экспорт заметок """
         if path is None:
             path = self.path
-        self.manager.save_file(kind_file, path)
+        self.manager.save_file(kind_file, path, **filters)
         print(f'Заметки успешно сохранены по пути: {path} \n')
 
     def import_notes(self, kind_file, path_import, path_home=None):
         """ Импорт заметок """
         if path_home is None:
             path_home = self.path
-        self.manager.load_file(kind_file, path_import, path_home)
+        self.manager.load_file(kind_file, path_import, path_home, progress=self.manager.print_progress)
         print(f'Заметки успешно загружены из следующего файла: {path_import}\n')
 
 class Task:
+    RECORD = TaskRecord
+    # Порядок приоритетов задаёт их ранг в расписании
+    PRIORITIES = ('высокий', 'средний', 'низкий')
+
     def __init__(self):
         self.path = os.path.join('data', 'tasks.json')
-        self.manager = MainManager(self.path)
+        self.manager = open_manager(self.path, self.RECORD)
+        self.manager.add_sorted_index('date', lambda i: MainManager.date_key(i['due_date']))
+        self.manager.add_sorted_index('schedule', self.schedule_key)
+
+    @classmethod
+    def schedule_key(cls, task):
+        """ Ключ расписания одним числом: выполнена ли задача, срок ГГГГММДД, ранг приоритета """
+        # Целое число, а не кортеж: так ключ хранится и в столбце SQLite
+        priority = str(task['priority']).lower()
+        rank = cls.PRIORITIES.index(priority) if priority in cls.PRIORITIES else len(cls.PRIORITIES)
+        return int(bool(task['done'])) * 10 ** 9 + MainManager.date_key(task['due_date']) * 10 + rank
+
+    def scheduled(self, start=None, end=None, limit=None):
+        """ Невыполненные задачи со сроком в [start, end] по сроку и приоритету """
+        # Задачи с некорректным сроком (ключ даты 0) в расписание не попадают
+        low = 1 if start is None else MainManager.date_key(start)
+        high = 99991231 if end is None else MainManager.date_key(end)
+        return self.manager.range_data('schedule', low * 10, high * 10 + 9, limit)
+
+    def next_tasks(self, count=5, today=None):
+        """ Ближайшие count невыполненных задач начиная с сегодняшнего дня """
+        return self.scheduled(today or date.today(), None, count)
+
+    def overdue_tasks(self, today=None):
+        """ Невыполненные задачи с прошедшим сроком """
+        return self.scheduled(None, (today or date.today()) - timedelta(days=1))
+
+    def week_tasks(self, today=None):
+        """ Невыполненные задачи со сроком на текущей неделе, с понедельника по воскресенье """
+        today = today or date.today()
+        monday = today - timedelta(days=today.weekday())
+        return self.scheduled(monday, monday + timedelta(days=6))
+
+    def show_schedule(self, count=5):
+        """ Вывод расписания: просроченные, ближайшие и задачи на неделю """
+        for title, tasks in (('Просроченные задачи:', self.overdue_tasks()),
+                             ('Ближайшие задачи:', self.next_tasks(count)),
+                             ('Задачи на этой неделе:', self.week_tasks())):
+            print(title)
+            if not tasks:
+                print('Нет задач')
+            for task in tasks:
+                print(f'{task.text("due_date")} — {task["priority"]} — \"{task["title"]}\"')
+            print(' ') # просто отступ
 
     def create_task(self, title: str, priority: str, due_date: str, description=None, done=False):
         """ Создание задачи """
         # Проверка уникальности названия
-        if title in [i['title'] for i in self.manager.data]:
+        if self.manager.exists('title', title):
             print('Заметка с таким названием уже существует. Пожалуйста, придумайте новое название.\n')
             return
         if description == '':
@@ -177,10 +2698,7 @@ class Task:
             priority = priority.capitalize()
 
         # Установка id
-        if len(self.manager.data) == 0:
-            id_task = 1
-        else:
-            id_task = self.manager.data[-1]['id'] + 1
+        id_task = self.manager.next_id()
 
         # Проверка наличия ошибки в поле даты
         try:
@@ -190,19 +2708,15 @@ class Task:
             return
 
         # Создание таска
-        task = {
+        task = TaskRecord.from_dict({
             'id': id_task,
             'title': str(title),
             'description': str(description),
             'done': done,
             'priority': str(priority),
             'due_date': str(due_date)
-        }
-        self.manager.data.append(task)
-
-        # Сохранение
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
+        })
+        self.manager.insert_data(task)
 
         print(f'Задача {id_task} успешно добавлена!\n')
 
@@ -218,18 +2732,19 @@ class Task:
             print(f"\"{task_res['title']}\"")
             print(task_res['description'])
             print('Приоритет:', task_res['priority'])
-            print('Крайний срок:', task_res['due_date'])
+            print('Крайний срок:', task_res.text('due_date'))
             print(' ') # просто отступ
 
     def show_list_tasks(self):
         """ Вывод списка задач """
-        if self.manager.data:
+        count = self.manager.count()
+        if count:
             print('Список поставленных задач:')
-            for i, task in enumerate(self.manager.data):
+            for i, task in enumerate(self.manager.iter_records()):
                 print('Задача', task['id'])
                 print(f'\"{task['title']}\"')
-                print('Срок:' , task['due_date'])
-                if i < len(self.manager.data) - 1:
+                print('Срок:' , task.text('due_date'))
+                if i < count - 1:
                     print('===============================')
             print('\n')
         else:
@@ -238,11 +2753,7 @@ class Task:
     def mark_done(self, title):
         """ Отметка выполнения задачи """
         task = self.manager.find_data('title', title)[0]
-        task['done'] = True
-
-        # Сохранение
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
+        self.manager.update_data(task, {'done': True})
 
         print(f'Задача \"{title}\" успешно отмечена как выполненная!\n')
 
@@ -260,11 +2771,7 @@ class Task:
                 print('Формат даты указан неверно. Правильный: ДД-ММ-ГГГГ')
                 return
 
-        task[kind_change] = new_data
-
-        # Сохранение
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
+        self.manager.update_data(task, {kind_change: new_data})
 
         print(f'Задача \"{title}\" успешно обновлена!\n')
 
@@ -283,54 +2790,287 @@ class Task:
         if path_home is None:
             path_home = self.path
 
-        self.manager.load_file(kind_file, path_import, path_home)
+        self.manager.load_file(kind_file, path_import, path_home, progress=self.manager.print_progress)
         print(f'Задачи успешно загружены из следующего файла: {path_import}\n')
 
-    def export_tasks(self, kind_file, path=None):
+    def export_tasks(self, kind_file, path=None, **filters):
         """ Экспорт задач """
         if path is None:
             path = self.path
 
-        self.manager.save_file(kind_file, path)
+        self.manager.save_file(kind_file, path, **filters)
         print(f'Задачи успешно сохранены по следующем пути: {path}\n')
 
+NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone(phone):
+    """ Номер телефона цифрами в международном виде: '+7 900 123-45-67' и '89001234567' совпадают """
+    if phone is None:
+        return ''
+    digits = NON_DIGITS.sub('', str(phone))
+    # Российские номера: 8 в начале заменяется кодом страны, десятизначный номер дополняется им
+    if len(digits) == 11 and digits[0] == '8':
+        digits = '7' + digits[1:]
+    elif len(digits) == 10 and digits[0] == '9':
+        digits = '7' + digits
+    return digits
+
+
+def edit_distance(a, b, limit):
+    """ Расстояние Дамерау — Левенштейна (перестановка соседних букв — одна правка), не больше limit + 1 """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Считается только полоса шириной 2 * limit + 1 вокруг диагонали: остальные клетки заведомо больше limit
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [limit + 1] * len(b)
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        for j in range(lo, hi + 1):
+            char_b = b[j - 1]
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = cost
+        if min(current[lo - 1:hi + 1]) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class ContactIndex(LiveIndex):
+    """ Поиск контактов: нормализованный телефон, начало имени и имя с опечатками """
+    # Опечатка меняет не больше трёх триграмм слова
+    GRAM = 3
+    # Сколько слов из списков триграмм просматривается при нечётком поиске
+    FUZZY_BUDGET = 20000
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        self._bulk = False # при пересборке ключи имён добавляются без сортировки
+        self._clear()
+
+    def _clear(self):
+        self.records = {} # {id: запись}
+        self.keys = {} # {id: (телефон, ключи имени)} — ключи нужны для удаления после изменения записи
+        self.phones = {} # {нормализованный телефон: множество id}
+        self.names = [] # отсортированные пары (ключ имени, id) для поиска по началу
+        # Нечёткий поиск идёт по словарю слов имён: разных слов намного меньше, чем контактов
+        self.words = {} # {слово имени: множество id}
+        self.grams = {} # {триграмма: множество слов}
+
+    @staticmethod
+    def name_key(name):
+        """ Имя для сравнения: нижний регистр, ё как е, одиночные пробелы """
+        return ' '.join(str(name).lower().replace('ё', 'е').split())
+
+    @classmethod
+    def name_keys(cls, name):
+        """ Ключи поиска по началу: полное имя и его окончания с каждого слова ('иван петров', 'петров') """
+        words = cls.name_key(name).split()
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    @classmethod
+    def trigrams(cls, key):
+        padded = f'  {key} '
+        return {padded[i:i + cls.GRAM] for i in range(len(padded) - cls.GRAM + 1)}
+
+    def _add(self, record):
+        record_id = record['id']
+        phone = normalize_phone(record['phone'])
+        keys = self.name_keys(record['name']) if record['name'] is not None else []
+        self.records[record_id] = record
+        self.keys[record_id] = (phone, keys)
+        if phone:
+            self.phones.setdefault(phone, set()).add(record_id)
+        for key in keys:
+            if self._bulk:
+                self.names.append((key, record_id))
+            else:
+                insort(self.names, (key, record_id))
+        if keys:
+            for word in set(keys[0].split()):
+                ids = self.words.get(word)
+                if ids is None:
+                    ids = self.words[word] = set()
+                    for gram in self.trigrams(word):
+                        self.grams.setdefault(gram, set()).add(word)
+                ids.add(record_id)
+
+    def _remove(self, record_id):
+        if record_id not in self.records:
+            return
+        del self.records[record_id]
+        phone, keys = self.keys.pop(record_id)
+        if phone:
+            ids = self.phones[phone]
+            ids.discard(record_id)
+            if not ids:
+                del self.phones[phone]
+        for key in keys:
+            position = bisect_left(self.names, (key, record_id))
+            del self.names[position]
+        if keys:
+            for word in set(keys[0].split()):
+                ids = self.words[word]
+                ids.discard(record_id)
+                if ids:
+                    continue
+                del self.words[word]
+                for gram in self.trigrams(word):
+                    words = self.grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self.grams[gram]
+
+    def rebuild(self):
+        """ Построение по всем записям: ключи имён сортируются один раз в конце, а не вставкой """
+        self._bulk = True
+        try:
+            super().rebuild()
+        finally:
+            self._bulk = False
+        self.names.sort()
+
+    def by_phone(self, phone):
+        """ Контакты с тем же номером в любой записи """
+        self.ensure()
+        return [self.records[i] for i in sorted(self.phones.get(normalize_phone(phone), ()))]
+
+    def by_name(self, name):
+        """ Контакты с тем же именем без учёта регистра и лишних пробелов """
+        self.ensure()
+        key = self.name_key(name)
+        position = bisect_left(self.names, (key,))
+        result = []
+        while position < len(self.names) and self.names[position][0] == key:
+            record = self.records[self.names[position][1]]
+            if self.name_key(record['name']) == key: # совпадение с полным именем, а не с его окончанием
+                result.append(record)
+            position += 1
+        return result
+
+    def prefix(self, text, limit=10):
+        """ Контакты, имя или фамилия которых начинается с text """
+        self.ensure()
+        key = self.name_key(text)
+        position = bisect_left(self.names, (key,))
+        found = {}
+        while position < len(self.names) and len(found) < limit:
+            name, record_id = self.names[position]
+            if not name.startswith(key):
+                break
+            found.setdefault(record_id, self.records[record_id])
+            position += 1
+        return list(found.values())
+
+    def similar_words(self, word, max_distance=None):
+        """ Слова имён, отличающиеся от word не больше чем на max_distance правок: пары (слово, расстояние) """
+        if max_distance is None:
+            max_distance = 0 if len(word) <= 2 else 1 if len(word) <= 10 else 2
+        postings = sorted((self.grams.get(i, ()) for i in self.trigrams(word)), key=len)
+        # Правка портит не больше GRAM триграмм: из k самых редких триграмм запроса похожее слово
+        # содержит не меньше k - GRAM * max_distance. Списки добавляются, пока их суммарный размер мал,
+        # а подсчёт идёт в Counter без цикла Python по каждому слову
+        lost = self.GRAM * max_distance
+        k = min(lost + 1, len(postings))
+        total = sum(len(i) for i in postings[:k])
+        while k < len(postings) and total + len(postings[k]) <= self.FUZZY_BUDGET:
+            total += len(postings[k])
+            k += 1
+        need = max(k - lost, 1)
+        counts = Counter(chain.from_iterable(postings[:k]))
+        result = []
+        for candidate in [i for i, count in counts.items() if count >= need]:
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                result.append((candidate, distance))
+        return result
+
+    def fuzzy(self, text, limit=10):
+        """ Контакты, у которых каждому слову text нашлось похожее слово имени, ближайшие первыми """
+        self.ensure()
+        words = self.name_key(text).split()
+        if not words:
+            return []
+        matches = [self.similar_words(i) for i in words]
+        # Сначала слово запроса с самым коротким списком контактов, остальные только сужают его
+        matches.sort(key=lambda i: sum(len(self.words[word]) for word, _ in i))
+        scores = {}
+        for word, distance in matches[0]:
+            for record_id in self.words[word]:
+                if distance < scores.get(record_id, distance + 1):
+                    scores[record_id] = distance
+        for similar in matches[1:]:
+            narrowed = {}
+            for word, distance in similar:
+                ids = self.words[word]
+                for record_id, score in scores.items():
+                    if record_id in ids and score + distance < narrowed.get(record_id, score + distance + 1):
+                        narrowed[record_id] = score + distance
+            scores = narrowed
+        return [self.records[i] for i in heapq.nsmallest(limit, scores, key=lambda i: (scores[i], i))]
+
+    def suggest(self, text, limit=10):
+        """ Подсказки: сначала совпадения по началу имени, затем похожие имена """
+        result = {i['id']: i for i in self.prefix(text, limit)}
+        if len(result) < limit:
+            for record in self.fuzzy(text, limit):
+                result.setdefault(record['id'], record)
+        return list(result.values())[:limit]
+
+
 class Contact:
+    RECORD = ContactRecord
+
     def __init__(self):
         self.path = os.path.join('data', 'contacts.json')
-        self.manager = MainManager(self.path)
+        self.manager = open_manager(self.path, self.RECORD)
+        self.index = self.manager.attach('search', ContactIndex)
 
     def create_contact(self, name, phone=None, email=None):
         """ Создание записи """
         # Установка id
-        if len(self.manager.data) == 0:
-            id_contact = 1
-        else:
-            id_contact = self.manager.data[-1]['id'] + 1
+        id_contact = self.manager.next_id()
 
         if phone == '':
             phone = None
         if email == '':
             email = None
 
-        contact = {
+        contact = ContactRecord.from_dict({
             'id': id_contact,
             'name': name,
             'phone': str(phone),
             'email': str(email)
-        }
+        })
 
         # Сохранение
-        self.manager.data.append(contact)
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
+        self.manager.insert_data(contact)
         print(f'Контакт {name} успешно создан!\n')
 
+    def find_contacts(self, key_dict, key_result):
+        """ Поиск контактов: телефон в любой записи, имя без учёта регистра """
+        if key_dict == 'phone':
+            return self.index.by_phone(key_result)
+        if key_dict == 'name':
+            return self.index.by_name(key_result)
+        return self.manager.find_data(key_dict, key_result)
+
+    def search_contacts(self, text, limit=10):
+        """ Контакты по началу имени или фамилии, при отсутствии — по похожему имени """
+        return self.index.suggest(text, limit)
+
     def print_contact(self, key_dict, key_result):
         """ Вывод данных контакта """
         try:
-            contact = self.manager.find_data(key_dict, key_result)[0]
+            contact = self.find_contacts(key_dict, key_result)[0]
         except IndexError:
             print('Контакт не был найден. Проверьте корректность введённого названия.\n')
+            if key_dict == 'name':
+                suggestions = self.search_contacts(key_result, 5)
+                if suggestions:
+                    print('Возможно, вы искали:', ', '.join(i['name'] for i in suggestions), '\n')
             return
         else:
             print('Телефон —', contact['phone'])
@@ -340,46 +3080,647 @@ class Contact:
     def update_contact(self, key_dict, key_result, type_change, new_data):
         """ Обновление данных контакта """
         try:
-            contact = self.manager.find_data(key_dict, key_result)[0]
+            contact = self.find_contacts(key_dict, key_result)[0]
         except IndexError:
             print('Контакт не был найден. Проверьте корректность введённого названия.\n')
             return
         else:
-            contact[type_change] = new_data
-
-            # Сохранение
-            with open(self.path, 'w') as f:
-                json.dump(self.manager.data, f)
+            self.manager.update_data(contact, {type_change: new_data})
             print(f'Контакт {key_result} успешно изменен!\n')
 
     def delete_contact(self, key_dict, key_result):
         """ Удаление контакта """
-        try:
-            self.manager.delete_data('contacts', key_dict, key_result)
-        except IndexError:
+        contacts = self.find_contacts(key_dict, key_result)
+        if not contacts:
             print('Задача не была найдена. Проверьте корректность введённого названия.\n')
             return
-        else:
-            print(f'Контакт {key_result} успешно удалён.\n')
+        self.manager.delete_many(ids=[i['id'] for i in contacts])
+        print(f'Контакт {key_result} успешно удалён.\n')
 
     def import_contacts(self, kind_file, path_import, path_home=None):
         """ Импорт данных контактов """
         if path_home is None:
             path_home = self.path
-        self.manager.load_file(kind_file, path_import, path_home)
+        self.manager.load_file(kind_file, path_import, path_home, progress=self.manager.print_progress)
         print(f'Контакты успешно загружены из следующего файла: {path_import}\n')
 
-    def export_contacts(self, kind_file, path=None):
+    def export_contacts(self, kind_file, path=None, **filters):
         """ Экспорт данных контактов """
         if path is None:
             path = self.path
-        self.manager.save_file(kind_file, path)
+        self.manager.save_file(kind_file, path, **filters)
         print(f'Контакты успешно сохранены по следующему пути: {path}\n')
 
+class FinanceLedger:
+    """ Колоночный журнал финансов: записи фиксированной ширины, на диске открываются через np.memmap """
+    MAGIC = b'PALEDGER'
+    # Дата хранится порядковым номером дня (date.toordinal), 0 — некорректная дата;
+    # описания лежат отдельной кучей строк, в записи только смещение и длина (-1 — описания нет)
+    DTYPE_FIELDS = [('id', '<i8'), ('amount', '<f8'), ('date', '<i4'), ('category', '<i4'),
+                    ('description', '<i8'), ('description_size', '<i4')]
+    ALIGN = 64
+
+    def __init__(self, rows, categories, descriptions, version=None):
+        self.rows = rows # упорядочены по дате и id
+        self.categories = categories # номер категории в записи — позиция в этом списке
+        self.descriptions = descriptions
+        self.version = version # подпись файлов хранилища, из которых построен журнал
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def dtype(cls):
+        """ Тип записи numpy, строится при первом обращении """
+        return np.dtype(cls.DTYPE_FIELDS)
+
+    @classmethod
+    def from_records(cls, records):
+        """ Журнал в памяти из записей хранилища """
+        n = len(records)
+        rows = np.empty(n, dtype=cls.dtype())
+        rows['id'] = np.fromiter((i.id for i in records), dtype=np.int64, count=n)
+        rows['amount'] = np.fromiter((i.amount for i in records), dtype=np.float64, count=n)
+        rows['date'] = np.fromiter((i.date.toordinal() if isinstance(i.date, date) else 0 for i in records),
+                                   dtype=np.int32, count=n)
+        categories = pd.Categorical([i.category for i in records])
+        rows['category'] = categories.codes
+
+        texts = [None if i.description is None else str(i.description).encode() for i in records]
+        sizes = np.fromiter((-1 if i is None else len(i) for i in texts), dtype=np.int32, count=n)
+        rows['description_size'] = sizes
+        rows['description'] = np.cumsum(np.maximum(sizes, 0)) - np.maximum(sizes, 0)
+        descriptions = b''.join(i for i in texts if i)
+
+        order = np.lexsort((rows['id'], rows['date']))
+        return cls(rows[order], [str(i) for i in categories.categories], descriptions)
+
+    def dump(self, f, version=None):
+        """ Запись журнала в файл: заголовок JSON, записи с выравниванием, куча описаний """
+        header = json.dumps({'version': version, 'count': len(self.rows), 'categories': self.categories,
+                             'descriptions': len(self.descriptions)}).encode()
+        prefix = len(self.MAGIC) + 8 + len(header)
+        f.write(self.MAGIC + len(header).to_bytes(8, 'little') + header)
+        f.write(b'\0' * (-prefix % self.ALIGN))
+        f.write(np.ascontiguousarray(self.rows).tobytes())
+        f.write(self.descriptions)
+
+    @classmethod
+    def open(cls, path):
+        """ Журнал с диска без чтения записей в память, None — если файла нет или он повреждён """
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                    return None
+                size = int.from_bytes(f.read(8), 'little')
+                header = json.loads(f.read(size))
+        except (FileNotFoundError, ValueError):
+            return None
+
+        prefix = len(cls.MAGIC) + 8 + size
+        offset = prefix + (-prefix % cls.ALIGN)
+        count = header['count']
+        # Отображение только для чтения: несколько процессов делят одни страницы без копирования
+        dtype = cls.dtype()
+        rows = (np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+                if count else np.empty(0, dtype=dtype))
+        heap_offset = offset + count * dtype.itemsize
+        descriptions = (np.memmap(path, dtype=np.uint8, mode='r', offset=heap_offset,
+                                  shape=(header['descriptions'],))
+                        if header['descriptions'] else b'')
+        return cls(rows, header['categories'], descriptions, header['version'])
+
+    def select(self, start=None, end=None):
+        """ Границы периода [start, end] в упорядоченных по дате записях """
+        # bisect по срезу столбца читает только нужные страницы, np.searchsorted скопировал бы столбец целиком
+        days = self.rows['date']
+        lo = 0 if start is None else bisect_left(days, start.toordinal())
+        hi = len(days) if end is None else bisect_right(days, end.toordinal())
+        return slice(lo, hi)
+
+    def description(self, row):
+        """ Описание записи из кучи строк """
+        size = int(row['description_size'])
+        if size < 0:
+            return None
+        start = int(row['description'])
+        return bytes(self.descriptions[start:start + size]).decode()
+
+    def entries(self, part=slice(None)):
+        """ Записи выбранного среза в виде FinanceEntry """
+        for row in self.rows[part]:
+            day = int(row['date'])
+            code = int(row['category'])
+            yield FinanceEntry(id=int(row['id']), amount=float(row['amount']),
+                               category=self.categories[code] if code >= 0 else None,
+                               date=date.fromordinal(day) if day else None,
+                               description=self.description(row))
+
+
+class FinanceEngine:
+    """ Колоночное представление финансовых записей для векторных отчётов """
+    GROUPS = ('category', 'day', 'week', 'month')
+
+    # Порядковый номер дня 01-01-1970 для перевода в datetime64
+    EPOCH = date(1970, 1, 1).toordinal()
+
+    def __init__(self, ledger):
+        # Столбцы — представления записей журнала: отчёт читает только нужные поля и только свой период
+        self.ledger = ledger
+        self.amounts = ledger.rows['amount']
+        self.days = ledger.rows['date']
+        self.category_codes = ledger.rows['category']
+        self.categories = pd.Index(ledger.categories)
+
+    def _slice(self, start=None, end=None):
+        """ Границы периода [start, end] в упорядоченных по дате столбцах """
+        return self.ledger.select(start, end)
+
+    def totals(self, start=None, end=None):
+        """ Доходы, расходы и баланс за период """
+        amounts = self.amounts[self._slice(start, end)]
+        income = np.maximum(amounts, 0).sum()
+        balance = amounts.sum()
+        return {'income': float(income), 'expense': float(balance - income), 'balance': float(balance)}
+
+    def group_by(self, by, start=None, end=None):
+        """ Доходы, расходы и баланс с группировкой по категории, дню, неделе или месяцу """
+        if by not in self.GROUPS:
+            raise ValueError(f'Группировка возможна по одному из полей: {", ".join(self.GROUPS)}')
+        part = self._slice(start, end)
+        amounts = self.amounts[part]
+
+        if by == 'category':
+            labels, codes = self.categories, self.category_codes[part].astype(np.intp)
+            size = len(labels)
+        else:
+            # Даты переводятся в datetime64 только для выбранного периода
+            days = self.days[part].astype(np.int64)
+            dates = (days - self.EPOCH).astype('datetime64[D]')
+            dates[days == 0] = np.datetime64('NaT')
+            if by == 'day':
+                keys = dates
+            elif by == 'week':
+                # Неделя начинается с понедельника, 01-01-1970 — четверг
+                days = dates.astype(np.int64)
+                keys = (days - (days + 3) % 7).astype('datetime64[D]')
+            else:
+                keys = dates.astype('datetime64[M]')
+            labels, codes = np.unique(keys, return_inverse=True)
+            size = len(labels)
+
+        income = np.bincount(codes, weights=np.maximum(amounts, 0), minlength=size)
+        balance = np.bincount(codes, weights=amounts, minlength=size)
+        report = pd.DataFrame({'income': income, 'expense': balance - income, 'balance': balance},
+                              index=pd.Index(labels, name=by))
+        if by == 'category':
+            report = report[np.bincount(codes, minlength=size) > 0]
+        return report
+
+
+class FinanceAggregates(LiveIndex):
+    """ Материализованные итоги финансов: баланс и суммы по категориям, дням и месяцам """
+    # Итог — [доход, баланс, число записей], расход равен балансу минус доход.
+    # Дни и месяцы хранят итоги по категориям, поэтому отчёт за период складывает только их
+    TOLERANCE = 1e-6
+    # Группировки отчёта: по категории, дню, неделе с понедельника и месяцу
+    GROUPS = ('category', 'day', 'week', 'month')
+    # Формат файла итогов: файлы другого формата не читаются и строятся заново
+    FORMAT = 2
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        self._clear()
+
+    def _clear(self):
+        self.entries = {} # {id: (сумма, категория, день)} — вклад записи, чтобы снять его за O(1)
+        self.total = [0.0, 0.0, 0]
+        self.categories = {} # {категория: итог}
+        self.days = {} # {день: {категория: итог}}; день — date.toordinal, 0 — некорректная дата
+        self.months = {} # {год * 12 + месяц - 1: {категория: итог}}
+        self.day_keys = [] # дни по возрастанию для отбора периода
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def month_bounds(day):
+        """ Номер месяца дня и его первый и последний дни """
+        value = date.fromordinal(day)
+        month = value.year * 12 + value.month - 1
+        first = date(value.year, value.month, 1).toordinal()
+        following = month + 1
+        return month, first, date(following // 12, following % 12 + 1, 1).toordinal() - 1
+
+    def _add(self, record):
+        try:
+            amount = float(record['amount'])
+        except (TypeError, ValueError):
+            amount = 0.0 # некорректная сумма не меняет итогов, но запись учитывается в количестве
+        value = record['date']
+        entry = (amount, record['category'], value.toordinal() if isinstance(value, date) else 0)
+        self.entries[record['id']] = entry
+        self._change(*entry, 1)
+
+    def _remove(self, record_id):
+        entry = self.entries.pop(record_id, None)
+        if entry is not None:
+            self._change(*entry, -1)
+
+    def _change(self, amount, category, day, sign):
+        """ Прибавление (sign=1) или вычитание (sign=-1) записи из всех итогов """
+        income = max(amount, 0.0) * sign
+        amount *= sign
+        self._update(self.total, income, amount, sign)
+        if not self.total[2]:
+            self.total[:] = [0.0, 0.0, 0] # без записей накопленная погрешность сбрасывается
+        self._update_in(self.categories, category, income, amount, sign)
+
+        by_day = self.days.get(day)
+        if by_day is None:
+            by_day = self.days[day] = {}
+            insort(self.day_keys, day)
+        self._update_in(by_day, category, income, amount, sign)
+        if not by_day:
+            del self.days[day]
+            del self.day_keys[bisect_left(self.day_keys, day)]
+        if day:
+            month = self.month_bounds(day)[0]
+            by_month = self.months.setdefault(month, {})
+            self._update_in(by_month, category, income, amount, sign)
+            if not by_month:
+                del self.months[month]
+
+    @staticmethod
+    def _update(bucket, income, amount, count):
+        bucket[0] += income
+        bucket[1] += amount
+        bucket[2] += count
+
+    @classmethod
+    def _update_in(cls, buckets, key, income, amount, count):
+        """ Изменение итога по ключу, итог без записей удаляется """
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [0.0, 0.0, 0]
+        cls._update(bucket, income, amount, count)
+        if not bucket[2]:
+            del buckets[key]
+
+    def report(self, start=None, end=None, category=None):
+        """ Доходы, расходы и баланс за период [start, end] по категориям, без перебора записей """
+        self.ensure()
+        if start is None and end is None:
+            if category is None:
+                return self._result(self.total, self.categories)
+            bucket = self.categories.get(category)
+            return self._result(bucket or [0.0, 0.0, 0], {} if bucket is None else {category: bucket})
+        lo = 0 if start is None else start.toordinal()
+        hi = math.inf if end is None else end.toordinal()
+        total, categories = [0.0, 0.0, 0], {}
+        keys = self.day_keys
+        i, stop = bisect_left(keys, lo), bisect_right(keys, hi)
+        while i < stop:
+            day = keys[i]
+            if day:
+                # Месяц, целиком попавший в период, берётся одним итогом
+                month, first, last = self.month_bounds(day)
+                if first >= lo and last <= hi:
+                    self._merge(total, categories, self.months[month], category)
+                    i = bisect_right(keys, last, i)
+                    continue
+            self._merge(total, categories, self.days[day], category)
+            i += 1
+        return self._result(total, categories)
+
+    def group_by(self, by, start=None, end=None, category=None):
+        """ Доходы, расходы и баланс за период [start, end] по категориям, дням, неделям или месяцам """
+        self.check_group(by)
+        if by == 'category':
+            return self.report(start, end, category)['categories']
+        return self.group_rows(by, self.groups(by, start, end, category))
+
+    @classmethod
+    def check_group(cls, by):
+        if by not in cls.GROUPS:
+            raise ValueError(f'Группировка возможна по одному из полей: {", ".join(cls.GROUPS)}')
+
+    def groups(self, by, start=None, end=None, category=None):
+        """ Итоги периода по дням, неделям или месяцам: {первый день группы: итог}, 0 — записи без даты """
+        self.ensure()
+        lo = 0 if start is None else start.toordinal()
+        hi = math.inf if end is None else end.toordinal()
+        groups = {}
+        keys = self.day_keys
+        i, stop = bisect_left(keys, lo), bisect_right(keys, hi)
+        while i < stop:
+            day = keys[i]
+            i += 1
+            buckets = self.days[day]
+            if not day:
+                key = 0
+            elif by == 'month':
+                month, key, last = self.month_bounds(day)
+                # Месяц, целиком попавший в период, берётся одним итогом
+                if key >= lo and last <= hi:
+                    buckets = self.months[month]
+                    i = bisect_right(keys, last, i)
+            elif by == 'week':
+                key = day - (day - 1) % 7 # первый порядковый день, 01-01-0001, — понедельник
+            else:
+                key = day
+            if category is not None:
+                buckets = {category: buckets[category]} if category in buckets else {}
+            if not buckets:
+                continue
+            bucket = groups.get(key)
+            if bucket is None:
+                bucket = groups[key] = [0.0, 0.0, 0]
+            for income, amount, count in buckets.values():
+                self._update(bucket, income, amount, count)
+        return groups
+
+    @classmethod
+    def group_rows(cls, by, groups):
+        """ Итоги групп в виде словаря отчёта по возрастанию дат: день и неделя — ДД-ММ-ГГГГ, месяц — ММ-ГГГГ """
+        rows = {}
+        for key in sorted(groups):
+            if not key:
+                label = None # записи с некорректной датой
+            elif by == 'month':
+                value = date.fromordinal(key)
+                label = f'{value.month:02d}-{value.year}'
+            else:
+                label = Record.format(date.fromordinal(key))
+            rows[label] = cls._row(groups[key])
+        return rows
+
+    def _merge(self, total, categories, buckets, only=None):
+        if only is not None:
+            buckets = {only: buckets[only]} if only in buckets else {}
+        for category, (income, amount, count) in buckets.items():
+            self._update(total, income, amount, count)
+            bucket = categories.get(category)
+            if bucket is None:
+                bucket = categories[category] = [0.0, 0.0, 0]
+            self._update(bucket, income, amount, count)
+
+    @staticmethod
+    def _row(bucket):
+        return {'income': bucket[0], 'expense': bucket[1] - bucket[0], 'balance': bucket[1], 'count': bucket[2]}
+
+    @classmethod
+    def _result(cls, total, categories):
+        """ Итоги в виде словаря отчёта """
+        return {**cls._row(total),
+                'categories': {k: cls._row(v) for k, v in sorted(categories.items(), key=lambda i: str(i[0]))}}
+
+    @classmethod
+    def collect(cls, records):
+        """ Итоги по перечню записей тем же расчётом — для фильтров, под которые итоги не материализованы """
+        aggregates = cls(None)
+        for record in records:
+            aggregates._add(record)
+        return aggregates
+
+    @classmethod
+    def summarize(cls, records):
+        """ Отчёт по перечню записей """
+        aggregates = cls.collect(records)
+        return aggregates._result(aggregates.total, aggregates.categories)
+
+    def buckets(self):
+        """ Все итоги плоским словарём {(вид, ключ, категория): итог} для сверки """
+        flat = {('total', None, None): self.total}
+        flat.update((('category', None, k), v) for k, v in self.categories.items())
+        for kind, groups in (('day', self.days), ('month', self.months)):
+            for key, by_category in groups.items():
+                flat.update(((kind, key, k), v) for k, v in by_category.items())
+        return flat
+
+    def check(self):
+        """ Сверка с итогами, пересчитанными по записям хранилища: список расхождений, пустой — итоги верны """
+        self.ensure()
+        fresh = FinanceAggregates(self.manager)
+        fresh.rebuild()
+        problems = []
+        if self.entries != fresh.entries:
+            problems.append(('entries', len(self.entries), len(fresh.entries)))
+        current, expected = self.buckets(), fresh.buckets()
+        for key in current.keys() | expected.keys():
+            got, want = current.get(key), expected.get(key)
+            if got is None or want is None or got[2] != want[2] or not all(
+                    math.isclose(a, b, rel_tol=self.TOLERANCE, abs_tol=self.TOLERANCE) for a, b in zip(got, want)):
+                problems.append((key, got, want))
+        if self.day_keys != sorted(self.days):
+            problems.append(('day_keys', len(self.day_keys), len(self.days)))
+        return problems
+
+    def dump(self):
+        """ Функция записи итогов для save_derived: содержимое сериализуется сразу, до фоновой записи """
+        body = JSON_CODEC.encode({
+            'entries': [[i, *entry] for i, entry in self.entries.items()],
+            'total': self.total,
+            'categories': list(self.categories.items()),
+            # Итоги по категориям — списки пар: ключи объектов JSON стали бы строками, а категория
+            # может быть числом или None
+            'days': [[day, list(buckets.items())] for day, buckets in self.days.items()],
+            'months': [[month, list(buckets.items())] for month, buckets in self.months.items()],
+        })
+
+        def write(f, version):
+            f.write(JSON_CODEC.encode({'version': version, 'format': self.FORMAT}) + b'\n')
+            f.write(body)
+
+        return write
+
+    def save(self, path):
+        """ Запись итогов рядом с хранилищем, если они изменились """
+        if self.dirty:
+            self.manager.save_derived(path, self.dump())
+            self.dirty = False
+
+    @classmethod
+    def open(cls, manager, path):
+        """ Итоги с диска, если они построены по тем же файлам хранилища, иначе пустые до первого отчёта """
+        version = manager.file_version()
+        aggregates = None if version is None else cls.read(path, version, manager)
+        return cls(manager) if aggregates is None else aggregates
+
+    @classmethod
+    def read(cls, path, version, manager=None):
+        """ Итоги из файла с подписью version, None — если файла нет или он построен по другим данным """
+        aggregates = cls(manager)
+        try:
+            with open(path, 'rb') as f:
+                if JSON_CODEC.decode(f.readline()) != {'version': version, 'format': cls.FORMAT}:
+                    return None
+                body = JSON_CODEC.decode(f.read())
+        except (FileNotFoundError, ValueError, *JSON_CODEC.errors):
+            return None
+        aggregates.entries = {i: (amount, category, day) for i, amount, category, day in body['entries']}
+        aggregates.total = body['total']
+        aggregates.categories = dict(body['categories'])
+        aggregates.days = {day: dict(buckets) for day, buckets in body['days']}
+        aggregates.months = {month: dict(buckets) for month, buckets in body['months']}
+        aggregates.day_keys = sorted(aggregates.days)
+        aggregates.seq = None if manager is None else manager.seq
+        return aggregates
+
+
+class ShardedAggregates:
+    """ Итоги хранилища по месяцам: у каждой части свои FinanceAggregates, отчёт складывает части периода """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.stored = {} # {часть: (подпись файлов, итоги)} — итоги незагруженных частей, прочитанные с диска
+
+    def path(self, name):
+        return os.path.join(self.manager.dir, name + '.aggregates')
+
+    def part(self, name, stored=True):
+        """ Итоги части: с диска, если построены по её текущим файлам, иначе по её записям """
+        if stored and name not in self.manager.shards:
+            # Для отчёта по прошлому месяцу хватает файла итогов: сама часть не читается и не распаковывается
+            version = self.manager.shard_version(name)
+            stored = self.stored.get(name)
+            if stored is not None and stored[0] == version:
+                return stored[1]
+            aggregates = FinanceAggregates.read(self.path(name), version)
+            if aggregates is not None:
+                self.stored[name] = (version, aggregates)
+                return aggregates
+        self.stored.pop(name, None)
+        return self.manager.shard(name).attach('aggregates', lambda shard: FinanceAggregates.open(shard, self.path(name)))
+
+    def report(self, start=None, end=None, category=None):
+        """ Доходы, расходы и баланс за период: читаются только итоги частей, пересекающихся с ним """
+        lo = -math.inf if start is None else start.toordinal()
+        hi = math.inf if end is None else end.toordinal()
+        total, categories = [0.0, 0.0, 0], {}
+        for name in self.manager.names(start, end):
+            inside = True
+            if name != self.manager.UNDATED:
+                _, first, last = FinanceAggregates.month_bounds(date(int(name[:4]), int(name[5:]), 1).toordinal())
+                inside = lo <= first and last <= hi
+            # Месяц целиком внутри периода берётся общим итогом части, без перебора дней
+            report = self.part(name).report(None if inside else start, None if inside else end, category)
+            self._add(total, report)
+            for key, row in report['categories'].items():
+                self._add(categories.setdefault(key, [0.0, 0.0, 0]), row)
+        return FinanceAggregates._result(total, categories)
+
+    def group_by(self, by, start=None, end=None, category=None):
+        """ Итоги периода с группировкой: группы частей складываются, неделя может начаться в прошлом месяце """
+        FinanceAggregates.check_group(by)
+        if by == 'category':
+            return self.report(start, end, category)['categories']
+        groups = {}
+        for name in self.manager.names(start, end):
+            for key, bucket in self.part(name).groups(by, start, end, category).items():
+                FinanceAggregates._update(groups.setdefault(key, [0.0, 0.0, 0]), *bucket)
+        return FinanceAggregates.group_rows(by, groups)
+
+    @staticmethod
+    def _add(bucket, row):
+        FinanceAggregates._update(bucket, row['income'], row['balance'], row['count'])
+
+    def ensure(self):
+        for name in self.manager.names():
+            self.part(name).ensure()
+
+    def rebuild(self):
+        for name in self.manager.names():
+            self.part(name, stored=False).rebuild()
+
+    def check(self):
+        """ Сверка итогов каждой части с её записями: список расхождений с именем части в ключе """
+        return [((name, key), got, expected)
+                for name in self.manager.names() for key, got, expected in self.part(name, stored=False).check()]
+
+    def save(self, path=None):
+        """ Запись изменившихся итогов загруженных частей, каждая — рядом со своей частью """
+        for name, shard in list(self.manager.shards.items()):
+            aggregates = shard._attached.get('aggregates')
+            if aggregates is not None:
+                aggregates.save(self.path(name))
+
+    def seal(self, names):
+        """ Итоги сжатых частей заново подписываются их новыми файлами, и части выгружаются из памяти """
+        for name in names:
+            aggregates = self.part(name)
+            aggregates.ensure()
+            self.manager.shard(name).save_derived(self.path(name), aggregates.dump())
+            aggregates.dirty = False
+            self.manager.unload(name)
+
+
+class ReportCache:
+    """ Готовые отчёты: не больше size последних использованных, каждый — не дольше ttl секунд """
+    SIZE = 64
+    TTL = 300
+
+    def __init__(self, size=None, ttl=None):
+        self.size = self.SIZE if size is None else size
+        self.ttl = self.TTL if ttl is None else ttl
+        self.version = None # версия хранилища, по которой посчитаны отчёты
+        self.items = {} # {ключ: (время расчёта, отчёт)}, словарь хранит порядок: последний использованный в конце
+        self.hits = self.misses = 0
+
+    def _check_version(self, version):
+        # Ключ отчёта включает версию хранилища: после изменения данных устаревают все отчёты разом
+        if version != self.version:
+            self.items.clear()
+            self.version = version
+
+    def get(self, key, version):
+        """ Отчёт по ключу для версии хранилища, None — если его нет или он устарел """
+        self._check_version(version)
+        item = self.items.pop(key, None)
+        if item is None or time.monotonic() - item[0] > self.ttl:
+            self.misses += 1
+            return None
+        self.items[key] = item
+        self.hits += 1
+        return item[1]
+
+    def put(self, key, version, value):
+        """ Сохранение отчёта, самые давние вытесняются сверх size """
+        self._check_version(version)
+        self.items[key] = (time.monotonic(), value)
+        while len(self.items) > self.size:
+            del self.items[next(iter(self.items))]
+
+
 class FinanceRecord:
+    RECORD = FinanceEntry
+    # Раскладка JSON-хранилища: file — один файл data/finance.json, monthly — части по месяцам
+    # data/finance/ГГГГ-ММ.json; по умолчанию monthly, если части уже созданы
+    LAYOUTS = ('file', 'monthly')
+    LAYOUT = os.environ.get('PA_FINANCE_LAYOUT') or None
+
     def __init__(self):
         self.path = os.path.join('data', 'finance.json')
-        self.manager = MainManager(self.path)
+        self.aggregates_path = os.path.join('data', 'finance.aggregates')
+        self.manager = open_manager(self.path, self.RECORD, self.storage())
+        self.manager.add_sorted_index('date', lambda i: MainManager.date_key(i['date']))
+        # Итоги обновляются при каждом изменении записей, отчёт складывает готовые итоги дней и месяцев
+        if isinstance(self.manager, ShardedManager):
+            self.aggregates = ShardedAggregates(self.manager)
+        else:
+            self.aggregates = self.manager.attach('aggregates', lambda manager: FinanceAggregates.open(
+                manager, self.aggregates_path))
+        self.reports = ReportCache()
+
+    def storage(self):
+        """ Движок хранения: для JSON — с учётом раскладки по месяцам """
+        if os.environ.get('PA_STORAGE', 'json') != 'json':
+            return None
+        layout = self.LAYOUT
+        if layout is None:
+            layout = 'monthly' if ShardedManager.has_store(self.path) else 'file'
+        if layout not in self.LAYOUTS:
+            raise ValueError(f'Неизвестная раскладка финансов: {layout}. Доступны: {", ".join(self.LAYOUTS)}')
+        return 'monthly' if layout == 'monthly' else 'json'
 
     def create_record(self, amount: float, category: str, date: str, description=None):
         """ Создание записи о доходе/расходе """
@@ -391,33 +3732,28 @@ class FinanceRecord:
             return
 
         # Установка id
-        if len(self.manager.data) == 0:
-            id_record = 1
-        else:
-            id_record = self.manager.data[-1]['id'] + 1
+        id_record = self.manager.next_id()
 
         # Исправление description
         if description == '':
             description = None
 
-        record = {
+        record = FinanceEntry.from_dict({
             'id': id_record,
             'amount': amount,
             'category': str(category),
             'date': date,
             'description': str(description)
-        }
+        })
 
-        self.manager.data.append(record)
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
+        self.manager.insert_data(record)
 
         print(f'Запись {id_record} за {date} успешно создана!\n')
 
     def show_list_records(self, key_dict, key_result):
         """ Вывод списка записей """
         if key_dict is None:
-            records_list = self.manager.data
+            records_list = list(self.manager.iter_records())
         else:
             records_list = self.manager.find_data(key_dict, key_result)
         if records_list:
@@ -428,67 +3764,188 @@ class FinanceRecord:
             print('Доходы:')
             if revenue_list:
                 for revenue in revenue_list:
-                    print(f'{revenue['date']} — {revenue['category']} — {revenue['amount']}')
+                    print(f'{revenue.text('date')} — {revenue['category']} — {revenue['amount']}')
             else:
                 print('Данные отсутствуют')
             if cost_list:
                 for cost in cost_list:
-                    print(f'{cost['date']} — {cost['category']} — {cost['amount']}')
+                    print(f'{cost.text('date')} — {cost['category']} — {cost['amount']}')
             else:
                 print('Данные отсутствуют')
+            summary = self.summary(key_dict, key_result)
+            if summary is not None:
+                print(f'Итого: доход {summary["income"]:.2f}, расходы {summary["expense"]:.2f}, '
+                      f'баланс {summary["balance"]:.2f}')
             print(' ') # просто отступ
         else:
             print('Данные отсутствуют\n')
 
-    def create_report(self, start_date, end_date):
-        """ Генерация отчёта """
+    def summary(self, key_dict=None, key_result=None):
+        """ Итоги по всем записям, категории или дню из материализованных итогов, None — для других полей """
+        if key_dict is None:
+            return self.aggregates.report()
+        if key_dict == 'category':
+            return self.aggregates.report()['categories'].get(key_result)
+        if key_dict == 'date':
+            try:
+                day = parse_date(key_result) if isinstance(key_result, str) else key_result
+            except ValueError:
+                return None
+            return self.aggregates.report(day, day)
+        return None
+
+    def report(self, start=None, end=None, **filters):
+        """ Итоги за период с отбором по полям, повторный запрос до изменения данных берётся из кеша """
+        version = self.manager.seq
+        key = ('report', start, end, tuple(sorted(filters.items())))
+        report = self.reports.get(key, version)
+        if report is None:
+            if set(filters) <= {'category'}:
+                report = self.aggregates.report(start, end, filters.get('category'))
+            else:
+                report = FinanceAggregates.summarize(self.manager.iter_records(start, end, **filters))
+            self.reports.put(key, version, report)
+        return report
+
+    def group_report(self, by, start=None, end=None, **filters):
+        """ Итоги за период по категориям, дням, неделям или месяцам, повторный запрос берётся из кеша """
+        version = self.manager.seq
+        key = ('groups', by, start, end, tuple(sorted(filters.items())))
+        groups = self.reports.get(key, version)
+        if groups is None:
+            if set(filters) <= {'category'}:
+                groups = self.aggregates.group_by(by, start, end, filters.get('category'))
+            else:
+                groups = FinanceAggregates.collect(self.manager.iter_records(start, end, **filters)).group_by(by)
+            self.reports.put(key, version, groups)
+        return groups
+
+    @staticmethod
+    def report_path(start_date, end_date, filters):
+        """ Файл отчёта: период и отбор в имени, чтобы разные отчёты не затирали друг друга """
+        suffix = ''.join(f'_{k}-{v}' for k, v in sorted(filters.items()))
+        return os.path.join('data', re.sub(r'[^\w.-]', '_', f'report_{start_date}_{end_date}{suffix}') + '.csv')
+
+    def _cached_report_file(self, path, version):
+        """ Итоги файла отчёта, если он записан по текущим данным и не менялся, иначе None """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.reports.get(('file', path), version)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        # Файл мог записать другой процесс: годится, если хранилище с тех пор не менялось
+        file_version = self.manager.file_version()
+        if file_version is None:
+            return None
+        try:
+            with open(path + '.meta', 'rb') as f:
+                meta = JSON_CODEC.decode(f.read())
+        except (FileNotFoundError, ValueError, *JSON_CODEC.errors):
+            return None
+        if meta.get('version') != file_version or meta.get('file') != signature:
+            return None
+        self.reports.put(('file', path), version, (signature, meta['report']))
+        return meta['report']
+
+    def _remember_report_file(self, path, version, report):
+        """ Запоминание файла отчёта в кеше и в сведениях рядом с ним для других процессов """
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        self.reports.put(('file', path), version, (signature, report))
+        body = {'file': signature, 'report': report}
+
+        def write(f, file_version):
+            f.write(JSON_CODEC.encode({'version': file_version, **body}))
+
+        self.manager.save_derived(path + '.meta', write)
+
+    def create_report(self, start_date, end_date, group_by=None, **filters):
+        """ Генерация отчёта, group_by — дополнительная таблица по дням, неделям или месяцам """
         # Проверка формата даты
         try:
             start_date = datetime.strptime(start_date, '%d-%m-%Y').date()
             end_date = datetime.strptime(end_date, '%d-%m-%Y').date()
         except ValueError:
             raise ValueError('Формат даты указан неверно. Правильный формат: ДД-ММ-ГГГГ')
-
-        dates_list = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
-
-        result = []
-        for date in dates_list:
-            records_list = self.manager.find_data('date', date)
-            result.extend(records_list)
-
-        # Сохранение данных
-        path = os.path.join('data', f'report_{start_date}_{end_date}.csv')
-        self.manager.save_file('csv', path)
-
-        # Ревизия
-        sum_rev = sum([i for i in result if i['amount'] > 0])
-        sum_cost = sum([i for i in result if i['amount'] < 0])
-        balance = sum_rev + sum_cost
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if group_by is not None:
+            FinanceAggregates.check_group(group_by)
+
+        # Сохранение данных: в файл выгружаются только записи периода, неизменившийся файл не переписывается
+        path = self.report_path(start_date, end_date, filters)
+        version = self.manager.seq
+        report = self._cached_report_file(path, version)
+        if report is None:
+            report = self.report(start_date, end_date, **filters)
+            self.manager.save_file('csv', path, date_from=start_date, date_to=end_date, **filters)
+            self._remember_report_file(path, version, report)
+        self.aggregates.save(self.aggregates_path)
 
         print(f'Финансовый отчет за период с {start_date} по {end_date}:')
-        print('Общий доход:', sum_rev)
-        print('Общие расходы:', sum_cost)
-        print('Баланс:', balance)
+        print('Общий доход:', round(report['income'], 2))
+        print('Общие расходы:', round(report['expense'], 2))
+        print('Баланс:', round(report['balance'], 2))
+        if report['categories']:
+            print('По категориям:')
+            print(self.format_categories(report['categories']))
+        if group_by not in (None, 'category'):
+            groups = self.group_report(group_by, start_date, end_date, **filters)
+            if groups:
+                print(f'По периодам ({group_by}):')
+                print(self.format_categories(groups, group_by))
         print('Подробная информация сохранена в файле', path)
 
+    @staticmethod
+    def format_categories(categories, name='category'):
+        """ Таблица доходов, расходов и баланса по категориям или периодам """
+        rows = [(name, 'income', 'expense', 'balance')]
+        rows += [(str(k), *(f'{v[i]:.2f}' for i in ('income', 'expense', 'balance'))) for k, v in categories.items()]
+        widths = [max(len(row[i]) for row in rows) for i in range(4)]
+        return '\n'.join(row[0].ljust(widths[0]) + ''.join(f'  {value:>{width}}' for value, width in zip(row[1:], widths[1:]))
+                         for row in rows)
+
+    def check_aggregates(self):
+        """ Сверка материализованных итогов с пересчётом по записям, при расхождении итоги пересобираются """
+        problems = self.aggregates.check()
+        if not problems:
+            print(f'Итоги сходятся с записями: {self.aggregates.report()["count"]} записей.\n')
+            return True
+        print(f'Найдено расхождений в итогах: {len(problems)}')
+        for key, got, expected in problems[:10]:
+            print(f'{key}: сохранено {got}, по записям {expected}')
+        self.aggregates.rebuild()
+        self.aggregates.save(self.aggregates_path)
+        print('Итоги пересобраны по записям.\n')
+        return False
+
+    def compress_history(self):
+        """ Сжатие прошлых месяцев в раскладке по месяцам: они больше не меняются и читаются только для отчётов """
+        if not isinstance(self.manager, ShardedManager):
+            print('Сжатие доступно для раскладки по месяцам: PA_FINANCE_LAYOUT=monthly\n')
+            return []
+        names = self.manager.compress()
+        self.aggregates.seal(names)
+        print(f'Сжато месяцев: {len(names)}\n')
+        return names
+
     def delete_record(self, key_dict, key_result):
         self.manager.delete_data('finance', key_dict, key_result)
 
-        with open(self.path, 'w') as f:
-            json.dump(self.manager.data, f)
-
         print('Данные успешно удалены!')
 
     def import_records(self, path_import, path_home=None):
         if path_home is None:
             path_home = self.path
-        self.manager.load_file('csv', path_import, path_home)
+        self.manager.load_file('csv', path_import, path_home, progress=self.manager.print_progress)
         print(f'Финансовые записи успешно загружены из следующего файла: {path_import}\n')
 
-    def export_records(self, path=None):
+    def export_records(self, path=None, **filters):
         if path is None:
             path = self.path
-        self.manager.save_file('csv', path)
+        self.manager.save_file('csv', path, **filters)
         print(f'Финансовые записи успешно сохранены по следующему пути: {path}\n')
 
 class Calculator:
@@ -549,11 +4006,12 @@ class Menu:
         print('5. Удаление заметки')
         print('6. Импорт заметок')
         print('7. Экспорт заметок')
-        print('8. Вернуться в главное меню')
+        print('8. Поиск по тексту заметок')
+        print('9. Вернуться в главное меню')
 
         console = int(input('Выберите действие: '))
-        while self.check_choice(console, 8) == 0:
-            console = int(input('Пожалуйста введите число от 1 до 8: '))
+        while self.check_choice(console, 9) == 0:
+            console = int(input('Пожалуйста введите число от 1 до 9: '))
         print(' ') # просто отступ
 
         if console == 1:
@@ -644,6 +4102,13 @@ class Menu:
             note.export_notes(kind_file, path)
             return True
 
+        elif console == 8:
+            print('ПОИСК ПО ТЕКСТУ')
+            print('Введите слова для поиска:')
+            query = input()
+            note.search_notes(query)
+            return True
+
         else:
             return False
 
@@ -658,11 +4123,12 @@ class Menu:
         print('6. Удаление задачи')
         print('7. Импорт задач')
         print('8. Экспорт задач')
-        print('9. Вернуться в главное меню')
+        print('9. Расписание: просроченные и ближайшие задачи')
+        print('10. Вернуться в главное меню')
 
         console = int(input('Выберите действие: '))
-        while self.check_choice(console, 9) == 0:
-            console = int(input('Пожалуйста введите число от 1 до 9: '))
+        while self.check_choice(console, 10) == 0:
+            console = int(input('Пожалуйста введите число от 1 до 10: '))
         print(' ')  # просто отступ
 
         if console == 1:
@@ -771,6 +4237,11 @@ class Menu:
             task.export_tasks(kind_file, path)
             return True
 
+        elif console == 9:
+            print('РАСПИСАНИЕ ЗАДАЧ')
+            task.show_schedule()
+            return True
+
         else:
             return False
 
@@ -971,6 +4442,455 @@ class Menu:
 
 
 
+class Cli:
+    """ Неинтерактивный режим: команды из аргументов или файла JSONL над одними загруженными хранилищами """
+    ENTITIES = {'notes': Note, 'tasks': Task, 'contacts': Contact, 'finance': FinanceRecord}
+
+    def __init__(self):
+        self._entities = {}
+
+    def entity(self, name):
+        """ Хранилище раздела, создаётся один раз на весь запуск """
+        if name not in self._entities:
+            self._entities[name] = self.ENTITIES[name]()
+        return self._entities[name]
+
+    @staticmethod
+    def build_parser():
+        """ Разбор аргументов командной строки; имена параметров совпадают с ключами команд JSONL """
+        parser = argparse.ArgumentParser(prog='personal_assistant',
+                                         description='Персональный помощник. Без аргументов запускается меню.')
+        sections = parser.add_subparsers(dest='section', required=True)
+
+        def add(section, action, *arguments):
+            command = section.add_parser(action)
+            for names, options in arguments:
+                command.add_argument(*names, **options)
+
+        def file_commands(section, formats=True):
+            fmt = [(('--format',), {'choices': ('json', 'csv'), 'default': 'json'})] if formats else []
+            add(section, 'import', (('path',), {}), *fmt)
+            add(section, 'export', (('path',), {}), *fmt)
+
+        notes = sections.add_parser('notes', help='заметки').add_subparsers(dest='action', required=True)
+        add(notes, 'add', (('--title',), {'required': True}), (('--content',), {'default': ''}))
+        add(notes, 'list')
+        add(notes, 'show', (('title',), {}))
+        add(notes, 'search', (('query',), {}), (('--limit',), {'type': int, 'default': 10}))
+        add(notes, 'update', (('title',), {}), (('--field',), {'choices': ('title', 'content'), 'required': True}),
+            (('--value',), {'required': True}))
+        add(notes, 'delete', (('title',), {}))
+        file_commands(notes)
+
+        tasks = sections.add_parser('tasks', help='задачи').add_subparsers(dest='action', required=True)
+        add(tasks, 'add', (('--title',), {'required': True}), (('--priority',), {'required': True}),
+            (('--due',), {'required': True}), (('--description',), {'default': ''}))
+        add(tasks, 'list')
+        add(tasks, 'show', (('title',), {}))
+        add(tasks, 'done', (('title',), {}))
+        add(tasks, 'update', (('title',), {}),
+            (('--field',), {'choices': ('title', 'description', 'priority', 'due_date'), 'required': True}),
+            (('--value',), {'required': True}))
+        add(tasks, 'delete', (('title',), {}))
+        add(tasks, 'schedule', (('--count',), {'type': int, 'default': 5}))
+        file_commands(tasks)
+
+        contacts = sections.add_parser('contacts', help='контакты').add_subparsers(dest='action', required=True)
+        add(contacts, 'add', (('--name',), {'required': True}), (('--phone',), {'default': ''}),
+            (('--email',), {'default': ''}))
+        add(contacts, 'show', (('--by',), {'choices': ('name', 'phone'), 'default': 'name'}), (('value',), {}))
+        add(contacts, 'search', (('query',), {}), (('--limit',), {'type': int, 'default': 10}))
+        add(contacts, 'update', (('--by',), {'choices': ('name', 'phone'), 'default': 'name'}), (('key',), {}),
+            (('--field',), {'choices': ('name', 'phone', 'email'), 'required': True}),
+            (('--value',), {'required': True}))
+        add(contacts, 'delete', (('--by',), {'choices': ('name', 'phone'), 'default': 'name'}), (('value',), {}))
+        file_commands(contacts)
+
+        finance = sections.add_parser('finance', help='финансы').add_subparsers(dest='action', required=True)
+        add(finance, 'add', (('--amount',), {'type': float, 'required': True}), (('--category',), {'required': True}),
+            (('--date',), {'required': True}), (('--description',), {'default': ''}))
+        add(finance, 'list', (('--by',), {'choices': ('date', 'category')}), (('--value',), {}))
+        add(finance, 'report', (('--from', '--start'), {'dest': 'start', 'required': True}),
+            (('--to', '--end'), {'dest': 'end', 'required': True}), (('--category',), {}),
+            (('--group-by',), {'dest': 'group_by', 'choices': FinanceAggregates.GROUPS}))
+        add(finance, 'delete', (('--by',), {'choices': ('id', 'date', 'category'), 'default': 'id'}),
+            (('value',), {}))
+        add(finance, 'check')
+        add(finance, 'compress')
+        file_commands(finance, formats=False)
+
+        sections.add_parser('migrate', help='перенос данных из JSON в SQLite')
+        batch = sections.add_parser('batch', help='команды из файла JSONL')
+        batch.add_argument('path', help='файл, по одной команде на строку; - — стандартный ввод')
+        batch.add_argument('-q', '--quiet', action='store_true', help='выводить только итог')
+        serve = sections.add_parser('serve', help='локальный HTTP/JSON-сервис')
+        serve.add_argument('--host', default='127.0.0.1')
+        serve.add_argument('--port', type=int, default=8765)
+        return parser
+
+    def run(self, section, action, params):
+        """ Выполнение одной команды над хранилищем раздела """
+        entity = self.entity(section)
+        get = params.get
+        if section == 'notes':
+            if action == 'add':
+                entity.create_note(params['title'], get('content', ''))
+            elif action == 'list':
+                entity.show_list_notes()
+            elif action == 'show':
+                entity.print_note(params['title'])
+            elif action == 'search':
+                entity.search_notes(params['query'], get('limit', 10))
+            elif action == 'update':
+                entity.update_note(params['title'], params['field'], params['value'])
+            elif action == 'delete':
+                entity.delete_note(params['title'])
+            elif action == 'import':
+                entity.import_notes(get('format', 'json'), params['path'])
+            elif action == 'export':
+                entity.export_notes(get('format', 'json'), params['path'])
+            else:
+                raise ValueError(f'Неизвестная команда: {section} {action}')
+        elif section == 'tasks':
+            if action == 'add':
+                entity.create_task(params['title'], params['priority'], params['due'], get('description', ''))
+            elif action == 'list':
+                entity.show_list_tasks()
+            elif action == 'show':
+                entity.print_task(params['title'])
+            elif action == 'done':
+                entity.mark_done(params['title'])
+            elif action == 'update':
+                entity.update_task(params['title'], params['field'], params['value'])
+            elif action == 'delete':
+                entity.delete_task(params['title'])
+            elif action == 'schedule':
+                entity.show_schedule(get('count', 5))
+            elif action == 'import':
+                entity.import_tasks(get('format', 'json'), params['path'])
+            elif action == 'export':
+                entity.export_tasks(get('format', 'json'), params['path'])
+            else:
+                raise ValueError(f'Неизвестная команда: {section} {action}')
+        elif section == 'contacts':
+            if action == 'add':
+                entity.create_contact(params['name'], get('phone', ''), get('email', ''))
+            elif action == 'show':
+                entity.print_contact(get('by', 'name'), params['value'])
+            elif action == 'search':
+                for contact in entity.search_contacts(params['query'], get('limit', 10)):
+                    print(f'{contact["name"]} — {contact["phone"]} — {contact["email"]}')
+            elif action == 'update':
+                entity.update_contact(get('by', 'name'), params['key'], params['field'], params['value'])
+            elif action == 'delete':
+                entity.delete_contact(get('by', 'name'), params['value'])
+            elif action == 'import':
+                entity.import_contacts(get('format', 'json'), params['path'])
+            elif action == 'export':
+                entity.export_contacts(get('format', 'json'), params['path'])
+            else:
+                raise ValueError(f'Неизвестная команда: {section} {action}')
+        elif section == 'finance':
+            if action == 'add':
+                entity.create_record(float(params['amount']), params['category'], params['date'],
+                                     get('description', ''))
+            elif action == 'list':
+                entity.show_list_records(get('by'), get('value'))
+            elif action == 'report':
+                entity.create_report(params['start'], params['end'], group_by=get('group_by'), category=get('category'))
+            elif action == 'delete':
+                by = get('by', 'id')
+                entity.delete_record(by, int(params['value']) if by == 'id' else params['value'])
+            elif action == 'check':
+                entity.check_aggregates()
+            elif action == 'compress':
+                entity.compress_history()
+            elif action == 'import':
+                entity.import_records(params['path'])
+            elif action == 'export':
+                entity.export_records(params['path'])
+            else:
+                raise ValueError(f'Неизвестная команда: {section} {action}')
+
+    def run_batch(self, path, quiet=False):
+        """ Команды из файла JSONL: {"command": "finance report", "start": "01-01-2026", "end": "31-01-2026"} """
+        # Все изменения копятся в транзакциях и записываются одним сбросом в конце;
+        # ошибка в строке не откатывает остальные команды
+        done, failed = 0, 0
+        started = datetime.now()
+        with ExitStack() as stack:
+            source = sys.stdin if path == '-' else stack.enter_context(open(path, encoding='utf-8'))
+            if quiet:
+                stack.enter_context(redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            transactions = set()
+            # Разделы SQLite пишут в один файл базы через разные соединения, поэтому открыта
+            # только транзакция текущего раздела и фиксируется при переходе к другому
+            shared, shared_section = stack.enter_context(ExitStack()), None
+            for number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    params = json.loads(line)
+                    section, action = params.pop('command').split()
+                    if section not in self.ENTITIES:
+                        raise ValueError(f'Неизвестный раздел: {section}')
+                    if section != shared_section:
+                        shared.close()
+                        shared_section = None
+                    manager = self.entity(section).manager
+                    if isinstance(manager, SqliteManager):
+                        if shared_section is None:
+                            shared.enter_context(manager.transaction())
+                            shared_section = section
+                    elif section not in transactions:
+                        stack.enter_context(manager.transaction())
+                        transactions.add(section)
+                    self.run(section, action, params)
+                    done += 1
+                except Exception as error:
+                    failed += 1
+                    print(f'Строка {number}: {type(error).__name__}: {error}', file=sys.stderr)
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f'Выполнено команд: {done}, с ошибкой: {failed}, время: {elapsed:.2f} с')
+        return 1 if failed else 0
+
+
+class Server:
+    """ Локальный HTTP/JSON-сервис: одно загруженное хранилище на процесс для нескольких программ """
+    # Запросы:
+    #   GET  /<раздел>[?поле=значение&from=ДД-ММ-ГГГГ&to=ДД-ММ-ГГГГ&limit=N]  записи раздела
+    #   GET  /<раздел>/<id>                                                 одна запись
+    #   GET  /notes/search?q=…, /contacts/search?q=…, /tasks/schedule?from=…&to=…, /finance/report?from=…&to=…
+    #   POST /<раздел>/<действие> с телом JSON  команда как в режиме batch, например POST /notes/add;
+    #                                           import и export с путями файлов — только из командной строки
+    # Принимаются только запросы к адресу сервиса (Host и Origin) и изменения с Content-Type: application/json
+    STATUS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+              413: 'Payload Too Large', 415: 'Unsupported Media Type', 500: 'Internal Server Error'}
+    LOOPBACK = ('127.0.0.1', 'localhost', '::1')
+    FILE_ACTIONS = ('import', 'export')
+    MAX_BODY = 1 << 20
+    # Окно накопления изменений перед общей фиксацией, секунды
+    BATCH_WINDOW = 0.002
+
+    def __init__(self, host='127.0.0.1', port=8765):
+        self.host = host
+        self.port = port
+        self.cli = Cli()
+        for section in Cli.ENTITIES:
+            self.cli.entity(section)
+        self.queue = None
+        self.stats = Counter()
+
+    def serve(self):
+        """ Запуск сервиса до прерывания """
+        try:
+            asyncio.run(self._serve())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+
+    async def _serve(self, ready=None):
+        self.queue = asyncio.Queue()
+        if hasattr(signal, 'SIGTERM') and sys.platform != 'win32':
+            # Завершение по SIGTERM штатное: накопленные изменения записываются при выходе
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        writer = asyncio.create_task(self._write_loop())
+        server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f'Сервис запущен: http://{self.host}:{self.port}/', flush=True)
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer.cancel()
+
+    async def _handle(self, reader, writer):
+        """ Соединение HTTP/1.1 с поддержкой keep-alive """
+        allowed = self._allowed_hosts(writer.get_extra_info('sockname'))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Некорректная строка запроса'}, False)
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                length = headers.get('content-length') or '0'
+                size = int(length) if length.isascii() and length.isdigit() else -1
+                if size < 0:
+                    # Без верной длины не найти конец тела: соединение закрывается после ответа
+                    await self._respond(writer, 400, {'error': 'Некорректный заголовок Content-Length'}, False)
+                    break
+                if size > self.MAX_BODY:
+                    await self._respond(writer, 413, {'error': 'Слишком большое тело запроса'}, False)
+                    break
+                body = await reader.readexactly(size) if size else b''
+                rejected = self._check_client(method, headers, allowed)
+                status, payload = rejected or await self._dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _allowed_hosts(self, address):
+        """ Значения Host, по которым клиент обращается к адресу соединения """
+        host, port = address[:2]
+        names = set(self.LOOPBACK) if host in self.LOOPBACK else {host}
+        return {f'[{i}]:{port}' if ':' in i else f'{i}:{port}' for i in names}
+
+    def _check_client(self, method, headers, allowed):
+        """ Код и ошибка для запроса, который нельзя выполнять, None — запрос допустим """
+        # Страница любого сайта может отправить запрос на локальный адрес: простая форма с text/plain
+        # обходится без предварительной проверки CORS, а подмена DNS приводит её под чужим именем в Host
+        if headers.get('host') not in allowed:
+            return 403, {'error': 'Заголовок Host не совпадает с адресом сервиса'}
+        origin = headers.get('origin')
+        if origin is not None and (urlsplit(origin).scheme != 'http' or urlsplit(origin).netloc not in allowed):
+            return 403, {'error': f'Запросы со страниц {origin} не принимаются'}
+        if method == 'POST' and headers.get('content-type', '').partition(';')[0].strip().lower() != 'application/json':
+            return 415, {'error': 'Тело запроса принимается только с Content-Type: application/json'}
+        return None
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status} {self.STATUS[status]}\r\n'
+                     f'Content-Type: application/json; charset=utf-8\r\n'
+                     f'Content-Length: {len(body)}\r\n'
+                     f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _dispatch(self, method, target, body):
+        """ Код ответа и данные для запроса """
+        url = urlsplit(target)
+        parts = [unquote(i) for i in url.path.split('/') if i]
+        query = dict(parse_qsl(url.query))
+        self.stats[method] += 1
+        if not parts or parts[0] not in Cli.ENTITIES or len(parts) > 2:
+            return 404, {'error': f'Неизвестный адрес: {url.path}'}
+        try:
+            if method == 'GET':
+                return self._read(parts[0], parts[1] if len(parts) > 1 else None, query)
+            if method == 'POST' and len(parts) == 2:
+                if parts[1] in self.FILE_ACTIONS:
+                    return 403, {'error': f'Команда {parts[1]} с путём файла доступна только из командной строки'}
+                params = json.loads(body or b'{}')
+                if not isinstance(params, dict):
+                    raise ValueError('Тело запроса должно быть объектом JSON')
+                # Изменения выполняет общий цикл записи, ответ приходит после фиксации пакета
+                done = asyncio.get_running_loop().create_future()
+                await self.queue.put((parts[0], parts[1], params, done))
+                return await done
+            return 405, {'error': f'Метод {method} не поддерживается для {url.path}'}
+        except (ValueError, KeyError, IndexError, TypeError) as error:
+            return 400, {'error': f'{type(error).__name__}: {error}'}
+        except Exception as error:
+            traceback.print_exc()
+            return 500, {'error': f'{type(error).__name__}: {error}'}
+
+    def _read(self, section, item, query):
+        """ Чтение из хранилищ выполняется сразу, без очереди записи """
+        entity = self.cli.entity(section)
+        manager = entity.manager
+        manager.refresh()
+        start = parse_date(query.pop('from')) if 'from' in query else None
+        end = parse_date(query.pop('to')) if 'to' in query else None
+        limit = int(query.pop('limit')) if 'limit' in query else None
+        if item is None:
+            unknown = set(query) - set(entity.RECORD.FIELDS)
+            if unknown:
+                raise ValueError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+            if (start or end) and section not in ('notes', 'finance'):
+                raise ValueError('Фильтр по периоду доступен для заметок и финансов')
+            records = manager.iter_records(start, end, **query)
+            return 200, [i.to_dict() for i in islice(records, limit)]
+        if item == 'search' and section in ('notes', 'contacts'):
+            if section == 'notes':
+                results = entity.index.search(query['q'], limit or 10)
+                return 200, [{**manager.find_data('id', i)[0].to_dict(), 'score': score} for i, score in results]
+            return 200, [i.to_dict() for i in entity.search_contacts(query['q'], limit or 10)]
+        if item == 'schedule' and section == 'tasks':
+            return 200, [i.to_dict() for i in entity.scheduled(start, end, limit)]
+        if item == 'report' and section == 'finance':
+            group_by = query.pop('group_by', None)
+            unknown = set(query) - set(entity.RECORD.FIELDS)
+            if unknown:
+                raise ValueError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+            report = entity.report(start, end, **query)
+            if group_by is not None:
+                report = {**report, 'groups': entity.group_report(group_by, start, end, **query)}
+            return 200, report
+        records = manager.find_data('id', int(item))
+        if not records:
+            return 404, {'error': f'Запись {item} не найдена'}
+        return 200, records[0].to_dict()
+
+    async def _write_loop(self):
+        """ Групповая фиксация: все команды, пришедшие за окно, записываются одной транзакцией на раздел """
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.BATCH_WINDOW)
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.stats['batches'] += 1
+            self.stats['batched'] += len(batch)
+            sections = {}
+            for command in batch:
+                sections.setdefault(command[0], []).append(command)
+            # Разделы SQLite пишут в один файл базы, поэтому транзакции идут по очереди
+            for section, commands in sections.items():
+                results = []
+                try:
+                    with self.cli.entity(section).manager.transaction():
+                        for _, action, params, done in commands:
+                            results.append((done, self._run(section, action, params)))
+                except Exception as error:
+                    traceback.print_exc()
+                    results = [(i[3], (500, {'error': f'{type(error).__name__}: {error}'})) for i in commands]
+                for done, result in results:
+                    if not done.done():
+                        done.set_result(result)
+
+    def _run(self, section, action, params):
+        """ Выполнение команды с перехватом вывода: сообщения команд возвращаются клиенту """
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                self.cli.run(section, action, params)
+        except (ValueError, KeyError, IndexError, TypeError) as error:
+            return 400, {'error': f'{type(error).__name__}: {error}', 'output': output.getvalue().strip()}
+        return 200, {'ok': True, 'output': output.getvalue().strip()}
+
+
+def cli(argv):
+    """ Запуск команды из аргументов, код возврата процесса """
+    args = Cli.build_parser().parse_args(argv)
+    if args.section == 'migrate':
+        migrate_to_sqlite()
+        return 0
+    if args.section == 'batch':
+        return Cli().run_batch(args.path, args.quiet)
+    if args.section == 'serve':
+        Server(args.host, args.port).serve()
+        return 0
+    params = {k: v for k, v in vars(args).items() if k not in ('section', 'action') and v is not None}
+    Cli().run(args.section, args.action, params)
+    return 0
+
+
 def main():
     menu = Menu()
     run_menu = True
@@ -998,7 +4918,10 @@ def main():
             run_menu = False
 
 if __name__ == '__main__':
-    main()
+    if sys.argv[1:]:
+        sys.exit(cli(sys.argv[1:]))
+    else:
+        main()
 
 """
 Вы меня простите, но я устал. Я несколько дней пишу этот код уже. Задача была разобраться с Гитом.
@@ -0,0 +1,76 @@
+""" Отбор записей по периоду в хранилищах JSON, SQLite и по месяцам
+
+Запуск: python -m unittest discover tests
+"""
+import os, sys, tempfile, unittest
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import ContactRecord, FinanceEntry, MainManager, ShardedManager, SqliteManager
+
+DATES = ['31-12-2025', '01-01-2026', '15-01-2026', '31-01-2026', '01-02-2026', '10-02-2026', '03-03-2026', 'не дата']
+
+
+def fill(manager):
+    with manager.transaction():
+        for i, value in enumerate(reversed(DATES)):
+            manager.insert_data(FinanceEntry.from_dict({'id': i + 1, 'amount': 1.0, 'category': ('Еда', 'Такси')[i % 2],
+                                                        'date': value, 'description': None}))
+    personal_assistant.WRITER.drain()
+    return manager
+
+
+class DateFilters(unittest.TestCase):
+    STORAGES = (MainManager, SqliteManager, ShardedManager)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        personal_assistant.WRITER.drain()
+        self.tmp.cleanup()
+
+    def open(self, storage, record_type=FinanceEntry, name='finance.json', indexed=True):
+        manager = storage(os.path.join(self.tmp.name, storage.__name__, name), record_type)
+        if indexed:
+            manager.add_sorted_index('date', lambda i: MainManager.date_key(i['date']))
+        return manager
+
+    def dates(self, records):
+        # Порядок записей в разных хранилищах разный: части по месяцам идут до части без даты
+        return sorted(MainManager.date_key(i['date']) for i in records)
+
+    def test_period(self):
+        for storage in self.STORAGES:
+            os.makedirs(os.path.join(self.tmp.name, storage.__name__))
+            with self.subTest(storage=storage.__name__):
+                manager = fill(self.open(storage))
+                self.assertEqual(self.dates(manager.iter_records(date(2026, 1, 1), date(2026, 2, 1))),
+                                 [20260101, 20260115, 20260131, 20260201])
+                self.assertEqual(self.dates(manager.iter_records(date_from=date(2026, 2, 2))), [20260210, 20260303])
+                self.assertEqual(self.dates(manager.iter_records(date_to=date(2025, 12, 31))), [0, 20251231])
+                self.assertEqual(list(manager.iter_records(date(2027, 1, 1), date(2027, 12, 31))), [])
+                found = manager.iter_records(date(2026, 1, 1), date(2026, 3, 31), category='Такси')
+                self.assertEqual({i['category'] for i in found}, {'Такси'})
+
+    def test_store_without_date_index_rejects_period(self):
+        for storage in (MainManager, SqliteManager):
+            os.makedirs(os.path.join(self.tmp.name, storage.__name__))
+            with self.subTest(storage=storage.__name__):
+                manager = self.open(storage, ContactRecord, 'contacts.json', indexed=False)
+                manager.insert_data(ContactRecord(id=1, name='Аня', phone='1', email=''))
+                with self.assertRaises(ValueError):
+                    list(manager.iter_records(date(2026, 1, 1), date(2026, 1, 31)))
+                self.assertEqual(len(list(manager.iter_records(name='Аня'))), 1)
+
+    def test_shards_without_date_index_reject_period(self):
+        os.makedirs(os.path.join(self.tmp.name, 'ShardedManager'))
+        manager = fill(self.open(ShardedManager, indexed=False))
+        with self.assertRaises(ValueError):
+            list(manager.iter_records(date(2026, 1, 1), date(2026, 1, 31)))
+
+
+if __name__ == '__main__':
+    unittest.main()
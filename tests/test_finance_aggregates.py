@@ -0,0 +1,64 @@
+""" Итоги финансов: запись на диск и чтение обратно
+
+Запуск: python -m unittest discover tests
+"""
+import os, sys, tempfile, unittest
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from personal_assistant import FinanceAggregates
+
+RECORDS = [
+    {'id': 1, 'amount': -5.0, 'category': 5, 'date': date(2026, 1, 3)},
+    {'id': 2, 'amount': 100.0, 'category': '5', 'date': date(2026, 1, 3)},
+    {'id': 3, 'amount': -7.5, 'category': None, 'date': date(2026, 1, 4)},
+    {'id': 4, 'amount': -1.0, 'category': 'Еда', 'date': date(2026, 2, 1)},
+    {'id': 5, 'amount': 3.0, 'category': None, 'date': None},
+]
+
+
+class FinanceAggregatesRoundTrip(unittest.TestCase):
+
+    def build(self):
+        aggregates = FinanceAggregates(None)
+        for record in RECORDS:
+            aggregates._add(record)
+        return aggregates
+
+    def read_back(self, aggregates):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'finance.aggregates')
+            with open(path, 'wb') as f:
+                aggregates.dump()(f, ['подпись'])
+            return FinanceAggregates.read(path, ['подпись'])
+
+    def test_categories_keep_their_types(self):
+        aggregates = self.build()
+        restored = self.read_back(aggregates)
+        self.assertEqual(restored.days, aggregates.days)
+        self.assertEqual(restored.months, aggregates.months)
+        self.assertEqual(restored.categories, aggregates.categories)
+        self.assertEqual(restored.day_keys, aggregates.day_keys)
+        # Число 5 и строка '5' — разные категории, None не превращается в 'null'
+        day = date(2026, 1, 3).toordinal()
+        self.assertEqual(set(restored.days[day]), {5, '5'})
+        self.assertIn(None, restored.days[date(2026, 1, 4).toordinal()])
+
+    def test_restored_totals_can_be_changed(self):
+        restored = self.read_back(self.build())
+        for record in RECORDS:
+            restored._remove(record['id'])
+        self.assertEqual((restored.days, restored.months, restored.categories), ({}, {}, {}))
+
+    def test_other_version_is_not_read(self):
+        aggregates = self.build()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'finance.aggregates')
+            with open(path, 'wb') as f:
+                aggregates.dump()(f, ['подпись'])
+            self.assertIsNone(FinanceAggregates.read(path, ['другая подпись']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+""" Импорт CSV с некорректными строками: суммы приводятся по ячейкам, строки без суммы отбрасываются
+
+Запуск: python -m unittest discover tests
+"""
+import os, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import ContactRecord, FinanceEntry, MainManager
+
+HEADER = 'id,amount,category,date,description\n'
+ROWS = ('1,10,Еда,01-01-2026,обед\n'
+        '2,abc,Еда,02-01-2026,опечатка\n'
+        '3,,Еда,03-01-2026,пусто\n'
+        '4,-5.5,Такси,04-01-2026,\n'
+        '5,nan,Еда,05-01-2026,не число\n')
+
+
+class CsvImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'finance.json')
+        self.progress = []
+
+    def tearDown(self):
+        personal_assistant.WRITER.drain()
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def load(self, path_import, record_type=FinanceEntry):
+        manager = MainManager(self.path, record_type)
+        manager.load_file('csv', path_import, self.path, progress=lambda *counts: self.progress.append(counts))
+        personal_assistant.WRITER.drain()
+        return manager
+
+    def test_bad_amounts_are_rejected(self):
+        manager = self.load(self.write('finance.csv', HEADER + ROWS))
+        self.assertEqual([(i['amount'], i['description']) for i in manager.data], [(10, 'обед'), (-5.5, None)])
+        self.assertEqual(self.progress[-1][:2], (2, 3))
+        self.assertEqual(sum(i['amount'] for i in MainManager(self.path, FinanceEntry).data), 4.5)
+
+    def test_bad_amounts_are_rejected_in_directory_import(self):
+        os.mkdir(os.path.join(self.tmp.name, 'statements'))
+        self.write('statements/a.csv', HEADER + ROWS)
+        self.write('statements/b.csv', HEADER + '1,7,Кино,06-01-2026,билет\n2,x,Кино,07-01-2026,\n')
+        manager = self.load(os.path.join(self.tmp.name, 'statements'))
+        self.assertEqual(sorted(i['amount'] for i in manager.data), [-5.5, 7, 10])
+        self.assertEqual(self.progress[-1][1], 4)
+
+    def test_file_without_valid_rows_keeps_store(self):
+        manager = MainManager(self.path, FinanceEntry)
+        manager.insert_data(FinanceEntry.from_dict({'id': 1, 'amount': 1.0, 'category': 'Еда',
+                                                    'date': '01-01-2026', 'description': None}))
+        personal_assistant.WRITER.drain()
+        with self.assertRaises(ValueError):
+            manager.load_file('csv', self.write('bad.csv', HEADER + '1,abc,Еда,01-01-2026,\n'), self.path)
+        self.assertEqual(len(MainManager(self.path, FinanceEntry).data), 1)
+
+    def test_text_columns_stay_strings(self):
+        manager = self.load(self.write('contacts.csv', 'id,name,phone,email\n1,Аня,+70001112233,\n2,Боб,0123,b@x\n'),
+                            ContactRecord)
+        self.assertEqual([i['phone'] for i in manager.data], ['+70001112233', '0123'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+""" Два процесса пишут в одно хранилище при каждом уровне надёжности: ни одно изменение не теряется
+
+Запуск: python -m unittest discover tests
+"""
+import os, sys, tempfile, unittest, multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import FinanceEntry, MainManager
+
+COUNT = 60
+
+
+def entry(id_record, description, amount=1.0):
+    return FinanceEntry.from_dict({'id': id_record, 'amount': amount, 'category': 'тест',
+                                   'date': '01-01-2026', 'description': description})
+
+
+def worker(path, number, durability):
+    MainManager.DURABILITY = durability
+    manager = MainManager(path, FinanceEntry)
+    for i in range(COUNT):
+        manager.insert_data(entry(manager.next_id(), f'{number}:{i}'))
+        with manager.transaction():
+            counter = manager.find_data('id', 1)[0]
+            manager.update_data(counter, {'amount': counter['amount'] + 1})
+    # Без flush и drain: при выходе процесса очередь записи дописывается сама
+
+
+@unittest.skipIf(personal_assistant.fcntl is None, 'межпроцессная блокировка недоступна')
+class TwoProcesses(unittest.TestCase):
+
+    def run_workers(self, durability):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'finance.json')
+            MainManager(path, FinanceEntry).insert_data(entry(1, 'счётчик', 0.0))
+            personal_assistant.WRITER.drain()
+
+            context = multiprocessing.get_context('spawn')
+            workers = [context.Process(target=worker, args=(path, i, durability)) for i in range(2)]
+            for i in workers:
+                i.start()
+            for i in workers:
+                i.join(120)
+                self.assertEqual(i.exitcode, 0)
+
+            result = MainManager(path, FinanceEntry)
+            ids = [i['id'] for i in result.data]
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertEqual({i['description'] for i in result.data if i['id'] != 1},
+                             {f'{n}:{i}' for n in range(2) for i in range(COUNT)})
+            self.assertEqual(result.find_data('id', 1)[0]['amount'], 2 * COUNT)
+
+    def test_none(self):
+        self.run_workers('none')
+
+    def test_exit(self):
+        self.run_workers('exit')
+
+    def test_fsync(self):
+        self.run_workers('fsync')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+""" Сервис отвечает 400 на некорректные запросы и продолжает работать
+
+Запуск: python -m unittest discover tests
+"""
+import os, sys, json, socket, tempfile, unittest, subprocess
+import http.client
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+
+class ServerErrors(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(cls.tmp.name, 'data'))
+        cls.process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'personal_assistant.py'), 'serve', '--port', '0'],
+                                       cwd=cls.tmp.name, stdout=subprocess.PIPE, text=True)
+        # Сервис сообщает выбранный порт строкой «Сервис запущен: http://127.0.0.1:<порт>/»
+        line = cls.process.stdout.readline()
+        cls.port = int(line.rsplit(':', 1)[1].strip(' /\n'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.process.terminate()
+        cls.process.wait(10)
+        cls.process.stdout.close()
+        cls.tmp.cleanup()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            if body is not None and not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            connection.request(method, path, body, {'Content-Type': 'application/json', **(headers or {})})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def raw(self, data):
+        """ Ответ на запрос, отправленный как есть: код и тело """
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            sock.sendall(data)
+            response = b''
+            while chunk := sock.recv(65536):
+                response += chunk
+        head, _, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(body)
+
+    def test_invalid_json_body(self):
+        status, body = self.request('POST', '/notes/add', b'{"title": ')
+        self.assertEqual(status, 400)
+        self.assertIn('error', body)
+
+    def test_missing_command_fields(self):
+        self.assertEqual(self.request('POST', '/finance/add', {'category': 'Еда'})[0], 400)
+
+    def test_unknown_filter_and_bad_date(self):
+        self.assertEqual(self.request('GET', '/finance?colour=red')[0], 400)
+        self.assertEqual(self.request('GET', '/finance/report?from=32-13-2026')[0], 400)
+        self.assertEqual(self.request('GET', '/finance/report?group_by=year')[0], 400)
+
+    def test_malformed_content_length(self):
+        for length in ('abc', '-1', '1_0'):
+            with self.subTest(length=length):
+                status, _ = self.raw(f'POST /notes/add HTTP/1.1\r\nHost: 127.0.0.1:{self.port}\r\n'
+                                     f'Content-Type: application/json\r\nContent-Length: {length}\r\n\r\n{{}}'.encode())
+                self.assertEqual(status, 400)
+
+    def test_malformed_request_line(self):
+        self.assertEqual(self.raw(b'GARBAGE\r\n\r\n')[0], 400)
+
+    def test_service_keeps_working(self):
+        self.request('POST', '/notes/add', b'not json')
+        status, body = self.request('POST', '/finance/add', {'amount': 5, 'category': 'Еда', 'date': '01-01-2026'})
+        self.assertEqual(status, 200, body)
+        status, report = self.request('GET', '/finance/report?from=01-01-2026&to=31-01-2026&group_by=day')
+        self.assertEqual(status, 200)
+        self.assertEqual(report['groups']['01-01-2026']['income'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+""" Хранилище на снимке и журнале: дочитывание журнала после перезапуска и сворачивание в снимок
+
+Запуск: python -m unittest discover tests
+"""
+import os, sys, marshal, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import personal_assistant
+from personal_assistant import BINARY_CODEC, FinanceEntry, MainManager
+
+
+def entry(id_record, amount, description=None):
+    return FinanceEntry.from_dict({'id': id_record, 'amount': amount, 'category': 'Еда',
+                                   'date': '01-01-2026', 'description': description})
+
+
+def snapshot(manager):
+    return [i.to_dict() for i in manager.data]
+
+
+class StorageLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'finance.json')
+
+    def tearDown(self):
+        personal_assistant.WRITER.drain()
+        self.tmp.cleanup()
+
+    def fill(self, manager):
+        for i in range(1, 6):
+            manager.insert_data(entry(i, float(i), f'запись {i}'))
+        manager.update_data(manager.find_data('id', 2)[0], {'amount': 20.0})
+        manager.delete_data('finance', 'id', 4)
+        personal_assistant.WRITER.drain()
+
+    def reopen(self):
+        return MainManager(self.path, FinanceEntry)
+
+    def test_log_is_replayed_after_restart(self):
+        manager = self.reopen()
+        self.fill(manager)
+        self.assertTrue(os.path.exists(manager.log_path))
+        self.assertFalse(os.path.exists(self.path))
+        restored = self.reopen()
+        self.assertEqual(snapshot(restored), snapshot(manager))
+        self.assertEqual([i['id'] for i in restored.data], [1, 2, 3, 5])
+        self.assertEqual(restored.find_data('id', 2)[0]['amount'], 20.0)
+
+    def test_torn_last_line_is_ignored(self):
+        manager = self.reopen()
+        self.fill(manager)
+        with open(manager.log_path, 'a') as f:
+            f.write('{"op": "insert", "record": {"id": 9')
+        self.assertEqual(snapshot(self.reopen()), snapshot(manager))
+
+    def test_compaction_replaces_log_with_snapshot(self):
+        manager = self.reopen()
+        self.fill(manager)
+        manager.compact()
+        personal_assistant.WRITER.drain()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(manager.log_path + '.old'))
+        self.assertEqual(snapshot(self.reopen()), snapshot(manager))
+
+        # Операции после сворачивания дописываются в новый журнал поверх снимка
+        manager.insert_data(entry(6, 6.0))
+        personal_assistant.WRITER.drain()
+        self.assertEqual([i['id'] for i in self.reopen().data], [1, 2, 3, 5, 6])
+
+    def test_log_is_compacted_at_threshold(self):
+        with mock.patch.object(MainManager, 'COMPACT_THRESHOLD', 3):
+            manager = self.reopen()
+            self.fill(manager)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(snapshot(self.reopen()), snapshot(manager))
+
+    def test_binary_snapshot(self):
+        with mock.patch.object(MainManager, 'SNAPSHOT_FORMAT', 'binary'):
+            manager = self.reopen()
+            self.fill(manager)
+            manager.compact()
+            personal_assistant.WRITER.drain()
+            self.assertTrue(os.path.exists(manager.binary_path))
+            self.assertEqual(snapshot(self.reopen()), snapshot(manager))
+
+    def test_binary_snapshot_of_older_format_is_read(self):
+        records = [entry(1, 5.0).to_dict(), entry(2, -1.5, 'такси').to_dict()]
+        with open(os.path.join(self.tmp.name, 'finance.bin'), 'wb') as f:
+            f.write(BINARY_CODEC.MAGIC + b'\x01' + marshal.dumps(records, 4))
+        self.assertEqual(snapshot(self.reopen()), records)
+
+    def test_binary_codec_keeps_value_types(self):
+        records = [{'id': 1, 'amount': 2, 'text': 'а', 'flag': True},
+                   {'id': 2, 'amount': 2.5, 'text': None, 'flag': False}]
+        restored = BINARY_CODEC.decode(BINARY_CODEC.encode(records))
+        self.assertEqual(restored, records)
+        self.assertEqual([type(i['amount']) for i in restored], [int, float])
+        with self.assertRaises(ValueError):
+            BINARY_CODEC.decode(BINARY_CODEC.MAGIC + b'\x09')
+
+
+if __name__ == '__main__':
+    unittest.main()